@@ -1,7 +1,63 @@
-"""Top-level package for dremio-arrow-client."""
+"""Top-level package for dremio-arrow-client.
+
+Public names are imported on first access, so `import dremioarrow` stays cheap for short-lived jobs. pyarrow is only
+imported along with the client, and pandas only by pandas conversions.
+"""
 
 __author__ = """Jason Kinyua"""
 __email__ = 'jaysnmury@gmail.com'
 __version__ = '1.0.3'
 
-from .client import DremioArrowClient, dremio_query  # type: ignore
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+# public name -> submodule defining it
+_EXPORTS = {
+    'DremioArrowClient': 'client',
+    'dremio_query': 'client',
+    'SessionPool': 'pool',
+    'default_session_pool': 'pool',
+    'ResultCache': 'cache',
+    'AsyncDremioArrowClient': 'aio',
+    'QueryStats': 'metrics',
+    'RpcTimingMiddlewareFactory': 'metrics',
+    'SharedResult': 'shared',
+    'PreparedStatement': 'flightsql',
+    'LazyTable': 'builder',
+    'EndpointProcessPool': 'procpool',
+    'default_process_pool': 'procpool',
+    'SingleFlight': 'coalesce',
+    'default_single_flight': 'coalesce',
+}
+# submodules the package used to import eagerly, still reachable as attributes of the package
+_SUBMODULES = {'aio', 'cache', 'client', 'coalesce', 'convert', 'metrics', 'pool', 'shared', 'writers'}
+
+__all__ = list(_EXPORTS)
+
+if TYPE_CHECKING:
+    from .aio import AsyncDremioArrowClient
+    from .builder import LazyTable
+    from .cache import ResultCache
+    from .client import DremioArrowClient, dremio_query
+    from .coalesce import SingleFlight, default_single_flight
+    from .flightsql import PreparedStatement
+    from .metrics import QueryStats, RpcTimingMiddlewareFactory
+    from .pool import SessionPool, default_session_pool
+    from .procpool import EndpointProcessPool, default_process_pool
+    from .shared import SharedResult
+
+
+def __getattr__(name: str) -> Any:
+    """Import public names and submodules on first access."""
+    if name in _EXPORTS:
+        value = getattr(importlib.import_module(f'.{_EXPORTS[name]}', __name__), name)
+    elif name in _SUBMODULES:
+        value = importlib.import_module(f'.{name}', __name__)
+    else:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted({*globals(), *_EXPORTS, *_SUBMODULES})
@@ -0,0 +1,88 @@
+"""Read-ahead of flight record batch streams on a background thread.
+
+Reading a flight stream releases the GIL while waiting on the network, so a thread receiving the next batches
+overlaps the transfer with whatever the consumer does with the previous ones: pandas conversion, file encoding or
+application code. Throughput then approaches the slower of the network and the consumer instead of their sum, while
+the bounded queue caps the memory held by batches received ahead of the consumer.
+"""
+import queue
+import threading
+from typing import Callable, Iterator, Optional, Tuple, TypeVar
+
+Item = TypeVar('Item')
+
+# seconds between checks for an abandoned consumer while the queue is full
+_POLL_SECONDS = 0.05
+
+_ITEM, _END, _ERROR = range(3)
+
+
+def read_ahead(
+    source: Iterator[Item],
+    depth: int,
+    cancel: Optional[Callable[[], None]] = None,
+    name: str = 'dremioarrow-prefetch',
+) -> Iterator[Item]:
+    """Iterate `source` on a background thread, up to `depth` items ahead of the consumer!
+
+    Exceptions raised by the source are raised to the consumer. When the consumer stops early, `cancel` is called \
+        to interrupt a blocking read, and the source is closed on the background thread.
+
+    Args:
+        source: Iterator[Item]
+            Iterator to read ahead, typically a generator of flight record batches
+        depth: int
+            Maximum number of items received ahead of the consumer, at least 1
+        cancel: Optional[Callable[[], None]]
+            Called from the consumer thread when it stops before the source is exhausted, e.g. to cancel the stream
+        name: str
+            Background thread name
+
+    Yields:
+        item: Item
+    """
+    if depth < 1:
+        raise ValueError("Read-ahead depth must be at least 1!")
+    items: 'queue.Queue[Tuple[int, object]]' = queue.Queue(maxsize=depth)
+    stopped = threading.Event()
+
+    def put(entry: Tuple[int, object]) -> bool:
+        while not stopped.is_set():
+            try:
+                items.put(entry, timeout=_POLL_SECONDS)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            for item in source:
+                if not put((_ITEM, item)):
+                    return
+            put((_END, None))
+        except BaseException as error:
+            put((_ERROR, error))
+        finally:
+            close = getattr(source, 'close', None)
+            if close is not None:
+                close()
+
+    thread = threading.Thread(target=produce, name=name, daemon=True)
+    thread.start()
+    finished = False
+    try:
+        while True:
+            kind, value = items.get()
+            if kind == _END:
+                finished = True
+                return
+            if kind == _ERROR:
+                finished = True
+                raise value  # type: ignore
+            yield value  # type: ignore
+    finally:
+        stopped.set()
+        if not finished and cancel is not None:
+            cancel()
+        thread.join()
@@ -0,0 +1,147 @@
+"""Dremio Arrow Flight Client SQL Helpers Module.
+
+Small helpers generating Dremio SQL text: quoting identifiers and table paths, rendering python values as SQL
+literals and rewriting a query into range-partitioned subqueries that can be read concurrently.
+"""
+import datetime
+import decimal
+from typing import Any, List, Optional, Sequence, Union
+
+# python types partition bounds may be given as
+Bound = Union[int, float, datetime.date, datetime.datetime]
+
+
+def quote_identifier(name: str) -> str:
+    """Quote a column or table name as a Dremio SQL identifier, escaping embedded double quotes."""
+    return '"' + name.replace('"', '""') + '"'
+
+
+def table_path(table: Union[str, Sequence[str]]) -> str:
+    """Dremio path of a table: strings are used verbatim, sequences of path components are quoted and joined."""
+    if isinstance(table, str):
+        return table
+    return '.'.join(quote_identifier(part) for part in table)
+
+
+def sql_literal(value: Any) -> str:
+    """Render a python value as a Dremio SQL literal!
+
+    Args:
+        value: Any
+            None, bool, int, float, decimal.Decimal, str, datetime.date or datetime.datetime value. \
+                Timezone-aware datetimes are rendered as UTC.
+
+    Returns:
+        literal: str
+    """
+    if value is None:
+        return 'NULL'
+    if isinstance(value, bool):
+        return 'TRUE' if value else 'FALSE'
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, decimal.Decimal):
+        if not value.is_finite():
+            raise ValueError(f"Cannot render {value} as a SQL literal!")
+        # positional notation: an exponent would make it an approximate (DOUBLE) literal
+        return format(value, 'f')
+    if isinstance(value, datetime.datetime):
+        if value.utcoffset() is not None:
+            # Dremio timestamps hold UTC times without an offset
+            value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+        return f"TIMESTAMP '{value.isoformat(sep=' ', timespec='milliseconds')}'"
+    if isinstance(value, datetime.date):
+        return f"DATE '{value.isoformat()}'"
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    raise TypeError(f"Cannot render value of type {type(value).__name__} as a SQL literal!")
+
+
+def _numeric_bounds(lower_bound: float, upper_bound: float, num_partitions: int) -> List[float]:
+    """Partition bounds of a number range: integer ranges split on whole numbers."""
+    width = upper_bound - lower_bound
+    if isinstance(width, float):
+        return _ascending(
+            lower_bound, upper_bound, [width * index / num_partitions for index in range(1, num_partitions)]
+        )
+    return _ascending(lower_bound, upper_bound, [width * index // num_partitions for index in range(1, num_partitions)])
+
+
+def _temporal_bounds(
+    lower_bound: datetime.date, upper_bound: datetime.date, num_partitions: int
+) -> List[datetime.date]:
+    """Partition bounds of a date or datetime range."""
+    width = upper_bound - lower_bound
+    return _ascending(lower_bound, upper_bound, [width * index // num_partitions for index in range(1, num_partitions)])
+
+
+def _ascending(lower_bound: Any, upper_bound: Any, steps: Sequence[Any]) -> List[Any]:
+    """The bounds `steps` away from the lower bound, dropping repeated ones, e.g. from a range of few units."""
+    if not lower_bound < upper_bound:
+        raise ValueError("lower_bound must be smaller than upper_bound!")
+    bounds: List[Any] = []
+    for step in steps:
+        bound = lower_bound + step
+        if bound > lower_bound and (not bounds or bound > bounds[-1]):
+            bounds.append(bound)
+    return bounds
+
+
+def partition_bounds(lower_bound: Bound, upper_bound: Bound, num_partitions: int) -> List[Bound]:
+    """Split the [lower_bound, upper_bound) range into at most `num_partitions` strides of equal width.
+
+    Integer, date and datetime ranges are split on whole units, so a range narrower than `num_partitions` \
+        yields fewer partitions. Both bounds must be numbers, both dates or both datetimes.
+
+    Returns:
+        bounds: List[Bound] the inner boundaries between consecutive partitions, sorted and unique
+    """
+    if num_partitions < 1:
+        raise ValueError("num_partitions must be at least 1!")
+    if isinstance(lower_bound, datetime.date) and isinstance(upper_bound, datetime.date):
+        # datetimes are dates too, but cannot be compared with plain dates
+        if isinstance(lower_bound, datetime.datetime) == isinstance(upper_bound, datetime.datetime):
+            return list(_temporal_bounds(lower_bound, upper_bound, num_partitions))
+    elif not isinstance(lower_bound, datetime.date) and not isinstance(upper_bound, datetime.date):
+        return list(_numeric_bounds(lower_bound, upper_bound, num_partitions))
+    raise TypeError("lower_bound and upper_bound must both be numbers, both dates or both datetimes!")
+
+
+def partition_queries(
+    sql: str, column: str, lower_bound: Bound, upper_bound: Bound, num_partitions: int, alias: Optional[str] = None
+) -> List[str]:
+    """Rewrite a query into range-filtered subqueries on `column`, in the style of Spark's JDBC reader!
+
+    The bounds only decide the partition stride, they do not filter rows: the first partition also holds the rows \
+        below `lower_bound` and NULLs, the last one the rows at or above `upper_bound`. Together the partitions \
+        return exactly the rows of the original query.
+
+    Args:
+        sql: str
+            SQL query string to partition
+        column: str
+            Name of a numeric, date or timestamp column of the query result
+        lower_bound: Bound
+            Start of the partitioned range
+        upper_bound: Bound
+            End of the partitioned range
+        num_partitions: int
+            Maximum number of partitions
+        alias: Optional[str]
+            Subquery alias, defaults to `dremioarrow_partition`
+
+    Returns:
+        sqls: List[str] one query per partition, in ascending range order
+    """
+    bounds = partition_bounds(lower_bound, upper_bound, num_partitions)
+    if not bounds:
+        return [sql]
+    subquery = sql.strip().rstrip(';').rstrip()
+    # the closing parenthesis goes on its own line in case the query ends with a line comment
+    prefix = f"SELECT * FROM ({subquery}\n) AS {quote_identifier(alias or 'dremioarrow_partition')} WHERE "
+    column = quote_identifier(column)
+    literals = [sql_literal(bound) for bound in bounds]
+    predicates = [f"{column} < {literals[0]} OR {column} IS NULL"]
+    predicates += [f"{column} >= {start} AND {column} < {end}" for start, end in zip(literals, literals[1:])]
+    predicates.append(f"{column} >= {literals[-1]}")
+    return [prefix + predicate for predicate in predicates]
@@ -0,0 +1,179 @@
+"""Dremio Arrow Flight Client Asyncio Module.
+
+The pyarrow flight client is blocking: calling `DremioArrowClient.query` from a coroutine stalls the event loop for
+the whole data transfer. `AsyncDremioArrowClient` runs the network reads and arrow decoding of a wrapped
+`DremioArrowClient` on a thread pool, so concurrent queries overlap their planning and transfer time while the
+event loop stays responsive. The session token is shared with the wrapped client.
+"""
+import asyncio
+import functools
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, AsyncIterator, List, Optional, Sequence, Union
+
+import pyarrow as pa
+
+from .client import DremioArrowClient
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .flightsql import Parameters, PreparedStatement
+
+# marks the end of a blocking iterator advanced on the thread pool
+_EXHAUSTED = object()
+
+
+class AsyncDremioArrowClient:
+    """Create an asyncio Client capable of running queries on Dremio Flight Server."""
+
+    def __init__(self, client: Optional[DremioArrowClient] = None, max_concurrency: int = 8, **connection_args: Any):
+        """Initialize the asyncio client around a (possibly shared) `DremioArrowClient`!
+
+        Args:
+            client: Optional[DremioArrowClient]
+                Synchronous client whose authenticated session is shared. \
+                    A new one is created from `connection_args` when not provided.
+            max_concurrency: int
+                Maximum number of queries in flight at once, defaults to 8
+            connection_args: Any
+                `DremioArrowClient` initialization arguments, used when `client` is not provided
+        """
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be at least 1!")
+        self.sync_client = client if client is not None else DremioArrowClient(**connection_args)
+        self.max_concurrency = max_concurrency
+        # created in the running loop: before python 3.10, asyncio primitives bind to the loop current at creation
+        self._limit: Optional[asyncio.Semaphore] = None
+        self._limit_loop: Optional[asyncio.AbstractEventLoop] = None
+        self._executor = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix='dremioarrow-async')
+
+    @property
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Semaphore bounding the queries in flight on the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._limit is None or self._limit_loop is not loop:
+            self._limit, self._limit_loop = asyncio.Semaphore(self.max_concurrency), loop
+        return self._limit
+
+    async def _run(self, function, *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking call on the client thread pool."""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, functools.partial(function, *args, **kwargs))
+
+    async def query(self, sql: str, **kwargs: Any) -> Union['pd.DataFrame', pa.Table]:
+        """Execute SQL command against Dremio Arrow Flight Server without blocking the event loop!
+
+        Args:
+            sql: str
+                SQL query string to run on Dremio Engine
+            kwargs: Any
+                Extra `DremioArrowClient.query` arguments, e.g. ts_col and ts_format
+
+        Returns:
+            data: pd.DataFrame or pa.Table
+        """
+        async with self._semaphore:
+            return await self._run(self.sync_client.query, sql, **kwargs)
+
+    async def head(self, sql: str, n: int = 1000, **kwargs: Any) -> Union['pd.DataFrame', pa.Table]:
+        """Preview the first `n` rows of a query result without blocking the event loop!
+
+        Args:
+            sql: str
+                SQL query string to run on Dremio Engine
+            n: int
+                Number of rows to return, defaults to 1000
+            kwargs: Any
+                Extra `DremioArrowClient.head` arguments, e.g. output and timeout
+
+        Returns:
+            data: pd.DataFrame or pa.Table
+        """
+        async with self._semaphore:
+            return await self._run(self.sync_client.head, sql, n, **kwargs)
+
+    async def get_schema(self, sql: str, refresh: bool = False) -> pa.Schema:
+        """Get the result schema of a SQL query without running it, see `DremioArrowClient.get_schema`!"""
+        async with self._semaphore:
+            return await self._run(self.sync_client.get_schema, sql, refresh=refresh)
+
+    async def prepare(self, sql: str) -> 'PreparedStatement':
+        """Prepare a parameterized SQL query, see `DremioArrowClient.prepare`!"""
+        async with self._semaphore:
+            return await self._run(self.sync_client.prepare, sql)
+
+    async def execute(
+        self, statement: 'PreparedStatement', params: Optional['Parameters'] = None, **kwargs: Any
+    ) -> Union['pd.DataFrame', pa.Table]:
+        """Execute a prepared statement with a set of parameter values without blocking the event loop!
+
+        Args:
+            statement: PreparedStatement
+                Statement returned by `prepare`
+            params: Optional[Union[Sequence[Any], Mapping[str, Any], pa.RecordBatch, pa.Table]]
+                Values of the `?` placeholders, see `PreparedStatement.execute`
+            kwargs: Any
+                Extra `PreparedStatement.execute` arguments, e.g. ts_col and ts_format
+
+        Returns:
+            data: pd.DataFrame or pa.Table
+        """
+        async with self._semaphore:
+            return await self._run(statement.execute, params, **kwargs)
+
+    async def query_many(self, sqls: Sequence[str], **kwargs: Any) -> List[Union['pd.DataFrame', pa.Table]]:
+        """Execute a batch of SQL commands concurrently, bounded by `max_concurrency`!
+
+        Args:
+            sqls: Sequence[str]
+                SQL query strings to run on Dremio Engine
+            kwargs: Any
+                Extra `DremioArrowClient.query` arguments applied to every query
+
+        Returns:
+            data: List[pd.DataFrame] in the same order as `sqls`
+        """
+        return list(await asyncio.gather(*(self.query(sql, **kwargs) for sql in sqls)))
+
+    async def query_batches(self, sql: str, **kwargs: Any) -> AsyncIterator[Union[pa.RecordBatch, 'pd.DataFrame']]:
+        """Execute SQL command and asynchronously yield the result set batch by batch!
+
+        Each batch is read from the flight stream on the client thread pool. The query holds one \
+            concurrency slot until the iterator is exhausted or closed.
+
+        Args:
+            sql: str
+                SQL query string to run on Dremio Engine
+            kwargs: Any
+                Extra `DremioArrowClient.query_batches` arguments, e.g. as_pandas
+
+        Yields:
+            batch: pa.RecordBatch or pd.DataFrame
+        """
+        async with self._semaphore:
+            batches = self.sync_client.query_batches(sql, **kwargs)
+            try:
+                while True:
+                    batch = await self._run(next, batches, _EXHAUSTED)
+                    if batch is _EXHAUSTED:
+                        break
+                    yield batch
+            finally:
+                # closing the generator cancels the flight stream, which is a blocking call too
+                try:
+                    await self._run(batches.close)
+                except RuntimeError:
+                    # the thread pool was shut down before this abandoned iterator got finalized
+                    batches.close()
+
+    def close(self):
+        """Shut down the client thread pool once in-flight calls complete."""
+        self._executor.shutdown(wait=True)
+
+    async def __aenter__(self) -> 'AsyncDremioArrowClient':
+        """Use the client as an async context manager."""
+        return self
+
+    async def __aexit__(self, *exc_info: Any):
+        """Shut down the client thread pool on exit."""
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
@@ -0,0 +1,224 @@
+"""Dremio Arrow Flight Client Query Builder Module.
+
+`SELECT * FROM big_table` followed by column selection and filtering in pandas pulls every column and row of the
+table over the wire. A `LazyTable` records projections, filters, aggregations, ordering and limits instead, and
+compiles them into a single SQL statement only when it is materialized, so Dremio does the work and only the
+result that is actually used is transferred.
+
+Each operation returns a new `LazyTable`, leaving the one it was called on unchanged. Operations apply in the order
+they are chained: one that cannot be expressed at the current level of the statement (e.g. a filter following a
+limit) wraps the statement built so far in a subquery.
+"""
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional, Sequence, Tuple, Union
+
+import pyarrow as pa
+
+from ._sql import quote_identifier, sql_literal, table_path
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .client import DremioArrowClient
+
+# alias of the subqueries wrapping earlier operations
+SUBQUERY_ALIAS = 'dremioarrow_subquery'
+
+# aggregation given as a SQL expression, or as a (column, function) pair like pandas named aggregations
+Aggregation = Union[str, Tuple[str, str]]
+
+
+def _predicate(column: str, value: Any) -> str:
+    """Render a `filter` keyword argument: NULL checks for None, IN lists for sequences, equality otherwise."""
+    name = quote_identifier(column)
+    if value is None:
+        return f'{name} IS NULL'
+    if isinstance(value, (list, tuple, set, frozenset)):
+        if not value:
+            raise ValueError(f"Filter on {column} needs at least one value!")
+        return f"{name} IN ({', '.join(sql_literal(item) for item in value)})"
+    return f'{name} = {sql_literal(value)}'
+
+
+def _aggregation(alias: str, aggregation: Aggregation) -> str:
+    """Render an `aggregate` keyword argument as an aliased select item."""
+    if isinstance(aggregation, tuple):
+        column, function = aggregation
+        if not function.isidentifier():
+            raise ValueError(f"Invalid aggregate function name {function!r} for {alias}!")
+        aggregation = f'{function.upper()}({quote_identifier(column)})'
+    return f'{aggregation} AS {quote_identifier(alias)}'
+
+
+class LazyTable:
+    """Lazily built query on a Dremio table, compiled to SQL and run only when materialized."""
+
+    def __init__(self, client: 'DremioArrowClient', table: Union[str, Sequence[str]]):
+        """Initialize a query selecting every row and column of a table!
+
+        Args:
+            client: DremioArrowClient
+                Client running the compiled query
+            table: Union[str, Sequence[str]]
+                Dremio table path, either as SQL text (e.g. `space.folder.dataset`) or a sequence of \
+                    unquoted path components (e.g. `['space', 'folder', 'dataset']`)
+        """
+        self.client = client
+        self._source = table_path(table)
+        self._columns: List[str] = []
+        self._where: List[str] = []
+        self._group_by: List[str] = []
+        self._order_by: List[str] = []
+        self._limit: Optional[int] = None
+
+    def _copy(self, nest: bool = False) -> 'LazyTable':
+        """A copy of this query, or with `nest`, a query selecting from this one as a subquery."""
+        copy = LazyTable.__new__(LazyTable)
+        copy.__dict__.update(self.__dict__)
+        if nest:
+            copy._source = f'({self.sql}) AS {quote_identifier(SUBQUERY_ALIAS)}'
+            copy._columns, copy._where, copy._group_by, copy._order_by = [], [], [], []
+            copy._limit = None
+        else:
+            copy._columns, copy._where = list(self._columns), list(self._where)
+            copy._group_by, copy._order_by = list(self._group_by), list(self._order_by)
+        return copy
+
+    def select(self, *columns: str, **expressions: str) -> 'LazyTable':
+        """Keep only some columns, and compute new ones!
+
+        Args:
+            columns: str
+                Names of the columns to keep
+            expressions: str
+                New columns as alias to SQL expression pairs, e.g. `total='fare_amount + tip_amount'`
+
+        Returns:
+            table: LazyTable
+        """
+        if not columns and not expressions:
+            raise ValueError("select needs at least one column or expression!")
+        # expressions may refer to columns computed by an earlier select or aggregate, which only a subquery sees
+        query = self._copy(nest=bool(self._columns))
+        query._columns = [quote_identifier(column) for column in columns]
+        query._columns += [f'{expression} AS {quote_identifier(alias)}' for alias, expression in expressions.items()]
+        return query
+
+    def filter(self, *predicates: str, **values: Any) -> 'LazyTable':
+        """Keep only the rows matching every condition!
+
+        Args:
+            predicates: str
+                SQL boolean expressions, e.g. `"fare_amount > 10"`
+            values: Any
+                Column to value pairs rendered as SQL literals: equality for single values, `IN` for lists, \
+                    `IS NULL` for None, e.g. `vendor_id='CMT', passenger_count=[1, 2]`
+
+        Returns:
+            table: LazyTable
+        """
+        conditions = [*predicates, *(_predicate(column, value) for column, value in values.items())]
+        if not conditions:
+            raise ValueError("filter needs at least one condition!")
+        # WHERE applies before projections, grouping and limits of the same statement
+        query = self._copy(nest=bool(self._columns) or self._limit is not None)
+        query._where += conditions
+        return query
+
+    def aggregate(self, *by: str, **aggregations: Aggregation) -> 'LazyTable':
+        """Group rows by some columns and aggregate each group to a single row!
+
+        Args:
+            by: str
+                Names of the grouping columns, the whole table is a single group without any
+            aggregations: Union[str, Tuple[str, str]]
+                Aggregated columns as alias to SQL expression pairs, e.g. `trips='COUNT(*)'`, or alias to \
+                    (column, function) pairs, e.g. `fare=('fare_amount', 'sum')`
+
+        Returns:
+            table: LazyTable
+        """
+        if not by and not aggregations:
+            raise ValueError("aggregate needs at least one grouping column or aggregation!")
+        query = self._copy(nest=bool(self._columns) or bool(self._order_by) or self._limit is not None)
+        # the aggregated columns make any later select, filter or aggregate nest this statement
+        query._group_by = [quote_identifier(column) for column in by]
+        query._columns = query._group_by + [_aggregation(alias, value) for alias, value in aggregations.items()]
+        return query
+
+    def order_by(self, *columns: str, descending: bool = False) -> 'LazyTable':
+        """Sort the rows, e.g. before a `limit`!
+
+        Args:
+            columns: str
+                Names of the columns to sort by, in order of precedence
+            descending: bool
+                Sort in descending order, defaults to False
+
+        Returns:
+            table: LazyTable
+        """
+        if not columns:
+            raise ValueError("order_by needs at least one column!")
+        query = self._copy(nest=self._limit is not None)
+        direction = ' DESC' if descending else ''
+        query._order_by = [quote_identifier(column) + direction for column in columns]
+        return query
+
+    def limit(self, n: int) -> 'LazyTable':
+        """Keep only the first `n` rows!
+
+        Args:
+            n: int
+                Maximum number of rows
+
+        Returns:
+            table: LazyTable
+        """
+        if n < 0:
+            raise ValueError("limit must not be negative!")
+        query = self._copy()
+        query._limit = n if query._limit is None else min(n, query._limit)
+        return query
+
+    @property
+    def sql(self) -> str:
+        """The SQL statement this query compiles to."""
+        sql = f"SELECT {', '.join(self._columns) or '*'} FROM {self._source}"
+        if self._where:
+            conditions = self._where if len(self._where) == 1 else [f'({condition})' for condition in self._where]
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        if self._group_by:
+            sql += ' GROUP BY ' + ', '.join(self._group_by)
+        if self._order_by:
+            sql += ' ORDER BY ' + ', '.join(self._order_by)
+        if self._limit is not None:
+            sql += f' LIMIT {self._limit}'
+        return sql
+
+    def collect(self, **kwargs: Any) -> Union['pd.DataFrame', pa.Table]:
+        """Run the query and return its result!
+
+        Args:
+            kwargs: Any
+                Extra `DremioArrowClient.query` arguments, e.g. output, dtypes or timeout
+
+        Returns:
+            data: pd.DataFrame or pa.Table
+        """
+        return self.client.query(self.sql, **kwargs)
+
+    def head(self, n: int = 1000, **kwargs: Any) -> Union['pd.DataFrame', pa.Table]:
+        """Run the query and return its first `n` rows, see `DremioArrowClient.head`!"""
+        return self.client.head(self.sql, n, **kwargs)
+
+    def batches(self, **kwargs: Any) -> Iterator[Union[pa.RecordBatch, 'pd.DataFrame']]:
+        """Run the query and stream its result, see `DremioArrowClient.query_batches`!"""
+        return self.client.query_batches(self.sql, **kwargs)
+
+    def schema(self) -> pa.Schema:
+        """Plan the query and return its result schema without reading any data, see `DremioArrowClient.get_schema`!"""
+        return self.client.get_schema(self.sql)
+
+    def __repr__(self) -> str:
+        """Show the SQL the query compiles to."""
+        return f'LazyTable({self.sql!r})'
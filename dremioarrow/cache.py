@@ -0,0 +1,198 @@
+"""Dremio Arrow Flight Client Result Cache Module.
+
+Reporting workloads often repeat identical SQL within minutes, and Dremio re-plans and re-scans every one of them.
+The result cache stores query results as Arrow IPC files in a local directory, keyed on the normalized SQL text
+plus the connection identity. Cache hits are memory-mapped straight from disk without any Flight round trip.
+
+Every entry carries its own time to live, and the least recently used entries are evicted once the cache grows
+beyond its size budget.
+"""
+import hashlib
+import os
+import re
+import tempfile
+import time
+from typing import Iterable, List, Optional, Tuple
+
+import pyarrow as pa
+
+# schema metadata key holding the unix time a cache entry expires at
+EXPIRES_AT_KEY = b'dremioarrow:expires_at'
+CACHE_FILE_SUFFIX = '.arrow'
+
+# quoted literals and identifiers are matched first so whitespace inside them is preserved
+_SQL_TOKENS = re.compile(r"('(?:[^']|'')*'|\"(?:[^\"]|\"\")*\")|\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Normalize SQL text for use as a cache key!
+
+    Runs of whitespace outside quoted literals and identifiers collapse to a single space and trailing \
+        semicolons are dropped, so formatting differences do not defeat the cache.
+
+    Args:
+        sql: str
+            SQL query string
+
+    Returns:
+        sql: str
+    """
+    normalized = _SQL_TOKENS.sub(lambda match: match.group(1) or ' ', sql).strip()
+    return normalized.rstrip(';').rstrip()
+
+
+def cache_key(sql: str, connection_key: Iterable[str]) -> str:
+    """Compute the cache key of a query issued over a given connection.
+
+    Args:
+        sql: str
+            SQL query string
+        connection_key: Iterable[str]
+            Server, account and workload queue identity of the client running the query
+
+    Returns:
+        key: str
+    """
+    digest = hashlib.sha256()
+    for part in (*connection_key, normalize_sql(sql)):
+        digest.update(part.encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """An on-disk, memory-mapped cache of query results stored as Arrow IPC files."""
+
+    def __init__(
+        self,
+        directory: Optional[str] = os.environ.get('DREMIO_ARROW_CACHE_DIR'),
+        ttl: float = 600.0,
+        max_bytes: int = 1 << 30,
+    ):
+        """Initialize the result cache, creating the cache directory if need be!
+
+        Args:
+            directory: Optional[str]
+                Cache directory, defaults to DREMIO_ARROW_CACHE_DIR environment variable or ~/.cache/dremioarrow
+            ttl: float
+                Default number of seconds an entry stays valid, defaults to 10 minutes
+            max_bytes: int
+                Size budget of the cache directory. Least recently used entries are evicted beyond it. \
+                    Defaults to 1 GiB.
+        """
+        if ttl <= 0:
+            raise ValueError("ttl must be a positive number of seconds!")
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be a positive number of bytes!")
+        self.directory = directory or os.path.join(os.path.expanduser('~'), '.cache', 'dremioarrow')
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + CACHE_FILE_SUFFIX)
+
+    def get(self, key: str) -> Optional[pa.Table]:
+        """Look up a cached result!
+
+        Args:
+            key: str
+                Cache key, see `cache_key`
+
+        Returns:
+            table: Optional[pa.Table] memory-mapped from the cache file, or None on a miss or expired entry
+        """
+        path = self._path(key)
+        try:
+            source = pa.memory_map(path)
+        except OSError:
+            return None
+        try:
+            reader = pa.ipc.open_file(source)
+            metadata = dict(reader.schema.metadata or {})
+            expires_at = float(metadata.pop(EXPIRES_AT_KEY, 0))
+            if expires_at <= time.time():
+                source.close()
+                self._remove(path)
+                return None
+            table = reader.read_all()
+        except (pa.ArrowInvalid, ValueError):
+            # truncated or foreign file, drop it and treat it as a miss
+            source.close()
+            self._remove(path)
+            return None
+        # refresh the modification time, it orders entries for LRU eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return table.replace_schema_metadata(metadata or None)
+
+    def put(self, key: str, table: pa.Table, ttl: Optional[float] = None):
+        """Store a query result in the cache!
+
+        The file is written next to its final location and atomically moved into place, so concurrent \
+            readers never observe a partially written entry.
+
+        Args:
+            key: str
+                Cache key, see `cache_key`
+            table: pa.Table
+                Query result to cache
+            ttl: Optional[float]
+                Seconds the entry stays valid, defaults to the cache `ttl`
+        """
+        expires_at = time.time() + (ttl if ttl is not None else self.ttl)
+        metadata = dict(table.schema.metadata or {})
+        metadata[EXPIRES_AT_KEY] = repr(expires_at).encode('utf-8')
+        schema = table.schema.with_metadata(metadata)
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+                writer.write_table(table.replace_schema_metadata(metadata))
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            # e.g. the entry is memory-mapped by another reader on Windows, skip caching this result
+            self._remove(temp_path)
+            return
+        self.evict()
+
+    def invalidate(self, key: str):
+        """Remove a single entry from the cache."""
+        self._remove(self._path(key))
+
+    def clear(self):
+        """Remove every entry from the cache."""
+        for path, _, _ in self._entries():
+            self._remove(path)
+
+    def evict(self):
+        """Remove entries, least recently used first, until the cache fits within `max_bytes`."""
+        entries = sorted(self._entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.max_bytes:
+                break
+            if self._remove(path):
+                total -= size
+
+    def _entries(self) -> List[Tuple[str, int, float]]:
+        """List cache files as (path, size, modification time) tuples."""
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(CACHE_FILE_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    @staticmethod
+    def _remove(path: str) -> bool:
+        try:
+            os.remove(path)
+        except OSError:
+            return False
+        return True
@@ -0,0 +1,270 @@
+"""Dremio Arrow Flight Client Command Line Module.
+
+The `dremio-arrow` console script runs a SQL query and streams the result set to stdout or a file, batch by batch,
+as Arrow IPC, CSV, JSON lines or Parquet. Output starts as soon as the first record batch arrives and memory stays
+constant however large the result set is. A throughput line is reported on stderr.
+
+Connection settings come from the same environment variables as `DremioArrowClient`:
+    DREMIO_FLIGHT_SERVER_HOST, DREMIO_FLIGHT_SERVER_PORT, DREMIO_FLIGHT_SERVER_USERNAME, DREMIO_FLIGHT_SERVER_PASSWORD
+
+Usage:
+    dremio-arrow 'SELECT * FROM "lake"."trips"' > trips.csv
+    dremio-arrow -f extract.sql -o trips.parquet --compression zstd
+    dremio-arrow -f extract.sql --format arrow | python consumer.py
+"""
+import argparse
+import base64
+import datetime
+import decimal
+import json
+import os
+import sys
+import time
+from typing import IO, Any, Iterable, Iterator, List, Optional
+
+import pyarrow as pa
+
+from .client import DEFAULT_PREFETCH, DremioArrowClient
+from .writers import write_ipc, write_parquet
+
+OUTPUT_FORMATS = ('arrow', 'csv', 'jsonl', 'parquet')
+
+# output file extension -> format, stdout defaults to csv
+_EXTENSIONS = {
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+    '.csv': 'csv',
+    '.jsonl': 'jsonl',
+    '.ndjson': 'jsonl',
+    '.parquet': 'parquet',
+}
+
+
+class Progress:
+    """Counts streamed batches and reports rows, bytes and throughput on stderr."""
+
+    def __init__(self, stream: Optional[IO[str]] = None, interval: float = 0.5, enabled: bool = True):
+        """Initialize the progress reporter, redrawing one line on terminals at most every `interval` seconds."""
+        self.stream = stream if stream is not None else sys.stderr
+        self.interval = interval
+        self.enabled = enabled
+        self.interactive = enabled and self.stream.isatty()
+        self.rows = 0
+        self.bytes = 0
+        self.started = time.perf_counter()
+        self.reported = self.started
+
+    def line(self) -> str:
+        """Rows, bytes and throughput so far."""
+        seconds = max(time.perf_counter() - self.started, 1e-9)
+        megabytes = self.bytes / (1024 * 1024)
+        return (
+            f'{self.rows:,} rows  {megabytes:,.1f} MB  {seconds:.1f} s  '
+            f'{self.rows / seconds:,.0f} rows/s  {megabytes / seconds:,.1f} MB/s'
+        )
+
+    def track(self, batches: Iterable[pa.RecordBatch]) -> Iterator[pa.RecordBatch]:
+        """Pass record batches through, counting them."""
+        for batch in batches:
+            self.rows += batch.num_rows
+            self.bytes += batch.nbytes
+            now = time.perf_counter()
+            if self.interactive and now - self.reported >= self.interval:
+                self.reported = now
+                self.stream.write(f'\r{self.line()}')
+                self.stream.flush()
+            yield batch
+
+    def done(self):
+        """Report the final totals."""
+        if self.enabled:
+            self.stream.write(f"{chr(13) if self.interactive else ''}{self.line()}\n")
+            self.stream.flush()
+
+
+def _json_default(value: Any) -> Any:
+    """Serialize the python values of arrow types json does not support."""
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    if isinstance(value, datetime.timedelta):
+        return value.total_seconds()
+    if isinstance(value, decimal.Decimal):
+        return str(value)
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def _stringify(arrow_type: pa.DataType) -> bool:
+    """Whether a column is written to JSON as its arrow string representation."""
+    return (
+        pa.types.is_timestamp(arrow_type)
+        or pa.types.is_date(arrow_type)
+        or pa.types.is_time(arrow_type)
+        or pa.types.is_decimal(arrow_type)
+    )
+
+
+def write_csv(batches: Iterable[pa.RecordBatch], sink: Any, schema: pa.Schema) -> int:
+    """Write a stream of record batches as CSV with a header line.
+
+    Returns:
+        rows: int number of rows written
+    """
+    import pyarrow.csv as csv
+
+    rows = 0
+    with csv.CSVWriter(sink, schema) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
+
+
+def write_jsonl(batches: Iterable[pa.RecordBatch], sink: IO[bytes]) -> int:
+    """Write a stream of record batches as JSON lines, one object per row.
+
+    Returns:
+        rows: int number of rows written
+    """
+    encode = json.JSONEncoder(ensure_ascii=False, default=_json_default).encode
+    rows = 0
+    for batch in batches:
+        # arrow renders temporal and decimal values as strings far faster than python objects are created
+        columns = [column.cast(pa.string()) if _stringify(column.type) else column for column in batch.columns]
+        values = pa.RecordBatch.from_arrays(columns, names=batch.schema.names).to_pydict()
+        names = list(values)
+        lines = [encode(dict(zip(names, row))) for row in zip(*values.values())]
+        if lines:
+            sink.write(('\n'.join(lines) + '\n').encode('utf-8'))
+        rows += batch.num_rows
+    return rows
+
+
+def _read_sql(args: argparse.Namespace, parser: argparse.ArgumentParser) -> str:
+    if args.sql is not None and args.file is not None:
+        parser.error('pass the SQL inline or with --file, not both')
+    if args.file is not None:
+        if args.file == '-':
+            return sys.stdin.read()
+        with open(args.file) as source:
+            return source.read()
+    if args.sql is None or args.sql == '-':
+        return sys.stdin.read()
+    return args.sql
+
+
+def _output_format(args: argparse.Namespace, parser: argparse.ArgumentParser) -> str:
+    if args.format is not None:
+        return args.format
+    if args.output in (None, '-'):
+        return 'csv'
+    extension = os.path.splitext(args.output)[1].lower()
+    if extension not in _EXTENSIONS:
+        parser.error(f'cannot infer the output format of {args.output}, pass --format')
+    return _EXTENSIONS[extension]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    """Command line arguments of the `dremio-arrow` console script."""
+    parser = argparse.ArgumentParser(
+        prog='dremio-arrow', description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument('sql', nargs='?', help='SQL query, read from stdin when omitted or -')
+    parser.add_argument('-f', '--file', help='read the SQL query from this file')
+    parser.add_argument('-o', '--output', help='output file, defaults to stdout')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, help='output format, inferred from the output file name')
+    parser.add_argument('--compression', help='parquet codec (default snappy) or arrow IPC codec (lz4, zstd)')
+    parser.add_argument('--row-group-size', type=int, help='maximum rows per parquet row group')
+    parser.add_argument(
+        '--ts-col',
+        action='append',
+        help='date/datetime column converted to strings, repeat the option or separate names with commas for several',
+    )
+    parser.add_argument('--ts-format', help='strftime format of the --ts-col columns')
+    parser.add_argument(
+        '--prefetch',
+        type=int,
+        default=DEFAULT_PREFETCH,
+        help=f'record batches received ahead of the writer, 0 disables read-ahead (default {DEFAULT_PREFETCH})',
+    )
+    parser.add_argument('--timeout', type=float, help='seconds the query may take before it is cancelled')
+    parser.add_argument('--host', default=os.environ.get('DREMIO_FLIGHT_SERVER_HOST'), help='flight server host')
+    parser.add_argument('--port', default=os.environ.get('DREMIO_FLIGHT_SERVER_PORT'), help='flight server port')
+    parser.add_argument('--username', default=os.environ.get('DREMIO_FLIGHT_SERVER_USERNAME'), help='account name')
+    parser.add_argument('--routing-tag', help='workload management routing tag')
+    parser.add_argument('--routing-queue', help='workload management routing queue')
+    parser.add_argument('-q', '--quiet', action='store_true', help='do not report progress on stderr')
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point of the `dremio-arrow` console script."""
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    sql = _read_sql(args, parser)
+    output_format = _output_format(args, parser)
+    # the password is only ever read from the environment, never from the (visible) command line
+    connection_args = {
+        'host': args.host,
+        'port': args.port,
+        'username': args.username,
+        'password': os.environ.get('DREMIO_FLIGHT_SERVER_PASSWORD'),
+        'routing_tag': args.routing_tag,
+        'routing_queue': args.routing_queue,
+    }
+    connection_args = {key: value for key, value in connection_args.items() if value is not None}
+    ts_col = [name.strip() for value in args.ts_col or [] for name in value.split(',') if name.strip()] or None
+    progress = Progress(enabled=not args.quiet)
+    try:
+        client = DremioArrowClient(**connection_args, timeout=args.timeout)
+        schema, stream = client._stream_batches(sql, ts_col=ts_col, ts_format=args.ts_format, prefetch=args.prefetch)
+        batches = progress.track(stream)
+        sink = sys.stdout.buffer if args.output in (None, '-') else open(args.output, 'wb')
+        try:
+            if output_format == 'arrow':
+                if sink is sys.stdout.buffer:
+                    # the streaming IPC format, pipes cannot be read back as random access files
+                    options = pa.ipc.IpcWriteOptions(compression=args.compression)
+                    with pa.ipc.new_stream(sink, schema, options=options) as writer:
+                        for batch in batches:
+                            writer.write_batch(batch)
+                else:
+                    write_ipc(batches, sink, schema, compression=args.compression)
+            elif output_format == 'csv':
+                write_csv(batches, sink, schema)
+            elif output_format == 'jsonl':
+                write_jsonl(batches, sink)
+            else:
+                write_parquet(
+                    batches,
+                    sink,
+                    schema,
+                    row_group_size=args.row_group_size,
+                    compression=args.compression or 'snappy',
+                )
+        except BaseException:
+            if sink is not sys.stdout.buffer:
+                # never leave a truncated output file behind
+                sink.close()
+                os.remove(args.output)
+            raise
+        if sink is sys.stdout.buffer:
+            sink.flush()
+        else:
+            sink.close()
+    except BrokenPipeError:
+        # the consumer stopped reading, e.g. `| head`, which is not an error. Point stdout at devnull so the
+        # interpreter does not fail flushing it again on exit.
+        os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        return 0
+    except Exception as error:
+        print(f'dremio-arrow: error: {error}', file=sys.stderr)
+        return 1
+    progress.done()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
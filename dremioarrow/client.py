@@ -18,13 +18,192 @@ Arrow Flight Server Request Methods:
 More Details:
     Please see README.md file and [official docs](https://docs.dremio.com/software/drivers/arrow-flight/).
 """
+import hashlib
 import os
-from datetime import date
-from typing import Optional
+import random
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Generator,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+    Union,
+)
 
-import pandas as pd
+import pyarrow as pa
 from pyarrow import flight
 
+from ._prefetch import read_ahead
+from ._sql import Bound, partition_queries
+from .cache import ResultCache, cache_key, normalize_sql
+from .coalesce import SingleFlight, default_single_flight
+from .metrics import QueryStats, StatsHook, emit_stats
+from .spill import ResultBudget, ResultSink
+from .writers import write_ipc, write_parquet
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .builder import LazyTable
+    from .convert import Dtypes
+    from .flightsql import PreparedStatement
+    from .procpool import EndpointProcessPool
+    from .shared import SharedResult
+
+# result types `query` can return
+QUERY_OUTPUTS = ('pandas', 'arrow')
+
+# upper bound on concurrent `do_get` streams when reading a multi-endpoint FlightInfo
+DEFAULT_MAX_WORKERS = min(32, (os.cpu_count() or 1) + 4)
+
+# record batches streamed queries receive ahead of their consumer on a background thread, 0 reads on demand
+DEFAULT_PREFETCH = 4
+
+# times a call, or the read of an endpoint stream, is retried after a transient error before giving up
+DEFAULT_RETRIES = 3
+
+# seconds the delay before the first retry is drawn from, doubling on every further retry up to MAX_RETRY_BACKOFF
+DEFAULT_RETRY_BACKOFF = 0.5
+MAX_RETRY_BACKOFF = 30.0
+
+# flight errors worth retrying: the server could not be reached, or dropped the call, e.g. while an executor restarts
+RETRYABLE_ERRORS = (flight.FlightUnavailableError,)
+
+# number of result schemas each client keeps, least recently used ones are dropped first
+SCHEMA_CACHE_SIZE = 1024
+
+# number of prepared statements each client keeps open, least recently used ones are closed first
+STATEMENT_CACHE_SIZE = 256
+
+# date/datetime column names, optionally mapped to their own output formats
+TsColumns = Union[str, Sequence[str], Mapping[str, Optional[str]]]
+ArrowData = TypeVar('ArrowData', pa.Table, pa.RecordBatch)
+
+
+def _ts_formats(ts_col: TsColumns, ts_format: Optional[str] = None) -> Dict[str, Optional[str]]:
+    """Normalize the `ts_col`/`ts_format` arguments to a column -> format mapping."""
+    if isinstance(ts_col, str):
+        return {ts_col: ts_format}
+    if isinstance(ts_col, Mapping):
+        return {column: column_format or ts_format for column, column_format in ts_col.items()}
+    return {column: ts_format for column in ts_col}
+
+
+# ISO formats arrow's cast to string produces directly, an order of magnitude faster than the strftime kernel
+_ISO_DATE_FORMAT = '%Y-%m-%d'
+_ISO_DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+def _split_microseconds(ts_format: str) -> List[str]:
+    """Split a strftime format on its `%f` directives, which arrow's strftime kernel does not support."""
+    parts, current, index = [], '', 0
+    while index < len(ts_format):
+        directive = ts_format[index : index + 2]
+        if directive == '%f':
+            parts.append(current)
+            current = ''
+        else:
+            # keep escaped percent signs (`%%`) and every other directive whole
+            current += directive if directive.startswith('%') else ts_format[index]
+        index += len(directive) if directive.startswith('%') else 1
+    parts.append(current)
+    return parts
+
+
+def _strftime_microseconds(column: Union[pa.Array, pa.ChunkedArray], column_type: pa.DataType, parts: List[str]):
+    """Format a date/timestamp column with a format holding `%f`, given as the format parts around each `%f`."""
+    import pyarrow.compute as pc
+
+    microseconds: Any = pa.scalar('000000')
+    if pa.types.is_timestamp(column_type) and column_type.unit != 's':
+        fraction = pc.subtract(column, pc.floor_temporal(column, unit='second'))
+        # nanoseconds are truncated, as pandas does
+        fraction = fraction.cast(pa.duration('us'), safe=False).cast(pa.int64()).cast(pa.string())
+        microseconds = pc.utf8_lpad(fraction, width=6, padding='0')
+    pieces: List[Any] = []
+    for part in parts:
+        if pieces:
+            pieces.append(microseconds)
+        pieces.append(_strftime(column, column_type, part))
+    return pc.binary_join_element_wise(*pieces, '')
+
+
+def _strftime(column: Union[pa.Array, pa.ChunkedArray], column_type: pa.DataType, ts_format: str):
+    """Format a date/timestamp column as strings, like `datetime.strftime` would."""
+    import pyarrow.compute as pc
+
+    parts = _split_microseconds(ts_format)
+    if len(parts) > 1:
+        return _strftime_microseconds(column, column_type, parts)
+    if pa.types.is_timestamp(column_type):
+        if column_type.tz is None and ts_format == _ISO_DATE_FORMAT:
+            return column.cast(pa.date32()).cast(pa.string())
+        if column_type.unit != 's':
+            # arrow renders sub-second units as fractional seconds for %S, floor to whole seconds first
+            column = pc.floor_temporal(column, unit='second').cast(pa.timestamp('s', tz=column_type.tz))
+        if column_type.tz is None and ts_format == _ISO_DATETIME_FORMAT:
+            return column.cast(pa.string())
+    elif ts_format == _ISO_DATE_FORMAT:
+        return column.cast(pa.string())
+    return pc.strftime(column, format=ts_format)
+
+
+def format_ts_columns(data: ArrowData, ts_formats: Mapping[str, Optional[str]]) -> ArrowData:
+    """Convert date/datetime columns of an arrow Table or RecordBatch to formatted strings!
+
+    The conversion runs the vectorized `pyarrow.compute.strftime` kernel on whole columns and detects \
+        column types from the arrow schema, so empty results and leading nulls are handled.
+
+    Args:
+        data: pa.Table or pa.RecordBatch
+            Arrow data holding the date/datetime columns
+        ts_formats: Mapping[str, Optional[str]]
+            Column name to strftime output format mapping
+
+    Returns:
+        data: pa.Table or pa.RecordBatch with the columns replaced by their string representation
+    """
+    schema = data.schema
+    columns = list(data.columns)
+    for ts_col, ts_format in ts_formats.items():
+        index = schema.get_field_index(ts_col)
+        if index == -1:
+            raise ValueError(
+                f'''
+            {ts_col} is not a valid column name in the dataframe!
+            ts_col parameter should be one of {schema.names}
+            '''
+            )
+        column_type = schema.field(index).type
+        if pa.types.is_timestamp(column_type) or pa.types.is_date(column_type):
+            if ts_format is None:
+                raise ValueError(
+                    "ts_format parameter is required when using ts_col to convert DateTime column to string!"
+                )
+        else:
+            raise TypeError(
+                f'''
+            {ts_col} column is of invalid type {column_type}.
+            Expected a valid timestamp, date or datetime type!
+            '''
+            )
+        columns[index] = _strftime(columns[index], column_type, ts_format)
+        schema = schema.set(index, pa.field(ts_col, pa.string()))
+    return type(data).from_arrays(columns, schema=schema)
+
 
 class DremioClientAuthMiddlewareFactory(flight.ClientMiddlewareFactory):
     """A factory that creates DremioClientAuthMiddleware(s)."""
@@ -71,13 +250,15 @@ class DremioClientAuthMiddleware(flight.ClientMiddleware):
         self.factory = factory
 
     def received_headers(self, headers):
-        """Extract tokens from request headers!"""
+        """Extract tokens from request headers!
+
+        The callback fires for both the leading headers and the trailers of a call. Only the leading \
+            headers carry the authorization header, so the trailers are ignored.
+        """
         auth_header_key = 'authorization'
         if auth_header_key in headers.keys():
             authorization_header = headers.get(auth_header_key)
-        else:
-            raise Exception('Did not receive authorization header back from server.')
-        self.factory.set_call_credential([b'authorization', authorization_header[0].encode("utf-8")])
+            self.factory.set_call_credential([b'authorization', authorization_header[0].encode("utf-8")])
 
 
 class DremioArrowClient:
@@ -89,6 +270,18 @@ class DremioArrowClient:
         port: Optional[str] = os.environ.get('DREMIO_FLIGHT_SERVER_PORT', '32010'),
         username: Optional[str] = os.environ.get('DREMIO_FLIGHT_SERVER_USERNAME', '<username>'),
         password: Optional[str] = os.environ.get('DREMIO_FLIGHT_SERVER_PASSWORD', '<password>'),
+        routing_tag: Optional[str] = None,
+        routing_queue: Optional[str] = None,
+        cache: Optional[ResultCache] = None,
+        stats_hooks: Optional[Sequence[StatsHook]] = None,
+        middleware: Optional[Sequence[flight.ClientMiddlewareFactory]] = None,
+        coalesce: Union[bool, SingleFlight] = False,
+        max_result_bytes: Optional[int] = None,
+        spill: Union[bool, str] = False,
+        timeout: Optional[float] = None,
+        process_pool: Union[bool, 'EndpointProcessPool'] = False,
+        retries: int = DEFAULT_RETRIES,
+        retry_backoff: float = DEFAULT_RETRY_BACKOFF,
     ):
         """Initialize Dremio Flight Client with authentication credentials!
 
@@ -103,6 +296,40 @@ class DremioArrowClient:
                 Dremio Flight Server username, defaults to DREMIO_FLIGHT_SERVER_USERNAME environment variable
             password: string
                 Dremio Flight Server password, defaults to DREMIO_FLIGHT_SERVER_PASSWORD environment variable
+            routing_tag: Optional[str]
+                Workload management routing tag used when authenticating, see `authenticate`
+            routing_queue: Optional[str]
+                Workload management routing queue used when authenticating, see `authenticate`
+            cache: Optional[ResultCache]
+                On-disk result cache consulted by `query` before running SQL on the server, disabled by default
+            stats_hooks: Optional[Sequence[Callable[[QueryStats], None]]]
+                Callables receiving the per-phase `QueryStats` of every query run by this client
+            middleware: Optional[Sequence[flight.ClientMiddlewareFactory]]
+                Extra flight client middleware installed next to `DremioClientAuthMiddlewareFactory`, \
+                    e.g. `RpcTimingMiddlewareFactory`
+            coalesce: Union[bool, SingleFlight]
+                Coalesce identical `query` calls in flight at the same time into a single Flight fetch, \
+                    sharing its arrow result. True uses the process-wide `default_single_flight` group, \
+                    defaults to False.
+            max_result_bytes: Optional[int]
+                Default memory budget of `query` results, in bytes of arrow data, see `query`. Unlimited by default.
+            spill: Union[bool, str]
+                Default `query` behaviour past `max_result_bytes`: False fails the query with a MemoryError, \
+                    True spills the result to the temporary directory, a path spills into that directory.
+            timeout: Optional[float]
+                Default seconds a query may take, from planning to its last record batch, see `query`. \
+                    No timeout by default.
+            process_pool: Union[bool, EndpointProcessPool]
+                Read the endpoints of `query` results in worker processes, which also format `ts_col` columns, \
+                    instead of threads of this process. True uses the process-wide `default_process_pool`, \
+                    defaults to False.
+            retries: int
+                Times a call failing with a transient error (FlightUnavailableError) is retried, \
+                    defaults to DEFAULT_RETRIES. Endpoint streams failing part way are read again on their own, \
+                    see `read_endpoint`. 0 disables retries.
+            retry_backoff: float
+                Seconds the random delay before the first retry is drawn from, doubling on every further retry \
+                    up to MAX_RETRY_BACKOFF, defaults to DEFAULT_RETRY_BACKOFF
         """
         # ensure the client was initialized with valid arguments
         if host is None:
@@ -113,10 +340,43 @@ class DremioArrowClient:
             raise ValueError("A valid dremio server account username is required!")
         if password is None or password == "<password>":
             raise ValueError("A valid dremio server account password is required!")
+        if retries < 0:
+            raise ValueError("retries must not be negative!")
         self.host = host
         self.port = port
         self.username = username
         self.password = password
+        self.routing_tag = routing_tag
+        self.routing_queue = routing_queue
+        self.cache = cache
+        self.stats_hooks: List[StatsHook] = list(stats_hooks or [])
+        self.middleware: List[flight.ClientMiddlewareFactory] = list(middleware or [])
+        self.single_flight: Optional[SingleFlight] = default_single_flight if coalesce is True else coalesce or None
+        self.max_result_bytes = max_result_bytes
+        self.spill = spill
+        self.timeout = timeout
+        self.process_pool = process_pool
+        self.retries = retries
+        self.retry_backoff = retry_backoff
+        # guards lazy client creation and session token renewal shared by concurrent queries
+        self._lock = threading.Lock()
+        # normalized SQL -> result schema, filled by `get_schema` and by every planned query
+        self._schemas: 'OrderedDict[str, pa.Schema]' = OrderedDict()
+        self._schemas_lock = threading.Lock()
+        # normalized SQL -> prepared statement of this client's session, filled by `prepare`
+        self._statements: 'OrderedDict[str, PreparedStatement]' = OrderedDict()
+        self._statements_lock = threading.Lock()
+
+    def _connection_key(self) -> Tuple[str, ...]:
+        """Identify the server, account and workload queue this client's sessions are bound to."""
+        return (
+            self.host,
+            str(self.port),
+            self.username,
+            hashlib.sha256(self.password.encode('utf-8')).hexdigest(),
+            self.routing_tag or '',
+            self.routing_queue or '',
+        )
 
     def create_flight_client(self, scheme: str = "grpc+tcp", connection_args: dict = {}):
         """Create a Dremio Flight Client!
@@ -130,10 +390,24 @@ class DremioArrowClient:
         Action:
             Creates a dremio flight client capable of negotiating request methods!
         """
+        # kept for worker processes opening their own connection, see `EndpointProcessPool`
+        self._location = f"{scheme}://{self.host}:{self.port}"
+        self._connection_args = dict(connection_args)
         self.client = flight.FlightClient(
-            f"{scheme}://{self.host}:{self.port}", middleware=[DremioClientAuthMiddlewareFactory()], **connection_args
+            self._location,
+            middleware=[DremioClientAuthMiddlewareFactory(), *self.middleware],
+            **connection_args,
         )
 
+    def add_stats_hook(self, hook: StatsHook):
+        """Register a callable receiving the per-phase `QueryStats` of every query run by this client!
+
+        Args:
+            hook: Callable[[QueryStats], None]
+                Called once per query, after it completes or fails. Exceptions it raises are turned into warnings.
+        """
+        self.stats_hooks.append(hook)
+
     def authenticate(self, routing_tag: Optional[str] = None, routing_queue: Optional[str] = None):
         """Generate Dremio Flight Server Authentication Token!
 
@@ -147,96 +421,1056 @@ class DremioArrowClient:
 
         For dremio community edition, these settings are not useful. The default settings are sensible enough.
         Read https://docs.dremio.com/software/advanced-administration/job-queues/ for more details.
+        When not provided, the settings the client was initialized with are used.
 
         Action:
             Sets client access token that can be used to query flight server!
 
         """
+        routing_tag = routing_tag if routing_tag is not None else self.routing_tag
+        routing_queue = routing_queue if routing_queue is not None else self.routing_queue
         headers = []
         if routing_tag is not None and routing_queue is not None:
             headers = [(b'routing-tag', str.encode(routing_tag)), (b'routing-queue', str.encode(routing_queue))]
         initial_options = flight.FlightCallOptions(headers=headers)
 
-        try:
-            # Authenticate user session.
-            token = self.client.authenticate_basic_token(self.username, self.password, initial_options)
-        except flight.FlightUnavailableError as err:
-            raise ConnectionError(f'Server connection failed with Error: {err}')
-        except flight.FlightUnauthenticatedError as err:
-            raise ConnectionError(f"Failed to authenticate user account with Error: {err}")
-        else:
-            self.flight_options = flight.FlightCallOptions(headers=[token])
+        for attempt in range(self.retries + 1):
+            try:
+                # Authenticate user session.
+                token = self.client.authenticate_basic_token(self.username, self.password, initial_options)
+            except flight.FlightUnavailableError as err:
+                if attempt == self.retries:
+                    raise ConnectionError(f'Server connection failed with Error: {err}')
+                self._backoff(attempt)
+            except flight.FlightUnauthenticatedError as err:
+                raise ConnectionError(f"Failed to authenticate user account with Error: {err}")
+            else:
+                self._session_headers = [token]
+                self.flight_options = flight.FlightCallOptions(headers=self._session_headers)
+                # keep the workload settings so an expired session token can be renewed on the same queue
+                self.routing_tag, self.routing_queue = routing_tag, routing_queue
+                return
+
+    def _call(self, method: Callable[..., Any], *args: Any, deadline: Optional[float] = None) -> Any:
+        """Invoke a flight client method with the session call options.
+
+        Dremio session tokens expire; when the server rejects the bearer token, the handshake is \
+            re-run once and the call replayed with the renewed token. Transient errors are retried up to \
+            `retries` times, after a jittered backoff. With a `deadline`, the call gets the time left until \
+            then as its gRPC timeout, which also bounds the streams it returns.
+        """
+        attempt = 0
+        while True:
+            options = self.flight_options
+            try:
+                try:
+                    return method(*args, self._deadline_options(options, deadline))
+                except flight.FlightUnauthenticatedError:
+                    self._renew_session(options)
+                    return method(*args, self._deadline_options(self.flight_options, deadline))
+            except flight.FlightTimedOutError as error:
+                raise TimeoutError(f"Query exceeded its timeout: {error}")
+            except RETRYABLE_ERRORS:
+                if attempt >= self.retries:
+                    raise
+                self._backoff(attempt, deadline)
+                attempt += 1
+
+    def _backoff(self, attempt: int, deadline: Optional[float] = None):
+        """Sleep before retry number `attempt` (from 0), a random delay up to an exponentially growing bound.
+
+        Randomizing the whole delay spreads the retries of concurrent streams failing together, e.g. when \
+            an executor restarts, instead of sending them back to the server at once. A TimeoutError is raised \
+            right away when the delay would run past the `time.monotonic` deadline of the query.
+        """
+        delay = random.uniform(0, min(MAX_RETRY_BACKOFF, self.retry_backoff * 2**attempt))
+        if deadline is not None and time.monotonic() + delay >= deadline:
+            raise TimeoutError("Query exceeded its timeout!")
+        time.sleep(delay)
 
-    def retrieve_ticket(self, sql: str):
+    def _deadline_options(
+        self, options: flight.FlightCallOptions, deadline: Optional[float]
+    ) -> flight.FlightCallOptions:
+        """Session call options with the time left until a `time.monotonic` deadline as timeout."""
+        if deadline is None:
+            return options
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise TimeoutError("Query exceeded its timeout!")
+        return flight.FlightCallOptions(headers=self._session_headers, timeout=remaining)
+
+    def _deadline(self, timeout: Optional[float]) -> Optional[float]:
+        """The `time.monotonic` deadline of a query starting now, None without a timeout."""
+        timeout = timeout if timeout is not None else self.timeout
+        if timeout is None:
+            return None
+        if timeout <= 0:
+            raise ValueError("timeout must be positive!")
+        return time.monotonic() + timeout
+
+    def _renew_session(self, options: flight.FlightCallOptions):
+        """Re-run the handshake after the server rejected the session token of `options`."""
+        with self._lock:
+            # concurrent calls fail together on an expired token, only the first one renews it
+            if self.flight_options is options:
+                self.authenticate()
+
+    def retrieve_ticket(self, sql: str, deadline: Optional[float] = None) -> flight.FlightInfo:
         """Get Dremio Flight Info!
 
         Args:
             sql: str
                 SQL query to run on Dremio Flight Server
+            deadline: Optional[float]
+                `time.monotonic` time the query must complete by, raising a TimeoutError past it
 
         Action:
-            Generates a FlightInfo message to retrieve the Ticket corresponding to query result set
+            Generates a FlightInfo message to retrieve the Ticket corresponding to query result set. \
+                The message is also kept as `ticket_info`, the most recent ticket retrieved by this client.
+
+        Returns:
+            ticket_info: flight.FlightInfo
         """
         try:
-            self.ticket_info = self.client.get_flight_info(
-                flight.FlightDescriptor.for_command(sql), self.flight_options
-            )
+            descriptor = flight.FlightDescriptor.for_command(sql)
+            ticket_info = self._call(self.client.get_flight_info, descriptor, deadline=deadline)
+        except (ConnectionError, TimeoutError):
+            # session renewal failed or the query ran out of time, this is not a problem with the SQL query
+            raise
         except Exception as error:
             raise SyntaxError(f"Failed to retrieve flight ticket info: {error}")
+        # queries only use the returned ticket, the attribute is not safe to read back under concurrency
+        self.ticket_info = ticket_info
+        self._remember_schema(sql, ticket_info.schema)
+        return ticket_info
 
-    def query(self, sql: str, ts_col: Optional[str] = None, ts_format: Optional[str] = None) -> pd.DataFrame:
-        """Execute SQL command against Dremio Arrow Flight Server!
+    def _remember_schema(self, sql: str, schema: pa.Schema):
+        """Keep a query result schema in the per-client schema cache."""
+        key = normalize_sql(sql)
+        with self._schemas_lock:
+            self._schemas[key] = schema
+            self._schemas.move_to_end(key)
+            while len(self._schemas) > SCHEMA_CACHE_SIZE:
+                self._schemas.popitem(last=False)
+
+    def get_schema(self, sql: str, refresh: bool = False) -> pa.Schema:
+        """Get the result schema of a SQL query without running it!
+
+        Uses the flight GetSchema call, falling back to the FlightInfo schema when the server does not \
+            implement it. Either way no data is transferred. Schemas are cached per client, keyed on the \
+            normalized SQL text, and every query run by this client also caches its result schema.
+
+        Args:
+            sql: str
+                SQL query string
+            refresh: bool
+                Ignore the cached schema and ask the server again, e.g. after the dataset changed
+
+        Returns:
+            schema: pa.Schema
+        """
+        if not refresh:
+            with self._schemas_lock:
+                schema = self._schemas.get(normalize_sql(sql))
+            if schema is not None:
+                return schema
+        self._ensure_client()
+        descriptor = flight.FlightDescriptor.for_command(sql)
+        try:
+            try:
+                schema = self._call(self.client.get_schema, descriptor).schema
+            except flight.FlightUnimplementedError:
+                schema = self._call(self.client.get_flight_info, descriptor).schema
+        except ConnectionError:
+            raise
+        except Exception as error:
+            raise SyntaxError(f"Failed to retrieve query schema: {error}")
+        self._remember_schema(sql, schema)
+        return schema
+
+    def table(self, table: Union[str, Sequence[str]]) -> 'LazyTable':
+        """Start a lazily built query on a Dremio table, pushing projections, filters and aggregations to Dremio!
+
+        Chained `select`, `filter`, `aggregate`, `order_by` and `limit` calls compile to a single SQL statement, \
+            which only runs when the table is materialized with `collect`, `head` or `batches`.
+
+        Args:
+            table: Union[str, Sequence[str]]
+                Dremio table path, either as SQL text (e.g. `space.folder.dataset`) or a sequence of \
+                    unquoted path components (e.g. `['space', 'folder', 'dataset']`)
+
+        Returns:
+            table: LazyTable
+        """
+        from .builder import LazyTable
+
+        return LazyTable(self, table)
+
+    def prepare(self, sql: str) -> 'PreparedStatement':
+        """Prepare a parameterized SQL query with Arrow Flight SQL, planning it once for many executions!
+
+        Parameters are `?` placeholders, bound as Arrow data on each `PreparedStatement.execute` instead of being \
+            formatted into the SQL text. Statements are cached per client session, keyed on the normalized SQL \
+            text: preparing the same query again returns the open statement. Statements are prepared again \
+            transparently after the session token is renewed.
+
+        Args:
+            sql: str
+                SQL query string, e.g. `SELECT * FROM trips WHERE vendor = ? AND fare_amount > ?`
+
+        Returns:
+            statement: PreparedStatement
+        """
+        from .flightsql import PreparedStatement
+
+        key = normalize_sql(sql)
+        with self._statements_lock:
+            statement = self._statements.get(key)
+            if statement is not None:
+                self._statements.move_to_end(key)
+                return statement
+        statement = PreparedStatement(self, sql)
+        statement.prepare()
+        evicted = []
+        with self._statements_lock:
+            # another thread may have prepared the same query meanwhile, keep a single handle
+            current = self._statements.setdefault(key, statement)
+            if current is not statement:
+                evicted.append(statement)
+            self._statements.move_to_end(key)
+            while len(self._statements) > STATEMENT_CACHE_SIZE:
+                evicted.append(self._statements.popitem(last=False)[1])
+        for stale in evicted:
+            stale.close()
+        return current
+
+    def close_statements(self):
+        """Release the server handles of every prepared statement cached by this client."""
+        with self._statements_lock:
+            statements = list(self._statements.values())
+            self._statements.clear()
+        for statement in statements:
+            statement.close()
+
+    def _ensure_client(self, stats: Optional[QueryStats] = None):
+        """Create the flight client and authenticate the user session on first use."""
+        if hasattr(self, 'flight_options'):
+            return
+        with self._lock, stats.phase('connect') if stats is not None else nullcontext():
+            if not hasattr(self, 'client'):
+                self.create_flight_client()
+            if not hasattr(self, 'flight_options'):
+                # authenticate user session
+                self.authenticate()
+
+    def read_endpoint(
+        self,
+        endpoint: flight.FlightEndpoint,
+        stats: Optional[QueryStats] = None,
+        budget: Optional[ResultBudget] = None,
+        deadline: Optional[float] = None,
+    ) -> pa.Table:
+        """Read the complete record batch stream behind a single FlightInfo endpoint.
+
+        A stream failing part way with a transient error is read again from its start, up to `retries` times, \
+            and a stream rejecting an expired session token once more after renewing it. Only this endpoint \
+            is read again: the other endpoints of the query keep the batches they received.
+
+        Args:
+            endpoint: flight.FlightEndpoint
+                One of the endpoints listed in the FlightInfo returned by `retrieve_ticket`
+            stats: Optional[QueryStats]
+                Query stats counting the received batches
+            budget: Optional[ResultBudget]
+                Memory budget shared by the streams of the query, unlimited when None
+            deadline: Optional[float]
+                `time.monotonic` time the stream must be read by, raising a TimeoutError past it
+
+        Returns:
+            table: pa.Table
+        """
+        attempt, renewed = 0, False
+        while True:
+            options = self.flight_options
+            reader: Optional[flight.FlightStreamReader] = None
+            sink: Optional[ResultSink] = None
+            rows = batches = nbytes = 0
+            try:
+                reader = self.client.do_get(endpoint.ticket, self._deadline_options(options, deadline))
+                sink = ResultSink(reader.schema, budget)
+                for chunk in reader:
+                    rows, batches, nbytes = rows + chunk.data.num_rows, batches + 1, nbytes + chunk.data.nbytes
+                    if stats is not None:
+                        stats.add_batch(chunk.data)
+                    sink.add(chunk.data)
+                return sink.table()
+            except BaseException as error:
+                if sink is not None:
+                    sink.discard()
+                if reader is not None:
+                    # stop the server from sending the rest of the stream
+                    reader.cancel()
+                if isinstance(error, flight.FlightTimedOutError):
+                    raise TimeoutError(f"Query exceeded its timeout: {error}")
+                if isinstance(error, flight.FlightUnauthenticatedError) and not renewed:
+                    # the session token expired during a long transfer
+                    self._renew_session(options)
+                    renewed = True
+                elif isinstance(error, RETRYABLE_ERRORS) and attempt < self.retries:
+                    self._backoff(attempt, deadline)
+                    attempt += 1
+                else:
+                    raise
+            if stats is not None:
+                stats.add_retry(rows, batches, nbytes)
+
+    def read_endpoints(
+        self,
+        ticket_info: flight.FlightInfo,
+        max_workers: Optional[int] = None,
+        preserve_order: bool = True,
+        stats: Optional[QueryStats] = None,
+        budget: Optional[ResultBudget] = None,
+        deadline: Optional[float] = None,
+    ) -> pa.Table:
+        """Read every endpoint of a FlightInfo, each on its own `do_get` stream, and merge the results.
+
+        Dremio may split a result set across several endpoints (one per executor). Reading only the first \
+            endpoint silently drops the other partitions, so all of them are fetched through a bounded thread pool.
+
+        Args:
+            ticket_info: flight.FlightInfo
+                FlightInfo message returned by `retrieve_ticket`
+            max_workers: Optional[int]
+                Maximum number of concurrent `do_get` streams, defaults to DEFAULT_MAX_WORKERS
+            preserve_order: bool
+                Concatenate endpoint results in the order listed by the server (default). \
+                    When False, results are concatenated in the order the streams complete.
+            stats: Optional[QueryStats]
+                Query stats counting the received batches
+            budget: Optional[ResultBudget]
+                Memory budget shared by the endpoint streams, unlimited when None
+            deadline: Optional[float]
+                `time.monotonic` time the streams must be read by, raising a TimeoutError past it
+
+        Returns:
+            table: pa.Table
+        """
+        endpoints = ticket_info.endpoints
+        if len(endpoints) == 0:
+            return ticket_info.schema.empty_table()
+        if len(endpoints) == 1:
+            return self.read_endpoint(endpoints[0], stats, budget, deadline)
+        tables: List[pa.Table] = []
+        workers = min(len(endpoints), max_workers or DEFAULT_MAX_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dremioarrow-endpoint') as pool:
+            futures = [pool.submit(self.read_endpoint, endpoint, stats, budget, deadline) for endpoint in endpoints]
+            if preserve_order:
+                tables = [future.result() for future in futures]
+            else:
+                tables = [future.result() for future in as_completed(futures)]
+        return pa.concat_tables(tables)
+
+    def query_batches(
+        self,
+        sql: str,
+        as_pandas: bool = False,
+        ts_col: Optional[TsColumns] = None,
+        ts_format: Optional[str] = None,
+        dtypes: Optional['Dtypes'] = None,
+        dtype_backend: Optional[str] = None,
+        prefetch: int = DEFAULT_PREFETCH,
+        timeout: Optional[float] = None,
+    ) -> Generator[Union[pa.RecordBatch, 'pd.DataFrame'], None, None]:
+        """Execute SQL command and yield the result set batch by batch as it arrives from the server!
+
+        Unlike `query`, the full result set is never held in memory: only the batch being consumed and \
+            the `prefetch` batches received ahead of it are. Endpoints are streamed one after another, \
+            in the order listed by the server.
 
         Args:
             sql: str
                 SQL query string to run on Dremio Engine
-            ts_col: Optional[str]
-                Date/DateTime column name. Useful for data conversions when fetching data for use in R environment.
+            as_pandas: bool
+                Yield each record batch converted to a pandas DataFrame, defaults to False
+            ts_col: Optional[str, Sequence[str], Mapping[str, str]]
+                Date/DateTime column name(s) converted to strings in every batch, see `query`
             ts_format: Optional[str]
-                Date/DateTime column output format. The ts_col data is converted to ts_format string. \
-                    This can later be converted to R Timestamp data objects from the char type!
+                Date/DateTime column output format, see `query`
+            dtypes: Optional[Mapping[str, Any]]
+                Explicit pandas dtypes of the `as_pandas` chunks, see `query`
+            dtype_backend: Optional[str]
+                Pandas dtype backend of the `as_pandas` chunks, see `query`
+            prefetch: int
+                Record batches received on a background thread while earlier ones are converted or consumed, \
+                    defaults to DEFAULT_PREFETCH. 0 reads each batch only when it is requested.
+            timeout: Optional[float]
+                Seconds the query may take, see `query`. Time spent consuming the batches counts towards it.
+
+        Yields:
+            batch: pa.RecordBatch or pd.DataFrame
+        """
+        _, batches = self._stream_batches(sql, ts_col=ts_col, ts_format=ts_format, prefetch=prefetch, timeout=timeout)
+        for batch in batches:
+            if not as_pandas:
+                yield batch
+            elif dtypes or dtype_backend:
+                from .convert import to_pandas
+
+                yield to_pandas(pa.Table.from_batches([batch]), dtypes, dtype_backend=dtype_backend)
+            else:
+                yield batch.to_pandas()
+
+    def _stream_batches(
+        self,
+        sql: str,
+        ts_col: Optional[TsColumns] = None,
+        ts_format: Optional[str] = None,
+        prefetch: int = DEFAULT_PREFETCH,
+        timeout: Optional[float] = None,
+    ) -> Tuple[pa.Schema, Generator[pa.RecordBatch, None, None]]:
+        """Retrieve the query ticket and return the result schema along with a lazy record batch stream.
+
+        The `timeout` defaults to the client `timeout` and covers planning as well as reading the stream.
+        """
+        ts_formats = _ts_formats(ts_col, ts_format) if ts_col is not None else None
+        deadline = self._deadline(timeout)
+        stats = QueryStats(sql)
+        try:
+            self._ensure_client(stats)
+            with stats.phase('plan'):
+                ticket_info = self.retrieve_ticket(sql, deadline=deadline)
+            schema = ticket_info.schema
+            if ts_formats is not None:
+                schema = format_ts_columns(schema.empty_table(), ts_formats).schema
+        except Exception as error:
+            self._finish_stats(stats, error)
+            raise
+        batches = self._read_batches(ticket_info.endpoints, ts_formats, stats, prefetch=prefetch, deadline=deadline)
+        return schema, batches
+
+    def _read_batches(
+        self,
+        endpoints: Sequence[flight.FlightEndpoint],
+        ts_formats: Optional[Mapping[str, Optional[str]]],
+        stats: QueryStats,
+        prefetch: int = 0,
+        deadline: Optional[float] = None,
+    ) -> Generator[pa.RecordBatch, None, None]:
+        """Stream the record batches of each endpoint in turn, formatting date/datetime columns on the fly.
+
+        With `prefetch`, batches are received and formatted on a background thread, up to `prefetch` batches \
+            ahead of the consumer. The transfer phase of streamed queries includes the time the consumer spends \
+            on each batch.
+        """
+        stats.endpoints = len(endpoints)
+        stats.start_transfer()
+        # the stream being received, cancelled when the consumer bails out early
+        current: List[flight.FlightStreamReader] = []
+
+        def receive() -> Iterator[pa.RecordBatch]:
+            for endpoint in endpoints:
+                try:
+                    reader = self._call(self.client.do_get, endpoint.ticket, deadline=deadline)
+                except TimeoutError:
+                    raise
+                except Exception as error:
+                    raise Exception(f"Failed to read query results from Dremio: {error}")
+                current[:] = [reader]
+                try:
+                    for chunk in reader:
+                        stats.add_batch(chunk.data)
+                        yield chunk.data if ts_formats is None else format_ts_columns(chunk.data, ts_formats)
+                except flight.FlightTimedOutError as error:
+                    raise TimeoutError(f"Query exceeded its timeout: {error}")
+                finally:
+                    # stop the server from sending the rest of the stream when the consumer bails out early
+                    reader.cancel()
+
+        def cancel():
+            for reader in current:
+                reader.cancel()
+
+        batches = receive() if prefetch <= 0 else read_ahead(receive(), prefetch, cancel=cancel)
+        failure: Optional[BaseException] = None
+        try:
+            yield from batches
+        except Exception as error:
+            failure = error
+            raise
+        finally:
+            stats.end_transfer()
+            self._finish_stats(stats, failure)
+
+    def _finish_stats(self, stats: QueryStats, error: Optional[BaseException] = None):
+        """Complete query stats and hand them to the stats hooks."""
+        stats.finish(error)
+        emit_stats(self.stats_hooks, stats)
+
+    def query_to_parquet(
+        self,
+        sql: str,
+        path: str,
+        row_group_size: Optional[int] = None,
+        compression: Optional[str] = 'snappy',
+        partition_cols: Optional[Sequence[str]] = None,
+        ts_col: Optional[TsColumns] = None,
+        ts_format: Optional[str] = None,
+        prefetch: int = DEFAULT_PREFETCH,
+    ) -> int:
+        """Execute SQL command and stream the result set straight into a Parquet file or dataset!
+
+        Record batches are written as they arrive from the server; no pandas DataFrame is built and \
+            memory stays bounded by the row group size.
+
+        Args:
+            sql: str
+                SQL query string to run on Dremio Engine
+            path: str
+                Output Parquet file, or dataset directory when `partition_cols` is set
+            row_group_size: Optional[int]
+                Maximum number of rows per row group, defaults to pyarrow's default
+            compression: Optional[str]
+                Compression codec, e.g. snappy, zstd, gzip or None, defaults to snappy
+            partition_cols: Optional[Sequence[str]]
+                Columns to partition a hive-style dataset directory by
+            ts_col: Optional[str, Sequence[str], Mapping[str, str]]
+                Date/DateTime column name(s) converted to strings before writing, see `query`
+            ts_format: Optional[str]
+                Date/DateTime column output format, see `query`
+            prefetch: int
+                Record batches received ahead of the writer on a background thread, see `query_batches`
+
         Returns:
-            data: pd.DataFrame
+            rows: int number of rows written
         """
+        schema, batches = self._stream_batches(sql, ts_col=ts_col, ts_format=ts_format, prefetch=prefetch)
+        return write_parquet(
+            batches,
+            path,
+            schema,
+            row_group_size=row_group_size,
+            compression=compression,
+            partition_cols=partition_cols,
+        )
+
+    def query_to_ipc(
+        self,
+        sql: str,
+        path: str,
+        compression: Optional[str] = None,
+        ts_col: Optional[TsColumns] = None,
+        ts_format: Optional[str] = None,
+        prefetch: int = DEFAULT_PREFETCH,
+    ) -> int:
+        """Execute SQL command and stream the result set straight into an Arrow IPC (Feather v2) file!
+
+        Args:
+            sql: str
+                SQL query string to run on Dremio Engine
+            path: str
+                Output Arrow IPC file
+            compression: Optional[str]
+                Buffer compression codec, lz4 or zstd, defaults to None (uncompressed, memory-mappable)
+            ts_col: Optional[str, Sequence[str], Mapping[str, str]]
+                Date/DateTime column name(s) converted to strings before writing, see `query`
+            ts_format: Optional[str]
+                Date/DateTime column output format, see `query`
+            prefetch: int
+                Record batches received ahead of the writer on a background thread, see `query_batches`
+
+        Returns:
+            rows: int number of rows written
+        """
+        schema, batches = self._stream_batches(sql, ts_col=ts_col, ts_format=ts_format, prefetch=prefetch)
+        return write_ipc(batches, path, schema, compression=compression)
+
+    def query_shared(
+        self,
+        sql: str,
+        directory: Optional[str] = None,
+        ts_col: Optional[TsColumns] = None,
+        ts_format: Optional[str] = None,
+        prefetch: int = DEFAULT_PREFETCH,
+    ) -> 'SharedResult':
+        """Execute SQL command once and store the result set in shared memory for other processes!
+
+        The result set is streamed into an uncompressed Arrow IPC segment, by default on `/dev/shm`. \
+            The returned handle is picklable: worker processes attach to it and open the result zero-copy, \
+            and the last process to release its reference removes the segment.
+
+        Args:
+            sql: str
+                SQL query string to run on Dremio Engine
+            directory: Optional[str]
+                Segment directory, defaults to shared memory (`/dev/shm`) or the temporary directory
+            ts_col: Optional[str, Sequence[str], Mapping[str, str]]
+                Date/DateTime column name(s) converted to strings before writing, see `query`
+            ts_format: Optional[str]
+                Date/DateTime column output format, see `query`
+            prefetch: int
+                Record batches received ahead of the writer on a background thread, see `query_batches`
+
+        Returns:
+            handle: SharedResult attached by the calling process
+        """
+        from .shared import SharedResult
+
+        schema, batches = self._stream_batches(sql, ts_col=ts_col, ts_format=ts_format, prefetch=prefetch)
+        return SharedResult.create(batches, schema, directory=directory)
+
+    def sync_table(
+        self,
+        table: Union[str, Sequence[str]],
+        column: str,
+        directory: str,
+        format: str = 'parquet',
+        **kwargs: Any,
+    ) -> int:
+        """Append the rows of a Dremio table past the stored high-water mark to a local dataset directory!
+
+        Only the delta since the previous sync is queried: the largest `column` value synced so far is stored in \
+            the directory, and rows past it are appended as a new data file.
+
+        Args:
+            table: Union[str, Sequence[str]]
+                Dremio table path, either as SQL text or a sequence of unquoted path components
+            column: str
+                Monotonically increasing timestamp, date or ID column of the table
+            directory: str
+                Local dataset directory, created when missing
+            format: str
+                Data file format, parquet (default) or arrow (Arrow IPC)
+            kwargs: Any
+                Extra `dremioarrow.sync.sync_table` arguments, e.g. columns, start_after, compression \
+                    or partition_cols
+
+        Returns:
+            rows: int number of rows appended
+        """
+        from .sync import sync_table
+
+        return sync_table(self, table, column, directory, format=format, **kwargs)
+
+    def _fetch_table(
+        self,
+        sql: str,
+        max_workers: Optional[int] = None,
+        preserve_order: bool = True,
+        cache_ttl: Optional[float] = None,
+        stats: Optional[QueryStats] = None,
+        partitions: Optional[Sequence[str]] = None,
+        budget: Optional[ResultBudget] = None,
+        deadline: Optional[float] = None,
+        process_pool: Optional['EndpointProcessPool'] = None,
+        ts_formats: Optional[Mapping[str, Optional[str]]] = None,
+    ) -> pa.Table:
+        """Run SQL on the server, or serve it from the result cache, and return the arrow result set.
+
+        When `partitions` holds range-partitioned rewrites of the SQL, they run concurrently instead. \
+            Cached results are memory-mapped, they are not charged to the `budget`. Date/datetime columns \
+            of `ts_formats` are formatted while reading, e.g. by the workers of a `process_pool`.
+        """
+        stats = stats if stats is not None else QueryStats(sql)
+        sqls = list(partitions) if partitions else [sql]
+        cache, key = self.cache, ''
+        if cache is not None:
+            formats = [repr(sorted(ts_formats.items()))] if ts_formats else []
+            key = cache_key('\n'.join(sqls), (*self._connection_key(), *formats))
+            table = cache.get(key)
+            if table is not None:
+                stats.cache_hit = True
+                stats.rows, stats.bytes = table.num_rows, table.nbytes
+                return table
         # create arrow flight client only if it's first time
-        if not hasattr(self, 'client'):
-            self.create_flight_client()
-            # authenticate user session
-            self.authenticate()
+        self._ensure_client(stats)
+        if len(sqls) > 1:
+            table = self._fetch_partitions(
+                sqls,
+                max_workers=max_workers,
+                preserve_order=preserve_order,
+                stats=stats,
+                budget=budget,
+                deadline=deadline,
+                process_pool=process_pool,
+                ts_formats=ts_formats,
+            )
+            if cache is not None:
+                cache.put(key, table, ttl=cache_ttl)
+            return table
         # generate flight ticket
-        self.retrieve_ticket(sql)
+        with stats.phase('plan'):
+            ticket_info = self.retrieve_ticket(sql, deadline=deadline)
+        stats.endpoints = len(ticket_info.endpoints)
+        stats.start_transfer()
         try:
-            # Retrieve the result set as a stream of Arrow record batches.
-            reader = self.client.do_get(self.ticket_info.endpoints[0].ticket, self.flight_options)
+            # Retrieve the result set of every endpoint as streams of Arrow record batches.
+            table = self._read_result(
+                ticket_info, max_workers, preserve_order, stats, budget, deadline, process_pool, ts_formats
+            )
+        finally:
+            stats.end_transfer()
+            if budget is not None:
+                stats.spilled_bytes = budget.spilled
+        if cache is not None:
+            cache.put(key, table, ttl=cache_ttl)
+        return table
+
+    def _read_result(
+        self,
+        ticket_info: flight.FlightInfo,
+        max_workers: Optional[int],
+        preserve_order: bool,
+        stats: QueryStats,
+        budget: Optional[ResultBudget],
+        deadline: Optional[float],
+        process_pool: Optional['EndpointProcessPool'],
+        ts_formats: Optional[Mapping[str, Optional[str]]],
+    ) -> pa.Table:
+        """Read the endpoints of a planned query, with threads of this process or in a process pool."""
+        if ts_formats:
+            # invalid ts_col arguments fail before anything is read
+            format_ts_columns(ticket_info.schema.empty_table(), ts_formats)
+        try:
+            if process_pool is not None:
+                return process_pool.read_endpoints(
+                    self, ticket_info, ts_formats, preserve_order=preserve_order, stats=stats, deadline=deadline
+                )
+            table = self.read_endpoints(
+                ticket_info,
+                max_workers=max_workers,
+                preserve_order=preserve_order,
+                stats=stats,
+                budget=budget,
+                deadline=deadline,
+            )
+        except (MemoryError, TimeoutError):
+            raise
         except Exception as error:
             raise Exception(f"Failed to read query results from Dremio: {error}")
-        else:
-            # convert arrow flight bytes stream to pandas dataframe
-            df: pd.DataFrame = reader.read_pandas()
-            # if ts_col and ts_format are defined, transform data types
-            if ts_col is not None:
-                if ts_col not in df.columns:
-                    raise ValueError(
-                        f'''
-                    {ts_col} is not a valid column name in the dataframe!
-                    ts_col parameter should be one of {list(df.columns)}
-                    '''
-                    )
-                elif type(df[ts_col].iloc[0]) == pd.Timestamp or type(df[ts_col].iloc[0]) == date:
-                    if ts_format is not None:
-                        df[ts_col] = df[ts_col].apply(lambda ts: ts.strftime(ts_format))
-                    else:
-                        raise ValueError(
-                            "ts_format parameter is required when using ts_col to convert DateTime column to string!"
-                        )
-                else:
-                    raise TypeError(
-                        f'''
-                    {ts_col} column is of invalid type {type(df[ts_col].iloc[0])}.
-                    Expected a valid pandas.Timestamp, date or datetime type!
-                    '''
-                    )
-            return df
+        return format_ts_columns(table, ts_formats) if ts_formats else table
+
+    def _fetch_partitions(
+        self,
+        sqls: Sequence[str],
+        max_workers: Optional[int],
+        preserve_order: bool,
+        stats: QueryStats,
+        budget: Optional[ResultBudget] = None,
+        deadline: Optional[float] = None,
+        process_pool: Optional['EndpointProcessPool'] = None,
+        ts_formats: Optional[Mapping[str, Optional[str]]] = None,
+    ) -> pa.Table:
+        """Plan and read range-partitioned queries concurrently, each one a separate Dremio job.
+
+        Partitions share the worker budget: each partition reads its own endpoints one at a time.
+        """
+
+        def fetch(partition_sql: str) -> Tuple[pa.Table, int]:
+            with stats.phase('plan'):
+                ticket_info = self.retrieve_ticket(partition_sql, deadline=deadline)
+            table = self._read_result(ticket_info, 1, True, stats, budget, deadline, process_pool, ts_formats)
+            return table, len(ticket_info.endpoints)
+
+        workers = min(len(sqls), max_workers or DEFAULT_MAX_WORKERS)
+        stats.start_transfer()
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dremioarrow-partition') as pool:
+                futures = [pool.submit(fetch, partition_sql) for partition_sql in sqls]
+                results = [future.result() for future in (futures if preserve_order else as_completed(futures))]
+        finally:
+            stats.end_transfer()
+            if budget is not None:
+                stats.spilled_bytes = budget.spilled
+        stats.endpoints = sum(endpoints for _, endpoints in results)
+        return pa.concat_tables([table for table, _ in results])
+
+    def query(
+        self,
+        sql: str,
+        ts_col: Optional[TsColumns] = None,
+        ts_format: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        preserve_order: bool = True,
+        cache_ttl: Optional[float] = None,
+        partition_column: Optional[str] = None,
+        lower_bound: Optional[Bound] = None,
+        upper_bound: Optional[Bound] = None,
+        num_partitions: Optional[int] = None,
+        dtypes: Optional['Dtypes'] = None,
+        dtype_backend: Optional[str] = None,
+        category_threshold: Optional[float] = None,
+        self_destruct: bool = False,
+        coalesce: Optional[bool] = None,
+        output: str = 'pandas',
+        max_result_bytes: Optional[int] = None,
+        spill: Optional[Union[bool, str]] = None,
+        timeout: Optional[float] = None,
+        process_pool: Optional[bool] = None,
+    ) -> Union['pd.DataFrame', pa.Table]:
+        """Execute SQL command against Dremio Arrow Flight Server!
+
+        Similar to Spark's JDBC reader, a query can be split into `num_partitions` range-filtered subqueries on \
+            `partition_column`, which run concurrently as separate Dremio jobs. `lower_bound` and `upper_bound` \
+            only decide the partition stride: rows outside of them, and NULLs, are still returned.
+
+        Args:
+            sql: str
+                SQL query string to run on Dremio Engine
+            ts_col: Optional[str, Sequence[str], Mapping[str, str]]
+                Date/DateTime column name(s). Useful for data conversions when fetching data for use in R environment. \
+                    A mapping of column names to output formats converts several columns with different formats.
+            ts_format: Optional[str]
+                Date/DateTime column output format. The ts_col data is converted to ts_format string. \
+                    This can later be converted to R Timestamp data objects from the char type!
+            max_workers: Optional[int]
+                Maximum number of endpoints read concurrently, defaults to DEFAULT_MAX_WORKERS
+            preserve_order: bool
+                Keep the server's endpoint order when merging results, defaults to True
+            cache_ttl: Optional[float]
+                Seconds the result stays in the client result cache, defaults to the cache `ttl`
+            partition_column: Optional[str]
+                Numeric, date or timestamp column of the result to partition the query on
+            lower_bound: Optional[int, float, datetime.date, datetime.datetime]
+                Start of the partitioned range, required with `partition_column`
+            upper_bound: Optional[int, float, datetime.date, datetime.datetime]
+                End of the partitioned range, required with `partition_column`
+            num_partitions: Optional[int]
+                Maximum number of partitions, required with `partition_column`. \
+                    At most `max_workers` partitions are read at once.
+            dtypes: Optional[Mapping[str, Any]]
+                Explicit column name to pandas dtype mapping, e.g. derived from `get_schema`. \
+                    Accepts numpy dtypes, pandas extension dtypes (`Int64`, `string`, `pd.ArrowDtype`) and `category`.
+            dtype_backend: Optional[str]
+                numpy (default), numpy_nullable (pandas nullable dtypes, `string[pyarrow]` strings) \
+                    or pyarrow (`pd.ArrowDtype` for every column). Arrow-backed strings are far smaller \
+                    than NumPy object columns.
+            category_threshold: Optional[float]
+                Convert string columns to categoricals when their distinct values make up at most this \
+                    fraction of the rows, e.g. 0.1
+            self_destruct: bool
+                Free arrow buffers column by column during the conversion, lowering peak memory, defaults to False. \
+                    Ignored when the arrow result is shared with coalesced callers.
+            coalesce: Optional[bool]
+                Share the Flight fetch of an identical query already in flight, defaults to the client `coalesce`
+            output: str
+                Result type, pandas (default) for a pandas DataFrame or arrow for a pyarrow Table. \
+                    Arrow output never imports pandas, and the pandas conversion arguments do not apply.
+            max_result_bytes: Optional[int]
+                Memory budget of the arrow result set, counted as batches arrive, defaults to the client \
+                    `max_result_bytes`. The pandas conversion needs memory on top of it.
+            spill: Optional[Union[bool, str]]
+                Past `max_result_bytes`, False cancels the query and raises a MemoryError, while True (or a \
+                    directory path) spills the result to an Arrow IPC file and returns it memory-mapped. \
+                    Defaults to the client `spill`. Spilled results are best kept as arrow output, or converted \
+                    with `dtype_backend='pyarrow'` whose columns stay on the mapped pages.
+            timeout: Optional[float]
+                Seconds the query may take from planning to its last record batch, defaults to the client \
+                    `timeout`. Past it, the Flight calls are cancelled and a TimeoutError is raised.
+            process_pool: Optional[bool]
+                Read the endpoints, and format the `ts_col` columns, in worker processes, defaults to the client \
+                    `process_pool`. Cannot be combined with `max_result_bytes`.
+
+        Returns:
+            data: pd.DataFrame or pa.Table
+        """
+        if output not in QUERY_OUTPUTS:
+            raise ValueError(f"output must be one of {', '.join(QUERY_OUTPUTS)}!")
+        partitions = None
+        if partition_column is not None or num_partitions is not None:
+            if partition_column is None or lower_bound is None or upper_bound is None or num_partitions is None:
+                raise ValueError(
+                    "partition_column, lower_bound, upper_bound and num_partitions parameters are required together!"
+                )
+            partitions = partition_queries(sql, partition_column, lower_bound, upper_bound, num_partitions)
+        max_result_bytes = max_result_bytes if max_result_bytes is not None else self.max_result_bytes
+        spill = spill if spill is not None else self.spill
+        timeout = timeout if timeout is not None else self.timeout
+        deadline = self._deadline(timeout)
+        single_flight = self.single_flight
+        if coalesce is not None:
+            single_flight = (single_flight or default_single_flight) if coalesce else None
+        pool = self._resolve_process_pool(process_pool)
+        if pool is not None and max_result_bytes is not None:
+            raise ValueError("max_result_bytes cannot be combined with a process_pool!")
+        # worker processes format date/datetime columns along with reading the endpoints
+        fetch_formats = _ts_formats(ts_col, ts_format) if pool is not None and ts_col is not None else None
+        stats = QueryStats(sql)
+        fetched = False
+        try:
+
+            def fetch() -> pa.Table:
+                nonlocal fetched
+                fetched = True
+                return self._fetch_table(
+                    sql,
+                    max_workers=max_workers,
+                    preserve_order=preserve_order,
+                    cache_ttl=cache_ttl,
+                    stats=stats,
+                    partitions=partitions,
+                    budget=ResultBudget(max_result_bytes, spill) if max_result_bytes is not None else None,
+                    deadline=deadline,
+                    process_pool=pool,
+                    ts_formats=fetch_formats,
+                )
+
+            if single_flight is None:
+                table = fetch()
+            else:
+                # callers only share fetches made with the same settings, e.g. no budget error for unbudgeted callers
+                settings = (str(preserve_order), str(max_result_bytes), str(spill), str(timeout), str(fetch_formats))
+                key = cache_key('\n'.join(partitions or [sql]), (*self._connection_key(), *settings))
+                table, shared = single_flight.do(key, fetch)
+                if shared:
+                    # the result belongs to every coalesced caller, its buffers must outlive this conversion
+                    self_destruct = False
+                if not fetched:
+                    stats.coalesced = True
+                    stats.rows, stats.bytes = table.num_rows, table.nbytes
+            with stats.phase('convert'):
+                data = self._to_output(
+                    table,
+                    ts_col=ts_col if fetch_formats is None else None,
+                    ts_format=ts_format,
+                    output=output,
+                    dtypes=dtypes,
+                    dtype_backend=dtype_backend,
+                    category_threshold=category_threshold,
+                    self_destruct=self_destruct,
+                )
+        except Exception as error:
+            self._finish_stats(stats, error)
+            raise
+        self._finish_stats(stats)
+        return data
+
+    def _resolve_process_pool(self, process_pool: Optional[bool] = None) -> Optional['EndpointProcessPool']:
+        """The process pool of a query: the client `process_pool`, unless `process_pool` turns it on or off."""
+        pool = self.process_pool
+        if process_pool is not None:
+            pool = (pool or True) if process_pool else False
+        if pool is True:
+            from .procpool import default_process_pool
+
+            return default_process_pool
+        return pool or None
+
+    def head(
+        self,
+        sql: str,
+        n: int = 1000,
+        ts_col: Optional[TsColumns] = None,
+        ts_format: Optional[str] = None,
+        dtypes: Optional['Dtypes'] = None,
+        dtype_backend: Optional[str] = None,
+        output: str = 'pandas',
+        timeout: Optional[float] = None,
+    ) -> Union['pd.DataFrame', pa.Table]:
+        """Preview the first `n` rows of a query result!
+
+        Record batches are read on demand, and the Flight stream is cancelled as soon as `n` rows arrived, \
+            so the server stops sending the rest of the result and the latency scales with `n` rather than \
+            with the result size. Endpoints are read one after another, in the order listed by the server.
+
+        Args:
+            sql: str
+                SQL query string to run on Dremio Engine
+            n: int
+                Number of rows to return, defaults to 1000
+            ts_col: Optional[str, Sequence[str], Mapping[str, str]]
+                Date/DateTime column name(s) converted to strings, see `query`
+            ts_format: Optional[str]
+                Date/DateTime column output format, see `query`
+            dtypes: Optional[Mapping[str, Any]]
+                Explicit pandas dtypes, see `query`
+            dtype_backend: Optional[str]
+                Pandas dtype backend, see `query`
+            output: str
+                Result type, pandas (default) or arrow for a pyarrow Table
+            timeout: Optional[float]
+                Seconds the preview may take, see `query`
+
+        Returns:
+            data: pd.DataFrame or pa.Table
+        """
+        if output not in QUERY_OUTPUTS:
+            raise ValueError(f"output must be one of {', '.join(QUERY_OUTPUTS)}!")
+        if n < 0:
+            raise ValueError("n must not be negative!")
+        # no read-ahead, so that nothing past the first n rows is requested from the server
+        schema, batches = self._stream_batches(sql, prefetch=0, timeout=timeout)
+        collected: List[pa.RecordBatch] = []
+        rows = 0
+        try:
+            for batch in batches:
+                collected.append(batch.slice(0, n - rows))
+                rows += collected[-1].num_rows
+                if rows >= n:
+                    break
+        finally:
+            # cancels the stream being read, and completes the query stats
+            batches.close()
+        table = pa.Table.from_batches(collected, schema=schema)
+        return self._to_output(
+            table, ts_col=ts_col, ts_format=ts_format, output=output, dtypes=dtypes, dtype_backend=dtype_backend
+        )
+
+    def _to_output(
+        self,
+        table: pa.Table,
+        ts_col: Optional[TsColumns] = None,
+        ts_format: Optional[str] = None,
+        output: str = 'pandas',
+        dtypes: Optional['Dtypes'] = None,
+        dtype_backend: Optional[str] = None,
+        category_threshold: Optional[float] = None,
+        self_destruct: bool = False,
+    ) -> Union['pd.DataFrame', pa.Table]:
+        """Format date/datetime columns and convert an arrow result set to the `query` output type."""
+        # format date/datetime columns as strings on the arrow table, before the pandas conversion
+        if ts_col is not None:
+            table = format_ts_columns(table, _ts_formats(ts_col, ts_format))
+        if output == 'arrow':
+            return table
+        # pandas is only imported for pandas output
+        from .convert import to_pandas
+
+        # convert arrow table to pandas dataframe
+        return to_pandas(
+            table,
+            dtypes,
+            dtype_backend=dtype_backend,
+            category_threshold=category_threshold,
+            self_destruct=self_destruct,
+        )
+
+    def query_many(
+        self, sqls: Sequence[str], max_workers: Optional[int] = None, **kwargs: Any
+    ) -> List[Union['pd.DataFrame', pa.Table]]:
+        """Execute a batch of SQL commands concurrently over this client's authenticated channel!
+
+        A single client is safe to share between threads, so the queries share one gRPC channel and \
+            session token instead of paying a handshake each.
+
+        Args:
+            sqls: Sequence[str]
+                SQL query strings to run on Dremio Engine
+            max_workers: Optional[int]
+                Maximum number of queries in flight at once, defaults to DEFAULT_MAX_WORKERS
+            kwargs: Any
+                Extra `query` arguments applied to every query, e.g. ts_col, ts_format or output
+
+        Returns:
+            data: List[pd.DataFrame or pa.Table] in the same order as `sqls`
+        """
+        if len(sqls) == 0:
+            return []
+        # authenticate once up front rather than letting the workers queue on the lock
+        self._ensure_client()
+        workers = min(len(sqls), max_workers or DEFAULT_MAX_WORKERS)
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='dremioarrow-query') as pool:
+            return list(pool.map(lambda sql: self.query(sql, **kwargs), sqls))
 
 
 def dremio_query(
@@ -245,9 +1479,17 @@ def dremio_query(
     port: Optional[str] = None,
     username: Optional[str] = None,
     password: Optional[str] = None,
-    ts_col: Optional[str] = None,
+    ts_col: Optional[TsColumns] = None,
     ts_format: Optional[str] = None,
-) -> pd.DataFrame:
+    routing_tag: Optional[str] = None,
+    routing_queue: Optional[str] = None,
+    reuse_session: bool = True,
+    coalesce: bool = False,
+    output: str = 'pandas',
+    max_result_bytes: Optional[int] = None,
+    spill: Union[bool, str] = False,
+    timeout: Optional[float] = None,
+) -> Union['pd.DataFrame', pa.Table]:
     """Convenience method to run SQL query on Dremio Flight Server!
 
     Args:
@@ -261,18 +1503,58 @@ def dremio_query(
             Dremio Flight Server username, defaults to DREMIO_FLIGHT_SERVER_USERNAME environment variable
         password: str
             Dremio Flight Server password, defaults to DREMIO_FLIGHT_SERVER_PASSWORD environment variable
-        ts_col: Optional[str]
-            Date/DateTime column name. Useful for data conversions when fetching data for use in R environment.
+        ts_col: Optional[str, Sequence[str], Mapping[str, str]]
+            Date/DateTime column name(s). Useful for data conversions when fetching data for use in R environment.
         ts_format: Optional[str]
             Date/DateTime column output format. The ts_col data is converted to ts_format string. \
                 This can later be converted to R Timestamp data objects from the char type!
+        routing_tag: Optional[str]
+            Workload management routing tag, see `DremioArrowClient.authenticate`
+        routing_queue: Optional[str]
+            Workload management routing queue, see `DremioArrowClient.authenticate`
+        reuse_session: bool
+            Borrow an authenticated client from the process-wide `default_session_pool` instead of \
+                opening a new connection and handshake for every call, defaults to True
+        coalesce: bool
+            Share the Flight fetch of an identical query already in flight in this process, defaults to False
+        output: str
+            Result type, pandas (default) or arrow for a pyarrow Table, see `DremioArrowClient.query`
+        max_result_bytes: Optional[int]
+            Maximum bytes of arrow data the result may hold in memory, see `DremioArrowClient.query`
+        spill: Union[bool, str]
+            Spill a result exceeding max_result_bytes to disk instead of failing, see `DremioArrowClient.query`
+        timeout: Optional[float]
+            Seconds the query may take before it is cancelled with a TimeoutError, see `DremioArrowClient.query`
 
     Return:
-        pd.DataFrame: Pandas DataFrame containing SQL query results
+        pd.DataFrame: Pandas DataFrame containing SQL query results, or pa.Table for arrow output
     """
     # connection parameters from function
-    params = {"host": host, "port": port, "username": username, "password": password}
+    params = {
+        "host": host,
+        "port": port,
+        "username": username,
+        "password": password,
+        "routing_tag": routing_tag,
+        "routing_queue": routing_queue,
+    }
     # exclude unset parameters
-    args = {key: params.get(key) for key, value in params.items() if value is not None}
-    flight_ = DremioArrowClient(**args)
-    return flight_.query(sql, ts_col=ts_col, ts_format=ts_format)
+    args: Dict[str, Any] = {key: value for key, value in params.items() if value is not None}
+    session: ContextManager[DremioArrowClient]
+    if reuse_session:
+        from .pool import default_session_pool
+
+        session = default_session_pool.session(**args)
+    else:
+        session = nullcontext(DremioArrowClient(**args))
+    with session as flight_:
+        return flight_.query(
+            sql,
+            ts_col=ts_col,
+            ts_format=ts_format,
+            coalesce=coalesce,
+            output=output,
+            max_result_bytes=max_result_bytes,
+            spill=spill,
+            timeout=timeout,
+        )
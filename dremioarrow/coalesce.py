@@ -0,0 +1,83 @@
+"""Dremio Arrow Flight Client Request Coalescing Module.
+
+When a dashboard loads, many threads issue the exact same SQL at the same moment and Dremio runs the same job once
+per caller. A single-flight group collapses such concurrent, identical requests: the first caller (the leader) runs
+the Flight fetch, and callers arriving while it is in flight wait for it and share its arrow result. Arrow tables are
+immutable, so sharing one is safe; every caller still builds its own pandas DataFrame from it.
+
+Only requests in flight at the same time are coalesced. Nothing is kept once the fetch completes, see `ResultCache`
+for reusing results over time.
+"""
+import threading
+from typing import Callable, Dict, Generic, Optional, Tuple, TypeVar, cast
+
+Result = TypeVar('Result')
+
+
+class _Call(Generic[Result]):
+    """A fetch in flight, awaited by the callers that joined it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Optional[Result] = None
+        self.error: Optional[BaseException] = None
+        self.followers = 0
+
+
+class SingleFlight:
+    """A thread-safe group coalescing concurrent calls that share a key into a single execution."""
+
+    def __init__(self):
+        """Initialize an empty single-flight group!"""
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, function: Callable[[], Result]) -> Tuple[Result, bool]:
+        """Run `function`, unless a call with the same key is in flight, in which case wait for its result!
+
+        Exceptions raised by the leader's call are raised to every caller that joined it.
+
+        Args:
+            key: str
+                Identity of the call, e.g. the query cache key
+            function: Callable[[], Result]
+                The call to run when no identical call is in flight
+
+        Returns:
+            result: Tuple[Result, bool] the call result, and whether it is shared with other callers
+        """
+        call: Optional[_Call[Result]]
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if call is None:
+                call = self._calls[key] = _Call()
+            else:
+                call.followers += 1
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            # the leader sets the result before signalling, it is only None if the function returned None
+            return cast(Result, call.result), True
+        try:
+            result = call.result = function()
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            # no caller can join once the call is removed, so the follower count is final
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return result, call.followers > 0
+
+    def __len__(self) -> int:
+        """Number of calls in flight."""
+        with self._lock:
+            return len(self._calls)
+
+
+# process-wide group used by clients created with `coalesce=True`, so identical queries are coalesced across
+# clients of the same account, e.g. pooled `dremio_query` sessions
+default_single_flight = SingleFlight()
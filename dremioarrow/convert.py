@@ -0,0 +1,216 @@
+"""Dremio Arrow Flight Client Pandas Conversion Module.
+
+Converts arrow result sets to pandas DataFrames. By default pyarrow picks the pandas dtype of every column from its
+arrow type; an explicit column -> dtype mapping, typically derived from a schema retrieved with
+`DremioArrowClient.get_schema`, pins the dtypes up front. Arrow-side casts are vectorized and the requested pandas
+extension dtypes are produced directly by the conversion, instead of a post-hoc `DataFrame.astype` pass.
+
+String columns convert to NumPy object arrays of python strings by default, often several times the size of the
+arrow data. Memory-lean conversion modes:
+    dtype_backend: `pyarrow` keeps every column arrow-backed (`pd.ArrowDtype`), `numpy_nullable` converts to pandas
+        nullable extension dtypes with `string[pyarrow]` strings
+    category_threshold: dictionary encodes low-cardinality string columns, which convert to pandas categoricals
+    self_destruct: frees arrow buffers column by column while converting, instead of holding both copies at the peak
+"""
+from typing import Any, Callable, Dict, List, Mapping, Optional, Tuple
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from pandas.api.extensions import ExtensionDtype
+
+# column name -> pandas dtype, e.g. {'id': 'int32', 'vendor': 'category', 'fare': pd.Float64Dtype()}
+Dtypes = Mapping[str, Any]
+
+DTYPE_BACKENDS = ('numpy', 'numpy_nullable', 'pyarrow')
+
+# arrow types of the pandas nullable extension dtypes, like `pandas.read_parquet(dtype_backend='numpy_nullable')`
+_NULLABLE_DTYPES: Dict[pa.DataType, ExtensionDtype] = {
+    pa.int8(): pd.Int8Dtype(),
+    pa.int16(): pd.Int16Dtype(),
+    pa.int32(): pd.Int32Dtype(),
+    pa.int64(): pd.Int64Dtype(),
+    pa.uint8(): pd.UInt8Dtype(),
+    pa.uint16(): pd.UInt16Dtype(),
+    pa.uint32(): pd.UInt32Dtype(),
+    pa.uint64(): pd.UInt64Dtype(),
+    pa.bool_(): pd.BooleanDtype(),
+    pa.float32(): pd.Float32Dtype(),
+    pa.float64(): pd.Float64Dtype(),
+    pa.string(): pd.StringDtype('pyarrow'),
+    pa.large_string(): pd.StringDtype('pyarrow'),
+}
+
+
+def _backend_mapper(dtype_backend: Optional[str]) -> Optional[Callable[[pa.DataType], Optional[ExtensionDtype]]]:
+    """The pyarrow `types_mapper` of a dtype backend, None for plain NumPy dtypes."""
+    if dtype_backend is None or dtype_backend == 'numpy':
+        return None
+    if dtype_backend == 'numpy_nullable':
+        return _NULLABLE_DTYPES.get
+    if dtype_backend == 'pyarrow':
+        return pd.ArrowDtype
+    raise ValueError(f"dtype_backend must be one of {', '.join(DTYPE_BACKENDS)}!")
+
+
+def _low_cardinality(column: pa.ChunkedArray, threshold: float) -> bool:
+    """Whether the distinct values of a column make up at most `threshold` of its length."""
+    if len(column) == 0:
+        return False
+    return pc.count_distinct(column, mode='all').as_py() <= threshold * len(column)
+
+
+def _arrow_type(dtype: Any) -> Optional[pa.DataType]:
+    """Arrow type holding the values of a pandas dtype, None when the dtype needs no cast (e.g. object)."""
+    if isinstance(dtype, pd.ArrowDtype):
+        return dtype.pyarrow_dtype
+    if isinstance(dtype, pd.StringDtype):
+        return pa.string()
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return pa.timestamp(dtype.unit, tz=str(dtype.tz))
+    if isinstance(dtype, ExtensionDtype):
+        numpy_dtype = getattr(dtype, 'numpy_dtype', None)
+        return pa.from_numpy_dtype(numpy_dtype) if numpy_dtype is not None else None
+    if dtype.kind == 'O':
+        return None
+    return pa.from_numpy_dtype(dtype)
+
+
+def _apply_dtypes(
+    schema: pa.Schema, columns: List[pa.ChunkedArray], dtypes: Dtypes
+) -> Tuple[pa.Schema, Dict[str, Optional[ExtensionDtype]]]:
+    """Cast the explicitly typed columns, in place, to the arrow types holding their pandas dtypes.
+
+    Returns:
+        schema: pa.Schema of the cast columns
+        explicit: Dict[str, Optional[ExtensionDtype]] explicitly typed column -> extension dtype, None for plain \
+            NumPy dtypes
+    """
+    explicit: Dict[str, Optional[ExtensionDtype]] = {}
+    for name, dtype in dtypes.items():
+        index = schema.get_field_index(name)
+        if index == -1:
+            raise ValueError(
+                f'''
+            {name} is not a valid column name in the dataframe!
+            dtypes keys should be among {schema.names}
+            '''
+            )
+        dtype = pd.api.types.pandas_dtype(dtype)
+        if isinstance(dtype, pd.CategoricalDtype):
+            # dictionary arrays convert straight to pandas categoricals
+            columns[index] = columns[index].dictionary_encode()
+        else:
+            arrow_type = _arrow_type(dtype)
+            if arrow_type is not None and arrow_type != columns[index].type:
+                try:
+                    columns[index] = columns[index].cast(arrow_type)
+                except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as error:
+                    raise TypeError(f"{name} column of type {columns[index].type} cannot hold {dtype}: {error}")
+        # tz-aware timestamps and categoricals are produced by pyarrow itself, they need no types mapper
+        native = isinstance(dtype, (pd.DatetimeTZDtype, pd.CategoricalDtype))
+        explicit[name] = dtype if isinstance(dtype, ExtensionDtype) and not native else None
+        schema = schema.set(index, pa.field(name, columns[index].type))
+    return schema, explicit
+
+
+def _types_mapper(
+    schema: pa.Schema,
+    explicit: Mapping[str, Optional[ExtensionDtype]],
+    backend: Optional[Callable[[pa.DataType], Optional[ExtensionDtype]]],
+) -> Tuple[Optional[Callable[[pa.DataType], Optional[ExtensionDtype]]], List[str]]:
+    """The pyarrow `types_mapper` applying the explicit extension dtypes and the dtype backend.
+
+    The mapper is keyed on arrow types, not column names: an explicit dtype is only applied during the conversion \
+        itself when every column of that arrow type wants the same dtype.
+
+    Returns:
+        types_mapper: Optional[Callable] None when pyarrow's default dtypes apply to every column
+        deferred: List[str] explicitly typed columns the mapper cannot serve, to be converted on their own
+    """
+
+    def wanted(name: str) -> Optional[ExtensionDtype]:
+        if name in explicit:
+            return explicit[name]
+        arrow_type = schema.field(name).type
+        if backend is None or pa.types.is_dictionary(arrow_type):
+            # dictionary columns become pandas categoricals
+            return None
+        return backend(arrow_type)
+
+    by_type: Dict[pa.DataType, List[str]] = {}
+    for field in schema:
+        by_type.setdefault(field.type, []).append(field.name)
+    mapper: Dict[pa.DataType, Optional[ExtensionDtype]] = {}
+    deferred: List[str] = []
+    for name, dtype in explicit.items():
+        arrow_type = schema.field(name).type
+        if all(wanted(other) == dtype for other in by_type[arrow_type]):
+            mapper[arrow_type] = dtype
+        else:
+            deferred.append(name)
+
+    def types_mapper(arrow_type: pa.DataType) -> Optional[ExtensionDtype]:
+        if arrow_type in mapper:
+            return mapper[arrow_type]
+        if backend is None or pa.types.is_dictionary(arrow_type):
+            return None
+        return backend(arrow_type)
+
+    return (types_mapper if any(mapper.values()) or backend is not None else None), deferred
+
+
+def to_pandas(
+    table: pa.Table,
+    dtypes: Optional[Dtypes] = None,
+    dtype_backend: Optional[str] = None,
+    category_threshold: Optional[float] = None,
+    self_destruct: bool = False,
+) -> pd.DataFrame:
+    """Convert an arrow table to a pandas DataFrame, with explicit dtypes and memory-lean conversion modes!
+
+    Args:
+        table: pa.Table
+            Arrow result set
+        dtypes: Optional[Mapping[str, Any]]
+            Column name to pandas dtype mapping: numpy dtypes, pandas extension dtypes such as `Int64`, `string` \
+                or `pd.ArrowDtype(...)`, and `category`. Takes precedence over the other conversion modes.
+        dtype_backend: Optional[str]
+            numpy (default), numpy_nullable (pandas nullable dtypes, `string[pyarrow]` strings) \
+                or pyarrow (`pd.ArrowDtype` for every column)
+        category_threshold: Optional[float]
+            Convert string columns to categoricals when their distinct values make up at most this fraction \
+                of the rows, e.g. 0.1
+        self_destruct: bool
+            Release the arrow buffers while converting, lowering the peak memory. \
+                The table must not be used, nor shared with other consumers, afterwards.
+
+    Returns:
+        data: pd.DataFrame
+    """
+    backend = _backend_mapper(dtype_backend)
+    if not dtypes and backend is None and category_threshold is None and not self_destruct:
+        return table.to_pandas()
+    dtypes = dtypes or {}
+    columns = list(table.columns)
+    schema, explicit = _apply_dtypes(table.schema, columns, dtypes)
+    if category_threshold is not None:
+        for index, field in enumerate(schema):
+            is_string = pa.types.is_string(field.type) or pa.types.is_large_string(field.type)
+            if is_string and field.name not in dtypes and _low_cardinality(columns[index], category_threshold):
+                columns[index] = columns[index].dictionary_encode()
+                schema = schema.set(index, pa.field(field.name, columns[index].type))
+    table = pa.Table.from_arrays(columns, schema=schema)
+    del columns
+    types_mapper, deferred = _types_mapper(schema, explicit, backend)
+    # explicitly typed columns conflicting with the mapper are converted on their own, after the rest
+    pending = {name: table.column(name) for name in deferred}
+    data = table.to_pandas(
+        types_mapper=types_mapper,
+        split_blocks=self_destruct,
+        self_destruct=self_destruct,
+    )
+    del table
+    for name, column in pending.items():
+        data[name] = column.to_pandas(types_mapper={column.type: explicit[name]}.get)
+    return data
@@ -0,0 +1,437 @@
+"""Dremio Arrow Flight Client Prepared Statements Module.
+
+Building a SQL string per call makes Dremio parse and plan every variant of the same query from scratch, and puts
+the burden of escaping literals on the caller. Arrow Flight SQL prepared statements, which Dremio supports on its
+flight port, plan a parameterized query (`?` placeholders) once and bind the values of each execution as an Arrow
+record batch:
+    CreatePreparedStatement (DoAction): plans the query, returns a statement handle and the result schema
+    CommandPreparedStatementQuery (DoPut): binds the parameter values to the handle
+    CommandPreparedStatementQuery (GetFlightInfo): executes the statement, returns the result endpoints
+    ClosePreparedStatement (DoAction): releases the handle on the server
+
+Flight SQL commands are protocol buffers messages packed in `google.protobuf.Any`. The few fields these calls use
+are encoded here directly, so no protobuf runtime is needed.
+"""
+import threading
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import pyarrow as pa
+from pyarrow import flight
+
+from .client import QUERY_OUTPUTS, DremioArrowClient, TsColumns
+from .metrics import QueryStats
+from .spill import ResultBudget
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .convert import Dtypes
+
+FLIGHT_SQL_TYPE_URL = 'type.googleapis.com/arrow.flight.protocol.sql.'
+
+CREATE_PREPARED_STATEMENT = 'CreatePreparedStatement'
+CLOSE_PREPARED_STATEMENT = 'ClosePreparedStatement'
+
+# Flight SQL message name -> field name -> field number, for the fields used by prepared statements
+MESSAGES: Dict[str, Dict[str, int]] = {
+    'ActionCreatePreparedStatementRequest': {'query': 1, 'transaction_id': 2},
+    'ActionCreatePreparedStatementResult': {
+        'prepared_statement_handle': 1,
+        'dataset_schema': 2,
+        'parameter_schema': 3,
+    },
+    'ActionClosePreparedStatementRequest': {'prepared_statement_handle': 1},
+    'CommandPreparedStatementQuery': {'prepared_statement_handle': 1},
+    'DoPutPreparedStatementResult': {'prepared_statement_handle': 1},
+}
+
+# statement parameter values: positional, by parameter name, or already as arrow data
+Parameters = Union[Sequence[Any], Mapping[str, Any], pa.RecordBatch, pa.Table]
+
+
+def _varint(value: int) -> bytes:
+    encoded = bytearray()
+    while True:
+        byte = value & 0x7F
+        value >>= 7
+        if value:
+            encoded.append(byte | 0x80)
+        else:
+            encoded.append(byte)
+            return bytes(encoded)
+
+
+def _read_varint(data: bytes, position: int) -> Tuple[int, int]:
+    value = shift = 0
+    while True:
+        if position >= len(data):
+            raise ValueError("Truncated protobuf message!")
+        byte = data[position]
+        position += 1
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if not byte & 0x80:
+            return value, position
+
+
+def _encode_fields(fields: Mapping[int, bytes]) -> bytes:
+    """Encode length-delimited (string and bytes) protobuf fields."""
+    return b''.join(_varint(number << 3 | 2) + _varint(len(value)) + value for number, value in fields.items())
+
+
+def _decode_fields(data: bytes) -> Dict[int, bytes]:
+    """Decode the length-delimited fields of a protobuf message, skipping the others."""
+    fields: Dict[int, bytes] = {}
+    position = 0
+    while position < len(data):
+        tag, position = _read_varint(data, position)
+        wire_type = tag & 0x7
+        if wire_type == 0:
+            _, position = _read_varint(data, position)
+        elif wire_type == 1:
+            position += 8
+        elif wire_type == 2:
+            length, position = _read_varint(data, position)
+            fields[tag >> 3] = data[position : position + length]
+            position += length
+        elif wire_type == 5:
+            position += 4
+        else:
+            raise ValueError(f"Unsupported protobuf wire type {wire_type}!")
+    return fields
+
+
+def encode_message(name: str, **values: Union[str, bytes]) -> bytes:
+    """Encode a Flight SQL message packed in `google.protobuf.Any`, as sent in commands and action bodies!
+
+    Args:
+        name: str
+            Flight SQL message name, one of `MESSAGES`
+        values: Union[str, bytes]
+            Message field values, unset fields are omitted
+
+    Returns:
+        command: bytes
+    """
+    numbers = MESSAGES[name]
+    message = _encode_fields(
+        {
+            numbers[field]: value.encode('utf-8') if isinstance(value, str) else bytes(value)
+            for field, value in values.items()
+            if value is not None
+        }
+    )
+    return _encode_fields({1: (FLIGHT_SQL_TYPE_URL + name).encode('utf-8'), 2: message})
+
+
+def decode_message(data: bytes) -> Optional[Tuple[str, Dict[str, bytes]]]:
+    """Decode a Flight SQL message packed in `google.protobuf.Any`!
+
+    Args:
+        data: bytes
+            Command or action body
+
+    Returns:
+        message: Optional[Tuple[str, Dict[str, bytes]]] message name and field values, \
+            None when the data is not a Flight SQL message, e.g. plain SQL text
+    """
+    try:
+        packed = _decode_fields(data)
+        type_url = packed.get(1, b'').decode('utf-8')
+    except (ValueError, UnicodeDecodeError):
+        return None
+    name = type_url[len(FLIGHT_SQL_TYPE_URL) :]
+    if not type_url.startswith(FLIGHT_SQL_TYPE_URL) or name not in MESSAGES:
+        return None
+    fields = _decode_fields(packed.get(2, b''))
+    return name, {field: fields[number] for field, number in MESSAGES[name].items() if number in fields}
+
+
+def _read_schema(data: Optional[bytes]) -> Optional[pa.Schema]:
+    """Read an IPC-encapsulated schema, None when the server did not send one."""
+    return pa.ipc.read_schema(pa.py_buffer(data)) if data else None
+
+
+def parameter_table(params: Parameters, schema: Optional[pa.Schema] = None) -> pa.Table:
+    """Convert statement parameter values to the single-row arrow table bound to a prepared statement!
+
+    Args:
+        params: Union[Sequence[Any], Mapping[str, Any], pa.RecordBatch, pa.Table]
+            Values of the `?` placeholders, in order or by parameter name. Arrow data is bound as is, \
+                one execution per row.
+        schema: Optional[pa.Schema]
+            Parameter schema reported by the server. Values are converted to its types, and inferred \
+                from the python values when the server does not report any.
+
+    Returns:
+        parameters: pa.Table
+    """
+    if isinstance(params, pa.RecordBatch):
+        return pa.Table.from_batches([params])
+    if isinstance(params, pa.Table):
+        return params
+    fields: List[pa.Field] = list(schema) if schema is not None else []
+    if isinstance(params, Mapping):
+        if fields and sorted(params) != sorted(field.name for field in fields):
+            raise ValueError(f"Statement parameters must be {[field.name for field in fields]}, got {list(params)}!")
+        names = [field.name for field in fields] or list(params)
+        values = [params[name] for name in names]
+    elif isinstance(params, Sequence) and not isinstance(params, (str, bytes)):
+        values = list(params)
+        if fields and len(values) != len(fields):
+            raise ValueError(f"Expected {len(fields)} statement parameters, got {len(values)}!")
+        names = [field.name for field in fields] or [f'parameter_{index}' for index in range(1, len(values) + 1)]
+    else:
+        raise TypeError("Statement parameters must be a sequence, a mapping, a pa.RecordBatch or a pa.Table!")
+    arrays = []
+    for index, value in enumerate(values):
+        field = fields[index] if fields else None
+        arrow_type = field.type if field is not None and not pa.types.is_null(field.type) else None
+        try:
+            array = pa.array([value])
+            arrays.append(array if arrow_type is None or array.type == arrow_type else array.cast(arrow_type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError, pa.ArrowNotImplementedError, TypeError) as error:
+            raise TypeError(f"Statement parameter {names[index]} of type {arrow_type} cannot hold {value!r}: {error}")
+    return pa.Table.from_arrays(arrays, names=names)
+
+
+class PreparedStatement:
+    """A parameterized query planned once by Dremio, executed many times with different parameter values."""
+
+    def __init__(self, client: DremioArrowClient, sql: str):
+        """Initialize the statement of an authenticated client, see `DremioArrowClient.prepare`!
+
+        Args:
+            client: DremioArrowClient
+                Client whose session the statement handle belongs to
+            sql: str
+                SQL query, with `?` placeholders for the parameters
+        """
+        self.client = client
+        self.sql = sql
+        self.handle: Optional[bytes] = None
+        self.dataset_schema: Optional[pa.Schema] = None
+        self.parameter_schema: Optional[pa.Schema] = None
+        # number of times the statement was planned on the server
+        self.preparations = 0
+        # session call options the handle was created with, handles do not outlive their session
+        self._session: Optional[flight.FlightCallOptions] = None
+        # bind and execute must not interleave between threads sharing the handle
+        self._lock = threading.RLock()
+
+    @property
+    def closed(self) -> bool:
+        """Whether the statement holds no server handle."""
+        return self.handle is None
+
+    def prepare(self, deadline: Optional[float] = None):
+        """Plan the statement on the server, replacing the handle of a previous session!
+
+        Args:
+            deadline: Optional[float]
+                `time.monotonic` time the statement must be planned by, raising a TimeoutError past it
+        """
+        with self._lock:
+            self.client._ensure_client()
+            action = flight.Action(
+                CREATE_PREPARED_STATEMENT, encode_message('ActionCreatePreparedStatementRequest', query=self.sql)
+            )
+            try:
+                session = self.client.flight_options
+                results = list(self.client._call(self.client.client.do_action, action, deadline=deadline))
+            except (ConnectionError, TimeoutError):
+                raise
+            except Exception as error:
+                raise SyntaxError(f"Failed to prepare statement: {error}")
+            message = decode_message(results[0].body.to_pybytes()) if results else None
+            if message is None or message[0] != 'ActionCreatePreparedStatementResult':
+                raise SyntaxError("Failed to prepare statement: the server did not return a statement handle!")
+            fields = message[1]
+            self.handle = fields.get('prepared_statement_handle', b'')
+            self.dataset_schema = _read_schema(fields.get('dataset_schema'))
+            self.parameter_schema = _read_schema(fields.get('parameter_schema'))
+            # when the token was renewed during the call, the mismatch makes the next execution prepare again
+            self._session = session
+            self.preparations += 1
+            if self.dataset_schema is not None:
+                self.client._remember_schema(self.sql, self.dataset_schema)
+
+    def _command(self) -> bytes:
+        """Encode the statement query command of the current handle."""
+        if self.handle is None:
+            raise ValueError("The prepared statement is closed!")
+        return encode_message('CommandPreparedStatementQuery', prepared_statement_handle=self.handle)
+
+    def _bind(self, params: Parameters, deadline: Optional[float] = None):
+        """Send the parameter values of the next execution."""
+        parameters = parameter_table(params, self.parameter_schema)
+        descriptor = flight.FlightDescriptor.for_command(self._command())
+        writer, metadata = self.client._call(
+            self.client.client.do_put, descriptor, parameters.schema, deadline=deadline
+        )
+        try:
+            writer.write_table(parameters)
+            writer.done_writing()
+            result = metadata.read()
+        finally:
+            writer.close()
+        message = decode_message(result.to_pybytes()) if result is not None else None
+        if message is not None and message[1].get('prepared_statement_handle'):
+            # stateless servers return a new handle carrying the bound parameters
+            self.handle = message[1]['prepared_statement_handle']
+
+    def _run(self, params: Optional[Parameters], deadline: Optional[float] = None) -> flight.FlightInfo:
+        """Bind the parameters and execute the statement handle."""
+        if params is not None:
+            self._bind(params, deadline)
+        elif self.parameter_schema is not None and len(self.parameter_schema) > 0:
+            raise ValueError(f"Expected {len(self.parameter_schema)} statement parameters, got none!")
+        descriptor = flight.FlightDescriptor.for_command(self._command())
+        return self.client._call(self.client.client.get_flight_info, descriptor, deadline=deadline)
+
+    def _execute(self, params: Optional[Parameters], deadline: Optional[float] = None) -> flight.FlightInfo:
+        """Execute the statement, preparing it first when it has no handle of the current session."""
+        with self._lock:
+            try:
+                if self.handle is None or self._session is not self.client.flight_options:
+                    self.prepare(deadline)
+                session = self._session
+                try:
+                    return self._run(params, deadline)
+                except flight.FlightUnauthenticatedError:
+                    # an expired token only fails parameter uploads once the stream is closed, past `_call`
+                    self.client._renew_session(session)
+                except (flight.FlightError, pa.ArrowException):
+                    if session is self.client.flight_options:
+                        raise
+                # the session token was renewed during the call, taking the statement handle with it
+                self.prepare(deadline)
+                return self._run(params, deadline)
+            except (flight.FlightError, pa.ArrowException) as error:
+                raise SyntaxError(f"Failed to execute prepared statement: {error}")
+
+    def execute(
+        self,
+        params: Optional[Parameters] = None,
+        ts_col: Optional[TsColumns] = None,
+        ts_format: Optional[str] = None,
+        max_workers: Optional[int] = None,
+        preserve_order: bool = True,
+        dtypes: Optional['Dtypes'] = None,
+        dtype_backend: Optional[str] = None,
+        category_threshold: Optional[float] = None,
+        output: str = 'pandas',
+        max_result_bytes: Optional[int] = None,
+        spill: Optional[Union[bool, str]] = None,
+        timeout: Optional[float] = None,
+    ) -> Union['pd.DataFrame', pa.Table]:
+        """Execute the statement with a set of parameter values, without planning the query again!
+
+        Args:
+            params: Optional[Union[Sequence[Any], Mapping[str, Any], pa.RecordBatch, pa.Table]]
+                Values of the `?` placeholders, in order or by parameter name, see `parameter_table`. \
+                    Values are bound as arrow data, never spliced into the SQL text.
+            ts_col: Optional[str, Sequence[str], Mapping[str, str]]
+                Date/DateTime column name(s) converted to strings, see `DremioArrowClient.query`
+            ts_format: Optional[str]
+                Date/DateTime column output format, see `DremioArrowClient.query`
+            max_workers: Optional[int]
+                Maximum number of endpoints read concurrently, defaults to DEFAULT_MAX_WORKERS
+            preserve_order: bool
+                Keep the server's endpoint order when merging results, defaults to True
+            dtypes: Optional[Mapping[str, Any]]
+                Explicit pandas dtypes, see `DremioArrowClient.query`
+            dtype_backend: Optional[str]
+                Pandas dtype backend, see `DremioArrowClient.query`
+            category_threshold: Optional[float]
+                Convert low-cardinality string columns to categoricals, see `DremioArrowClient.query`
+            output: str
+                Result type, pandas (default) for a pandas DataFrame or arrow for a pyarrow Table
+            max_result_bytes: Optional[int]
+                Memory budget of the arrow result set, defaults to the client `max_result_bytes`, \
+                    see `DremioArrowClient.query`
+            spill: Optional[Union[bool, str]]
+                Spill a result exceeding max_result_bytes to disk instead of failing, defaults to the client \
+                    `spill`, see `DremioArrowClient.query`
+            timeout: Optional[float]
+                Seconds the execution may take, from binding the parameters to the last record batch, \
+                    defaults to the client `timeout`
+
+        Returns:
+            data: pd.DataFrame or pa.Table
+        """
+        if output not in QUERY_OUTPUTS:
+            raise ValueError(f"output must be one of {', '.join(QUERY_OUTPUTS)}!")
+        client = self.client
+        max_result_bytes = max_result_bytes if max_result_bytes is not None else client.max_result_bytes
+        spill = spill if spill is not None else client.spill
+        deadline = client._deadline(timeout)
+        stats = QueryStats(self.sql)
+        try:
+            client._ensure_client(stats)
+            with stats.phase('plan'):
+                ticket_info = self._execute(params, deadline)
+            stats.endpoints = len(ticket_info.endpoints)
+            stats.start_transfer()
+            try:
+                table = client.read_endpoints(
+                    ticket_info,
+                    max_workers=max_workers,
+                    preserve_order=preserve_order,
+                    stats=stats,
+                    budget=ResultBudget(max_result_bytes, spill) if max_result_bytes is not None else None,
+                    deadline=deadline,
+                )
+            except (MemoryError, TimeoutError):
+                raise
+            except Exception as error:
+                raise Exception(f"Failed to read query results from Dremio: {error}")
+            finally:
+                stats.end_transfer()
+            with stats.phase('convert'):
+                data = client._to_output(
+                    table,
+                    ts_col=ts_col,
+                    ts_format=ts_format,
+                    output=output,
+                    dtypes=dtypes,
+                    dtype_backend=dtype_backend,
+                    category_threshold=category_threshold,
+                )
+        except Exception as error:
+            client._finish_stats(stats, error)
+            raise
+        client._finish_stats(stats)
+        return data
+
+    def close(self):
+        """Release the statement handle on the server, executing the statement again prepares it anew."""
+        with self._lock:
+            if self.handle is None:
+                return
+            handle, session, self.handle = self.handle, self._session, None
+            if session is not self.client.flight_options:
+                # the handle expired along with its session
+                return
+            action = flight.Action(
+                CLOSE_PREPARED_STATEMENT,
+                encode_message('ActionClosePreparedStatementRequest', prepared_statement_handle=handle),
+            )
+            try:
+                for _ in self.client.client.do_action(action, session):
+                    pass
+            except flight.FlightError:
+                # best effort, the server drops the handle with the session anyway
+                pass
+
+    def __enter__(self) -> 'PreparedStatement':
+        """Use the statement as a context manager."""
+        return self
+
+    def __exit__(self, *exc: Any):
+        """Release the statement handle on exit."""
+        self.close()
+
+    def __repr__(self) -> str:
+        """Show the statement SQL."""
+        return f'PreparedStatement({self.sql!r})'
@@ -0,0 +1,152 @@
+"""Dremio Arrow Flight Client Metrics Module.
+
+Every query run through `DremioArrowClient` produces a `QueryStats` record with per-phase timings:
+    connect: flight client creation and basic-auth handshake, zero when the session is reused
+    plan: GetFlightInfo, i.e. dremio query planning
+    first batch: from the start of DoGet until the first record batch arrives
+    transfer: from the start of DoGet until every endpoint stream is drained
+    convert: arrow to pandas conversion, including date/datetime formatting
+
+along with row, batch, byte and endpoint counts, and the number of endpoint streams read again after a failure.
+Queries served from the result cache, or by another caller's coalesced fetch, only report their convert timing. The
+record is handed to the client's stats hooks once the query completes (or fails), e.g. to export it to a metrics
+system.
+
+For RPC level visibility, `RpcTimingMiddlewareFactory` plugs into the flight client middleware chain next to
+`DremioClientAuthMiddlewareFactory` and reports the duration and outcome of every flight call.
+"""
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Iterator, Optional, Sequence
+
+import pyarrow as pa
+from pyarrow import flight
+
+
+@dataclass
+class QueryStats:
+    """Per-phase timings and volume counters of a single query."""
+
+    sql: str
+    connect_seconds: float = 0.0
+    plan_seconds: float = 0.0
+    first_batch_seconds: Optional[float] = None
+    transfer_seconds: float = 0.0
+    convert_seconds: float = 0.0
+    total_seconds: float = 0.0
+    rows: int = 0
+    batches: int = 0
+    bytes: int = 0
+    endpoints: int = 0
+    spilled_bytes: int = 0
+    retries: int = 0
+    cache_hit: bool = False
+    coalesced: bool = False
+    error: Optional[str] = None
+    _started: float = field(default_factory=time.perf_counter, repr=False, compare=False)
+    _transfer_started: Optional[float] = field(default=None, repr=False, compare=False)
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False, compare=False)
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        """Add the wall time spent in the block to the `<name>_seconds` timing."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._lock:
+                setattr(self, f'{name}_seconds', getattr(self, f'{name}_seconds') + time.perf_counter() - start)
+
+    def start_transfer(self):
+        """Mark the start of the DoGet phase."""
+        self._transfer_started = time.perf_counter()
+
+    def end_transfer(self):
+        """Mark the end of the DoGet phase, once every endpoint stream is drained."""
+        if self._transfer_started is not None:
+            self.transfer_seconds = time.perf_counter() - self._transfer_started
+
+    def add_batch(self, batch: pa.RecordBatch):
+        """Count a received record batch. Safe to call from concurrent endpoint readers."""
+        with self._lock:
+            if self.first_batch_seconds is None and self._transfer_started is not None:
+                self.first_batch_seconds = time.perf_counter() - self._transfer_started
+            self.rows += batch.num_rows
+            self.batches += 1
+            self.bytes += batch.nbytes
+
+    def add_stream(self, rows: int, batches: int, nbytes: int):
+        """Count the record batches of a stream received by another process, e.g. an `EndpointProcessPool` worker.
+
+        The batches only reach this process along with the whole stream, so `first_batch_seconds` records when \
+            the first non-empty stream arrives.
+        """
+        with self._lock:
+            if batches and self.first_batch_seconds is None and self._transfer_started is not None:
+                self.first_batch_seconds = time.perf_counter() - self._transfer_started
+            self.rows += rows
+            self.batches += batches
+            self.bytes += nbytes
+
+    def add_retry(self, rows: int = 0, batches: int = 0, nbytes: int = 0):
+        """Count an endpoint stream read again after a failure, forgetting the batches its failed read received."""
+        with self._lock:
+            self.retries += 1
+            self.rows -= rows
+            self.batches -= batches
+            self.bytes -= nbytes
+
+    def finish(self, error: Optional[BaseException] = None):
+        """Freeze the total wall time and record the error the query failed with, if any."""
+        self.total_seconds = time.perf_counter() - self._started
+        if error is not None:
+            self.error = f'{type(error).__name__}: {error}'
+
+
+# receives the stats of every query run by a client
+StatsHook = Callable[[QueryStats], None]
+
+
+def emit_stats(hooks: Sequence[StatsHook], stats: QueryStats):
+    """Hand query stats to every hook. A failing hook must never fail the query itself."""
+    for hook in hooks:
+        try:
+            hook(stats)
+        except Exception as error:
+            warnings.warn(f'Query stats hook {hook!r} failed with Error: {error}', RuntimeWarning)
+
+
+class RpcTimingMiddleware(flight.ClientMiddleware):
+    """Client-side middleware timing a single flight RPC."""
+
+    def __init__(self, factory: 'RpcTimingMiddlewareFactory', method: flight.FlightMethod):
+        """Initialize middleware with the factory holding the hook and the RPC being timed."""
+        self.factory = factory
+        self.method = method
+        self.started = time.perf_counter()
+
+    def call_completed(self, exception):
+        """Report the RPC duration and outcome once the call finishes."""
+        try:
+            self.factory.hook(self.method, time.perf_counter() - self.started, exception)
+        except Exception as error:
+            warnings.warn(f'RPC timing hook failed with Error: {error}', RuntimeWarning)
+
+
+class RpcTimingMiddlewareFactory(flight.ClientMiddlewareFactory):
+    """A factory that creates RpcTimingMiddleware(s), reporting every flight call to a hook.
+
+    Pass it to `DremioArrowClient(middleware=[...])`. The hook receives the `flight.FlightMethod`, \
+        the call duration in seconds and the exception the call failed with, or None.
+    """
+
+    def __init__(self, hook: Callable[[flight.FlightMethod, float, Optional[Exception]], None]):
+        """Initialize the factory with the hook receiving RPC timings."""
+        self.hook = hook
+
+    def start_call(self, info):
+        """Called at the start of an RPC, times it. Must be thread-safe and must not raise exceptions."""
+        return RpcTimingMiddleware(self, info.method)
@@ -0,0 +1,135 @@
+"""Dremio Arrow Flight Client Session Pool Module.
+
+Opening a `DremioArrowClient` session costs a new gRPC channel and a basic-auth handshake. For workloads that fire
+many small queries, e.g. dashboard backends, that overhead dominates query latency.
+
+The session pool keeps authenticated clients alive between calls, keyed by server, account and workload management
+routing settings, so that later calls reuse both the `FlightClient` channel and the bearer token. Expired tokens
+are renewed transparently by the client itself, and sessions left idle for too long are closed.
+"""
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, Tuple
+
+from .client import DremioArrowClient
+
+
+class SessionPool:
+    """A thread-safe pool of authenticated `DremioArrowClient` sessions."""
+
+    def __init__(self, idle_timeout: float = 300.0, max_idle_per_key: int = 8):
+        """Initialize an empty session pool!
+
+        Args:
+            idle_timeout: float
+                Seconds a session may sit unused in the pool before it is closed, defaults to 5 minutes
+            max_idle_per_key: int
+                Maximum number of idle sessions kept per server/account/routing combination, defaults to 8
+        """
+        if idle_timeout <= 0:
+            raise ValueError("idle_timeout must be a positive number of seconds!")
+        if max_idle_per_key < 1:
+            raise ValueError("max_idle_per_key must be at least 1!")
+        self.idle_timeout = idle_timeout
+        self.max_idle_per_key = max_idle_per_key
+        self._idle: Dict[Tuple[str, ...], Deque[Tuple[float, DremioArrowClient]]] = defaultdict(deque)
+        self._lock = threading.Lock()
+
+    def acquire(self, **connection_args: Any) -> DremioArrowClient:
+        """Check out a session for the given connection parameters!
+
+        An idle session with the same host, port, account and routing tag/queue is reused when available, \
+            otherwise a new (not yet connected) client is returned. It connects and authenticates on first query.
+
+        Args:
+            connection_args: Any
+                `DremioArrowClient` initialization arguments. Unset arguments fall back to environment variables.
+
+        Returns:
+            client: DremioArrowClient
+        """
+        # resolving the arguments through the client applies environment variable defaults and validation
+        candidate = DremioArrowClient(**connection_args)
+        key = candidate._connection_key()
+        with self._lock:
+            self._evict_idle()
+            sessions = self._idle.get(key)
+            if sessions:
+                return sessions.pop()[1]
+        return candidate
+
+    def release(self, client: DremioArrowClient):
+        """Return a checked out session to the pool for reuse!
+
+        Args:
+            client: DremioArrowClient
+                Session previously returned by `acquire`
+        """
+        if not hasattr(client, 'flight_options'):
+            # never authenticated, there is nothing worth keeping
+            return
+        with self._lock:
+            sessions = self._idle[client._connection_key()]
+            sessions.append((time.monotonic(), client))
+            while len(sessions) > self.max_idle_per_key:
+                _close(sessions.popleft()[1])
+
+    @contextmanager
+    def session(self, **connection_args: Any) -> Iterator[DremioArrowClient]:
+        """Context manager that checks out a session and returns it to the pool on exit!
+
+        Args:
+            connection_args: Any
+                `DremioArrowClient` initialization arguments, see `acquire`
+
+        Yields:
+            client: DremioArrowClient
+        """
+        client = self.acquire(**connection_args)
+        try:
+            yield client
+        finally:
+            self.release(client)
+
+    def _evict_idle(self):
+        """Close sessions idle for longer than `idle_timeout`. Must be called with the lock held."""
+        deadline = time.monotonic() - self.idle_timeout
+        for key in list(self._idle):
+            sessions = self._idle[key]
+            # sessions are appended on release, so the oldest ones sit on the left
+            while sessions and sessions[0][0] < deadline:
+                _close(sessions.popleft()[1])
+            if not sessions:
+                del self._idle[key]
+
+    def evict_idle(self):
+        """Close every session that has been idle for longer than `idle_timeout`."""
+        with self._lock:
+            self._evict_idle()
+
+    def clear(self):
+        """Close all idle sessions held by the pool."""
+        with self._lock:
+            for sessions in self._idle.values():
+                for _, client in sessions:
+                    _close(client)
+            self._idle.clear()
+
+    def __len__(self) -> int:
+        """Number of idle sessions currently held by the pool."""
+        with self._lock:
+            return sum(len(sessions) for sessions in self._idle.values())
+
+
+def _close(client: DremioArrowClient):
+    """Close the gRPC channel of a pooled session, ignoring failures on already broken channels."""
+    try:
+        client.client.close()
+    except Exception:
+        pass
+
+
+# process-wide pool used by `dremio_query`
+default_session_pool = SessionPool()
@@ -0,0 +1,303 @@
+"""Dremio Arrow Flight Client Process Pool Module.
+
+Once the network is fast, the work `query` does under the GIL becomes its bottleneck and pins a single core: the
+python loop over the record batches of every stream, and the `ts_col` formatting. An `EndpointProcessPool` moves that
+work to worker processes instead. Each endpoint of a query is read by a worker, with the raw ticket bytes and the
+session bearer token of the client: the worker opens its own flight connection, formats the date/datetime columns
+and writes its share to an uncompressed Arrow IPC file on shared memory. The calling process memory-maps the files,
+zero-copy, and removes them right away.
+
+Workers are spawned rather than forked, as gRPC channels do not survive a fork, and are started on the first query.
+Scripts using the pool on platforms spawning processes need the usual `if __name__ == '__main__':` guard.
+
+The pandas conversion stays in the calling process: python string objects cannot cross a process boundary without
+being rebuilt, which costs as much as creating them. String-heavy extracts convert cheaply with
+`dtype_backend='pyarrow'` or `'numpy_nullable'`, whose columns stay arrow-backed.
+"""
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import Future, ProcessPoolExecutor, as_completed
+from multiprocessing import get_context
+from typing import TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Sequence, Tuple
+
+import pyarrow as pa
+from pyarrow import flight
+
+from .shared import shared_memory_dir
+
+if TYPE_CHECKING:
+    from .client import DremioArrowClient
+    from .metrics import QueryStats
+
+SEGMENT_PREFIX = 'dremioarrow-endpoint-'
+
+# flight clients of a worker process, keyed on server location and connection arguments
+_clients: Dict[Tuple[str, str], flight.FlightClient] = {}
+
+# path, rows, batches and bytes of an endpoint stream written by a worker
+_Written = Tuple[str, int, int, int]
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def fetch_endpoint(
+    location: str,
+    connection_args: Mapping[str, Any],
+    ticket: bytes,
+    headers: Sequence[Tuple[bytes, bytes]],
+    ts_formats: Optional[Mapping[str, Optional[str]]],
+    deadline: Optional[float],
+    directory: str,
+) -> _Written:
+    """Read an endpoint stream in a worker process and write it to an Arrow IPC file!
+
+    Args:
+        location: str
+            Flight server location, e.g. `grpc+tcp://host:32010`
+        connection_args: Mapping[str, Any]
+            `flight.FlightClient` arguments, e.g. TLS settings
+        ticket: bytes
+            Raw `FlightEndpoint.ticket` bytes
+        headers: Sequence[Tuple[bytes, bytes]]
+            Session headers holding the bearer token returned by `authenticate`
+        ts_formats: Optional[Mapping[str, Optional[str]]]
+            Date/datetime column to strftime format mapping, applied to every batch
+        deadline: Optional[float]
+            `time.time` the stream must be read by
+        directory: str
+            Directory of the IPC file
+
+    Returns:
+        written: Tuple[str, int, int, int] file path, rows, batches and received bytes
+    """
+    from .client import format_ts_columns
+
+    key = (location, repr(sorted(connection_args.items())))
+    client = _clients.get(key)
+    if client is None:
+        client = _clients[key] = flight.FlightClient(location, **connection_args)
+    timeout = None
+    if deadline is not None:
+        timeout = deadline - time.time()
+        if timeout <= 0:
+            raise TimeoutError("Query exceeded its timeout!")
+    reader = client.do_get(flight.Ticket(ticket), flight.FlightCallOptions(headers=list(headers), timeout=timeout))
+    schema = reader.schema
+    if ts_formats:
+        schema = format_ts_columns(schema.empty_table(), ts_formats).schema
+    path = os.path.join(directory, f'{SEGMENT_PREFIX}{uuid.uuid4().hex}.arrow')
+    rows = batches = nbytes = 0
+    try:
+        # uncompressed, so that the calling process can memory-map the buffers as they are
+        with pa.OSFile(path, 'wb') as sink, pa.ipc.new_file(sink, schema) as writer:
+            for chunk in reader:
+                batches += 1
+                nbytes += chunk.data.nbytes
+                rows += chunk.data.num_rows
+                writer.write_batch(chunk.data if not ts_formats else format_ts_columns(chunk.data, ts_formats))
+    except BaseException:
+        reader.cancel()
+        _remove(path)
+        raise
+    return path, rows, batches, nbytes
+
+
+def _open(path: str) -> pa.Table:
+    """Memory-map an endpoint file written by a worker and remove it, the mapping keeps its data readable."""
+    try:
+        with pa.memory_map(path, 'r') as source:
+            return pa.ipc.open_file(source).read_all()
+    finally:
+        _remove(path)
+
+
+class EndpointProcessPool:
+    """A pool of worker processes reading and decoding query endpoints in parallel."""
+
+    def __init__(self, processes: Optional[int] = None, directory: Optional[str] = None):
+        """Initialize a pool, whose processes are started on first use!
+
+        Args:
+            processes: Optional[int]
+                Number of worker processes, defaults to the number of CPUs
+            directory: Optional[str]
+                Directory the workers hand endpoint results over in, defaults to `shared_memory_dir()`
+        """
+        self.processes = processes or os.cpu_count() or 1
+        self.directory = directory
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(self.processes, mp_context=get_context('spawn'))
+            return self._executor
+
+    def start(self) -> 'EndpointProcessPool':
+        """Start the worker processes ahead of the first query, e.g. when a service starts up!
+
+        Returns:
+            pool: EndpointProcessPool self
+        """
+        pool = self._pool()
+        # workers are spawned on demand, keep all of them busy at once
+        for future in [pool.submit(time.sleep, 0.1) for _ in range(self.processes)]:
+            future.result()
+        return self
+
+    def read_endpoints(
+        self,
+        client: 'DremioArrowClient',
+        ticket_info: flight.FlightInfo,
+        ts_formats: Optional[Mapping[str, Optional[str]]] = None,
+        preserve_order: bool = True,
+        stats: Optional['QueryStats'] = None,
+        deadline: Optional[float] = None,
+    ) -> pa.Table:
+        """Read every endpoint of a FlightInfo in the worker processes and merge the results!
+
+        Args:
+            client: DremioArrowClient
+                Authenticated client whose session the workers use
+            ticket_info: flight.FlightInfo
+                FlightInfo message returned by `retrieve_ticket`
+            ts_formats: Optional[Mapping[str, Optional[str]]]
+                Date/datetime column to strftime format mapping, applied by the workers
+            preserve_order: bool
+                Concatenate endpoint results in the order listed by the server (default), \
+                    otherwise in the order the workers complete them
+            stats: Optional[QueryStats]
+                Query stats counting the received batches
+            deadline: Optional[float]
+                `time.monotonic` time the streams must be read by, raising a TimeoutError past it
+
+        Returns:
+            table: pa.Table
+        """
+        from .client import format_ts_columns
+
+        schema = ticket_info.schema
+        if ts_formats:
+            schema = format_ts_columns(schema.empty_table(), ts_formats).schema
+        if len(ticket_info.endpoints) == 0:
+            return schema.empty_table()
+        options = client.flight_options
+        tickets = [endpoint.ticket.ticket for endpoint in ticket_info.endpoints]
+        futures = [self._submit(client, ticket, ts_formats, deadline) for ticket in tickets]
+        # the first read of each endpoint, `_retry` replaces the entries of `futures` with the reads it resubmits
+        first = list(futures)
+        order = range(len(first)) if preserve_order else (first.index(future) for future in as_completed(first))
+        tables: List[pa.Table] = []
+        try:
+            for index in order:
+                path, rows, batches, nbytes = self._retry(
+                    client, futures, index, options, tickets[index], ts_formats, stats, deadline
+                )
+                tables.append(_open(path))
+                if stats is not None:
+                    stats.add_stream(rows, batches, nbytes)
+        except flight.FlightTimedOutError as error:
+            self._discard(futures)
+            raise TimeoutError(f"Query exceeded its timeout: {error}")
+        except BaseException:
+            self._discard(futures)
+            raise
+        return pa.concat_tables(tables)
+
+    def _retry(
+        self,
+        client: 'DremioArrowClient',
+        futures: List['Future[_Written]'],
+        index: int,
+        options: flight.FlightCallOptions,
+        ticket: bytes,
+        ts_formats: Optional[Mapping[str, Optional[str]]],
+        stats: Optional['QueryStats'],
+        deadline: Optional[float],
+    ) -> _Written:
+        """Wait for an endpoint read, reading the endpoint again as `DremioArrowClient.read_endpoint` does.
+
+        A read failing with a transient error is submitted again up to `client.retries` times, after a backoff, \
+            and a read rejecting an expired session token once more after renewing it. The new read replaces \
+            `futures[index]`, so discarding the futures after a failure or an interruption also covers it.
+        """
+        from .client import RETRYABLE_ERRORS
+
+        attempt, renewed = 0, False
+        while True:
+            try:
+                return futures[index].result()
+            except flight.FlightUnauthenticatedError:
+                if renewed:
+                    raise
+                client._renew_session(options)
+                renewed = True
+            except RETRYABLE_ERRORS:
+                if attempt >= client.retries:
+                    raise
+                client._backoff(attempt, deadline)
+                attempt += 1
+            if stats is not None:
+                stats.add_retry()
+            options = client.flight_options
+            futures[index] = self._submit(client, ticket, ts_formats, deadline)
+
+    def _submit(
+        self,
+        client: 'DremioArrowClient',
+        ticket: bytes,
+        ts_formats: Optional[Mapping[str, Optional[str]]],
+        deadline: Optional[float],
+    ) -> 'Future[_Written]':
+        # monotonic clocks are not comparable across processes, workers get the deadline as wall time
+        wall_deadline = None if deadline is None else time.time() + deadline - time.monotonic()
+        return self._pool().submit(
+            fetch_endpoint,
+            client._location,
+            client._connection_args,
+            ticket,
+            client._session_headers,
+            dict(ts_formats) if ts_formats else None,
+            wall_deadline,
+            self.directory or shared_memory_dir(),
+        )
+
+    @staticmethod
+    def _discard(futures: Sequence['Future[_Written]']):
+        """Cancel pending endpoint reads and remove the files of completed ones, after a query failed."""
+        for future in futures:
+            future.cancel()
+        for future in futures:
+            if future.cancelled():
+                continue
+            try:
+                _remove(future.result()[0])
+            except BaseException:
+                pass
+
+    def close(self):
+        """Shut the worker processes down, they are started again by the next query."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown()
+
+    def __enter__(self) -> 'EndpointProcessPool':
+        """Use the pool as a context manager."""
+        return self
+
+    def __exit__(self, *exc: Any):
+        """Shut the worker processes down on exit."""
+        self.close()
+
+
+# process-wide pool used by clients created with `process_pool=True`
+default_process_pool = EndpointProcessPool()
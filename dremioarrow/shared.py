@@ -0,0 +1,190 @@
+"""Dremio Arrow Flight Client Shared Results Module.
+
+Hands a query result over to other processes (gunicorn workers, multiprocessing pools) without re-running the
+query or pickling DataFrames. The result set is streamed once into an uncompressed Arrow IPC file on shared memory
+(`/dev/shm` where available, the temporary directory otherwise), and every process memory-maps it: tables opened
+from the segment are zero-copy and share the same physical pages.
+
+A `SharedResult` handle is small and picklable, and can also be rebuilt from its `path`. Processes attach to the
+segment while using it; the reference count lives in a sidecar file updated under an exclusive file lock, and the
+last process to release its reference removes the segment. Tables already opened stay readable after removal.
+A process that dies without releasing leaks its reference, `SharedResult.unlink` removes a segment regardless.
+"""
+import os
+import tempfile
+import uuid
+import weakref
+from typing import TYPE_CHECKING, Any, Iterable, Optional
+
+import pyarrow as pa
+
+from .writers import write_ipc
+
+if TYPE_CHECKING:
+    import pandas as pd
+
+    from .convert import Dtypes
+
+try:
+    import fcntl
+except ImportError:  # windows, where reference counting is best effort
+    fcntl = None  # type: ignore
+
+SEGMENT_PREFIX = 'dremioarrow-'
+SEGMENT_SUFFIX = '.arrow'
+REFS_SUFFIX = '.refs'
+
+
+def shared_memory_dir() -> str:
+    """Directory backed by shared memory, falling back to the temporary directory where there is none."""
+    return '/dev/shm' if os.path.isdir('/dev/shm') and os.access('/dev/shm', os.W_OK) else tempfile.gettempdir()
+
+
+def _update_refs(path: str, delta: int) -> int:
+    """Atomically add `delta` to the reference count of a segment, removing it once the count drops to zero."""
+    with open(path + REFS_SUFFIX, 'r+') as refs:
+        if fcntl is not None:
+            fcntl.flock(refs, fcntl.LOCK_EX)
+        count = int(refs.read() or 0)
+        if count <= 0:
+            # lost a race with the last release, which removed the segment while this process waited for the lock
+            raise FileNotFoundError(path)
+        count += delta
+        refs.seek(0)
+        refs.write(str(count))
+        refs.truncate()
+        if count <= 0:
+            _unlink(path)
+        # closing the file releases the lock
+    return count
+
+
+def _unlink(path: str):
+    for name in (path, path + REFS_SUFFIX):
+        try:
+            os.remove(name)
+        except FileNotFoundError:
+            pass
+
+
+def _release(path: str, pid: int):
+    if os.getpid() != pid:
+        # a forked child inherited the finalizer, the reference belongs to its parent
+        return
+    try:
+        _update_refs(path, -1)
+    except FileNotFoundError:
+        # already removed with `unlink`
+        pass
+
+
+class SharedResult:
+    """Handle of a query result stored in a shared Arrow IPC segment."""
+
+    def __init__(self, path: str):
+        """Initialize a handle of an existing segment, without attaching to it!
+
+        Args:
+            path: str
+                Segment file path, as found in `SharedResult.path` of the process that created it
+        """
+        self.path = path
+        self._finalizer: Optional[weakref.finalize] = None
+
+    @classmethod
+    def create(
+        cls, batches: Iterable[pa.RecordBatch], schema: pa.Schema, directory: Optional[str] = None
+    ) -> 'SharedResult':
+        """Write a stream of record batches into a new segment, attached with a single reference!
+
+        Args:
+            batches: Iterable[pa.RecordBatch]
+                Record batches to write, consumed lazily
+            schema: pa.Schema
+                Result schema, used when the stream holds no batches at all
+            directory: Optional[str]
+                Segment directory, defaults to `shared_memory_dir()`
+
+        Returns:
+            handle: SharedResult
+        """
+        path = os.path.join(directory or shared_memory_dir(), f'{SEGMENT_PREFIX}{uuid.uuid4().hex}{SEGMENT_SUFFIX}')
+        try:
+            # uncompressed, so that every process can memory-map the buffers as they are
+            write_ipc(batches, path, schema)
+            with open(path + REFS_SUFFIX, 'w') as refs:
+                refs.write('1')
+        except BaseException:
+            _unlink(path)
+            raise
+        handle = cls(path)
+        handle._finalizer = weakref.finalize(handle, _release, path, os.getpid())
+        return handle
+
+    @property
+    def attached(self) -> bool:
+        """Whether this handle holds a reference to the segment."""
+        return self._finalizer is not None and self._finalizer.alive
+
+    def attach(self) -> 'SharedResult':
+        """Take a reference to the segment, keeping it alive until `release`!
+
+        The reference is also released when the handle is garbage collected or the process exits normally.
+
+        Returns:
+            handle: SharedResult self
+        """
+        if self.attached:
+            return self
+        try:
+            _update_refs(self.path, 1)
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Shared result {self.path} was already released!")
+        self._finalizer = weakref.finalize(self, _release, self.path, os.getpid())
+        return self
+
+    def release(self):
+        """Drop this handle's reference, the last reference removes the segment."""
+        if self._finalizer is not None:
+            self._finalizer()
+
+    def unlink(self):
+        """Remove the segment regardless of the other references, e.g. after a process died while attached."""
+        if self._finalizer is not None:
+            self._finalizer.detach()
+        _unlink(self.path)
+
+    def table(self) -> pa.Table:
+        """Open the segment as a zero-copy, memory-mapped arrow table!"""
+        with pa.memory_map(self.path, 'r') as source:
+            return pa.ipc.open_file(source).read_all()
+
+    def to_pandas(
+        self,
+        dtypes: Optional['Dtypes'] = None,
+        dtype_backend: Optional[str] = None,
+        category_threshold: Optional[float] = None,
+    ) -> 'pd.DataFrame':
+        """Open the segment as a pandas DataFrame, see `DremioArrowClient.query` for the conversion arguments!
+
+        With `dtype_backend='pyarrow'` the DataFrame columns keep pointing at the shared pages.
+        """
+        from .convert import to_pandas
+
+        return to_pandas(self.table(), dtypes, dtype_backend=dtype_backend, category_threshold=category_threshold)
+
+    def __enter__(self) -> 'SharedResult':
+        """Attach the segment for the duration of a with block."""
+        return self.attach()
+
+    def __exit__(self, *exc: Any):
+        """Release the reference taken on enter."""
+        self.release()
+
+    def __reduce__(self):
+        """Pickle only the segment path, references are per process so unpickled handles start detached."""
+        return (SharedResult, (self.path,))
+
+    def __repr__(self) -> str:
+        """Show the segment path."""
+        return f'SharedResult({self.path!r})'
@@ -0,0 +1,157 @@
+"""Dremio Arrow Flight Client Result Budget Module.
+
+A query without a `LIMIT` keeps receiving record batches until the process runs out of memory, which takes a shared
+Jupyter host down with it. A `ResultBudget` caps the bytes of arrow data a query holds in memory, counted as batches
+arrive on the (possibly concurrent) endpoint streams of the query. Past the budget, the query either fails with a
+`MemoryError` and cancels its streams, or spills: every stream writes the batches it holds, and the rest of its
+batches, to an uncompressed Arrow IPC file, and the result is returned as a memory-mapped table backed by those files.
+
+Spill files are removed once mapped. The mapping keeps their data readable until the table is garbage collected, and
+the operating system pages it in and out on demand instead of holding it in memory.
+"""
+import os
+import tempfile
+import threading
+from typing import List, Optional, Union
+
+import pyarrow as pa
+
+SPILL_PREFIX = 'dremioarrow-spill-'
+
+
+class ResultBudget:
+    """Bytes of a query result held in memory, shared by every stream of the query."""
+
+    def __init__(self, max_bytes: int, spill: Union[bool, str] = False):
+        """Initialize the budget of a single query!
+
+        Args:
+            max_bytes: int
+                Maximum bytes of arrow data held in memory
+            spill: Union[bool, str]
+                Spill the result to disk past the budget instead of failing. \
+                    True spills to the temporary directory, a path spills into that directory.
+        """
+        if max_bytes < 0:
+            raise ValueError("max_result_bytes must not be negative!")
+        self.max_bytes = max_bytes
+        self.spill = spill
+        self.directory = spill if isinstance(spill, str) else None
+        self.received = 0
+        self.spilled = 0
+        self.exceeded = False
+        self._lock = threading.Lock()
+
+    def charge(self, nbytes: int) -> bool:
+        """Account for a received batch, False once the budget is exceeded (by this batch or an earlier one)."""
+        with self._lock:
+            if not self.exceeded and self.received + nbytes > self.max_bytes:
+                self.exceeded = True
+            if self.exceeded:
+                return False
+            self.received += nbytes
+            return True
+
+    def add_spilled(self, nbytes: int):
+        """Account for a batch written to a spill file."""
+        with self._lock:
+            self.spilled += nbytes
+
+    def release(self, received: int, spilled: int = 0):
+        """Give back the bytes of a discarded stream, e.g. one read again after a transient failure."""
+        with self._lock:
+            self.received -= received
+            self.spilled -= spilled
+
+    def error(self) -> MemoryError:
+        """The error a query exceeding its budget fails with."""
+        return MemoryError(
+            f"Query result exceeds max_result_bytes ({self.max_bytes:,} bytes)! "
+            "Add a LIMIT, stream the result with query_batches, or pass spill=True to spill it to disk."
+        )
+
+
+class ResultSink:
+    """Collects the record batches of one stream, in memory until its budget is exceeded and on disk afterwards."""
+
+    def __init__(self, schema: pa.Schema, budget: Optional[ResultBudget] = None):
+        """Initialize an empty sink!
+
+        Args:
+            schema: pa.Schema
+                Stream schema
+            budget: Optional[ResultBudget]
+                Query budget shared with the other streams, unlimited when None
+        """
+        self.schema = schema
+        self.budget = budget
+        self.path: Optional[str] = None
+        self._batches: List[pa.RecordBatch] = []
+        self._writer: Optional[pa.ipc.RecordBatchFileWriter] = None
+        self._sink: Optional[pa.NativeFile] = None
+        # bytes charged to the budget, held in memory or written to the spill file
+        self._charged = 0
+        self._spilled = 0
+
+    def add(self, batch: pa.RecordBatch):
+        """Keep a received batch, raising `MemoryError` past the budget unless the budget spills."""
+        if self._writer is None:
+            if self.budget is None or self.budget.charge(batch.nbytes):
+                self._batches.append(batch)
+                self._charged += batch.nbytes
+                return
+            if not self.budget.spill:
+                raise self.budget.error()
+            self._start_spill()
+        self._write(batch)
+
+    def _start_spill(self):
+        fd, self.path = tempfile.mkstemp(prefix=SPILL_PREFIX, suffix='.arrow', dir=self.budget.directory)
+        os.close(fd)
+        self._sink = pa.OSFile(self.path, 'wb')
+        # uncompressed, so the file can be memory-mapped as it is
+        self._writer = pa.ipc.new_file(self._sink, self.schema)
+        batches, self._batches = self._batches, []
+        for held in batches:
+            self._write(held)
+
+    def _write(self, batch: pa.RecordBatch):
+        if self._writer is None or self.budget is None:
+            raise ValueError("Only a sink spilling to disk writes batches!")
+        self._writer.write_batch(batch)
+        self.budget.add_spilled(batch.nbytes)
+        self._spilled += batch.nbytes
+
+    def table(self) -> pa.Table:
+        """The collected batches, memory-mapped from the spill file when the sink spilled."""
+        if self._writer is None or self._sink is None or self.path is None:
+            return pa.Table.from_batches(self._batches, schema=self.schema)
+        self._writer.close()
+        self._sink.close()
+        try:
+            with pa.memory_map(self.path, 'r') as source:
+                table = pa.ipc.open_file(source).read_all()
+        finally:
+            self._remove()
+        return table
+
+    def discard(self):
+        """Drop the collected batches and the spill file, e.g. after the stream failed, releasing their budget."""
+        self._batches = []
+        if self.budget is not None:
+            self.budget.release(self._charged, self._spilled)
+            self._charged = self._spilled = 0
+        if self._writer is not None:
+            try:
+                self._writer.close()
+                self._sink.close()
+            except (OSError, pa.ArrowException):
+                pass
+            self._remove()
+
+    def _remove(self):
+        try:
+            os.remove(self.path)
+        except OSError:
+            # mapped files cannot be removed on windows, they are left in the spill directory
+            pass
@@ -0,0 +1,255 @@
+"""Dremio Arrow Flight Client Incremental Sync Module.
+
+Keeps a local Parquet or Arrow IPC dataset directory in step with a Dremio table that only ever grows, without
+re-pulling the whole table. The high-water mark of a monotonically increasing timestamp or ID column is stored next
+to the data files; each sync only queries the rows past it and appends them to the directory as a new file.
+
+The watermark file name starts with an underscore, so `pyarrow.dataset` and `pandas.read_parquet` skip it when
+reading the directory back.
+
+A sync writes its data files to a hidden staging directory first, and only moves them into the dataset once the
+stream is drained and the new watermark is encoded. The watermark is replaced last; when that fails, the files just
+published are removed again, so an interrupted sync never leaves rows behind that the next sync would duplicate.
+"""
+import datetime
+import decimal
+import json
+import os
+import shutil
+import time
+import uuid
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Sequence, Union
+
+import pyarrow as pa
+import pyarrow.compute as pc
+
+from ._sql import quote_identifier, sql_literal, table_path
+from .writers import write_ipc, write_parquet
+
+if TYPE_CHECKING:
+    from .client import DremioArrowClient
+
+WATERMARK_FILE = '_dremioarrow_watermark.json'
+SYNC_FORMATS = ('parquet', 'arrow')
+
+
+def _encode_watermark(column: str, value: Any) -> Dict[str, Any]:
+    """JSON document of a watermark, tagged with its python type so it round-trips exactly."""
+    if isinstance(value, datetime.datetime):
+        return {'column': column, 'type': 'datetime', 'value': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'column': column, 'type': 'date', 'value': value.isoformat()}
+    if isinstance(value, decimal.Decimal):
+        # as a string, a JSON number would lose the precision of decimal128 values
+        return {'column': column, 'type': 'decimal', 'value': str(value)}
+    if isinstance(value, (bool, int, float, str)):
+        return {'column': column, 'type': type(value).__name__, 'value': value}
+    raise TypeError(f"Cannot store a watermark of type {type(value).__name__}!")
+
+
+def _decode_watermark(document: Dict[str, Any]) -> Any:
+    if document['type'] == 'datetime':
+        return datetime.datetime.fromisoformat(document['value'])
+    if document['type'] == 'date':
+        return datetime.date.fromisoformat(document['value'])
+    if document['type'] == 'decimal':
+        return decimal.Decimal(document['value'])
+    return document['value']
+
+
+def read_watermark(directory: str, column: Optional[str] = None) -> Any:
+    """Read the high-water mark stored in a synced dataset directory!
+
+    Args:
+        directory: str
+            Dataset directory
+        column: Optional[str]
+            Expected watermark column, a ValueError is raised when the directory was synced on another one
+
+    Returns:
+        watermark: Any the largest value synced so far, None when the directory was never synced
+    """
+    try:
+        with open(os.path.join(directory, WATERMARK_FILE)) as source:
+            document = json.load(source)
+    except FileNotFoundError:
+        return None
+    if column is not None and document['column'] != column:
+        raise ValueError(f"{directory} is synced on column {document['column']}, not {column}!")
+    return _decode_watermark(document)
+
+
+def _stage_watermark(directory: str, column: str, value: Any) -> str:
+    """Write a watermark to a temporary file next to the watermark file, and return its path."""
+    document = _encode_watermark(column, value)
+    temporary = os.path.join(directory, f'{WATERMARK_FILE}.{uuid.uuid4().hex}.tmp')
+    try:
+        with open(temporary, 'w') as sink:
+            json.dump(document, sink)
+    except BaseException:
+        _remove(temporary)
+        raise
+    return temporary
+
+
+def write_watermark(directory: str, column: str, value: Any):
+    """Atomically store the high-water mark of a synced dataset directory."""
+    temporary = _stage_watermark(directory, column, value)
+    try:
+        os.replace(temporary, os.path.join(directory, WATERMARK_FILE))
+    finally:
+        _remove(temporary)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _publish(staging: str, directory: str) -> List[str]:
+    """Move the files of a staging directory into the dataset directory, keeping their relative paths.
+
+    Returns:
+        paths: List[str] published file paths. On failure, the files published so far are removed again.
+    """
+    published: List[str] = []
+    try:
+        for root, _, names in os.walk(staging):
+            for name in sorted(names):
+                source = os.path.join(root, name)
+                target = os.path.join(directory, os.path.relpath(source, staging))
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                os.replace(source, target)
+                published.append(target)
+    except BaseException:
+        _unpublish(published, directory)
+        raise
+    return published
+
+
+def _unpublish(paths: Sequence[str], directory: str):
+    """Remove published files, along with the partition directories left empty."""
+    for path in paths:
+        _remove(path)
+        parent = os.path.dirname(path)
+        while os.path.abspath(parent) != os.path.abspath(directory):
+            try:
+                os.rmdir(parent)
+            except OSError:
+                break
+            parent = os.path.dirname(parent)
+
+
+def sync_table(
+    client: 'DremioArrowClient',
+    table: Union[str, Sequence[str]],
+    column: str,
+    directory: str,
+    format: str = 'parquet',
+    columns: Optional[Sequence[str]] = None,
+    start_after: Any = None,
+    row_group_size: Optional[int] = None,
+    compression: Optional[str] = None,
+    partition_cols: Optional[Sequence[str]] = None,
+) -> int:
+    """Append the rows of a Dremio table past the stored high-water mark to a local dataset directory!
+
+    Args:
+        client: DremioArrowClient
+            Client running the delta query
+        table: Union[str, Sequence[str]]
+            Dremio table path, either as SQL text (e.g. `"space"."folder"."events"`) or a sequence of \
+                unquoted path components (e.g. `['space', 'folder', 'events']`)
+        column: str
+            Monotonically increasing timestamp, date or ID column of the table
+        directory: str
+            Local dataset directory, created when missing
+        format: str
+            Data file format, parquet (default) or arrow (Arrow IPC)
+        columns: Optional[Sequence[str]]
+            Columns to sync, defaults to every column. The watermark column is always included.
+        start_after: Any
+            Watermark of the first sync, e.g. to skip history. Ignored once a watermark is stored.
+        row_group_size: Optional[int]
+            Maximum number of rows per parquet row group, defaults to pyarrow's default
+        compression: Optional[str]
+            Compression codec, defaults to snappy for parquet and uncompressed for arrow. \
+                Parquet also accepts e.g. zstd, gzip or none, Arrow IPC lz4 or zstd.
+        partition_cols: Optional[Sequence[str]]
+            Columns to partition a hive-style parquet dataset by
+
+    Returns:
+        rows: int number of rows appended, 0 when the directory is already up to date
+    """
+    if format not in SYNC_FORMATS:
+        raise ValueError(f"format must be one of {', '.join(SYNC_FORMATS)}!")
+    if partition_cols and format != 'parquet':
+        raise ValueError("partition_cols parameter is only supported by the parquet format!")
+    if format == 'parquet' and compression is None:
+        compression = 'snappy'
+    os.makedirs(directory, exist_ok=True)
+    watermark = read_watermark(directory, column)
+    if watermark is None:
+        watermark = start_after
+
+    selected = '*'
+    if columns:
+        selected = ', '.join(quote_identifier(name) for name in dict.fromkeys([*columns, column]))
+    sql = f'SELECT {selected} FROM {table_path(table)}'
+    if watermark is not None:
+        sql += f' WHERE {quote_identifier(column)} > {sql_literal(watermark)}'
+
+    schema, batches = client._stream_batches(sql)
+    if column not in schema.names:
+        raise ValueError(f"{column} is not a valid column name in the table!")
+    high = None
+
+    def tracked(stream: Iterator[pa.RecordBatch]) -> Iterator[pa.RecordBatch]:
+        nonlocal high
+        for batch in stream:
+            batch_high = pc.max(batch.column(column)).as_py()
+            if batch_high is not None and (high is None or batch_high > high):
+                high = batch_high
+            yield batch
+
+    # time ordered, unique data file names so files of successive syncs never collide
+    stem = f"part-{time.strftime('%Y%m%dT%H%M%S', time.gmtime())}-{uuid.uuid4().hex[:8]}"
+    # written to a hidden directory first, so readers never see partially written files
+    staging = os.path.join(directory, f'.{stem}.tmp')
+    watermark_file: Optional[str] = None
+    published: List[str] = []
+    try:
+        os.makedirs(staging)
+        if partition_cols:
+            rows = write_parquet(
+                tracked(batches),
+                staging,
+                schema,
+                row_group_size=row_group_size,
+                compression=compression,
+                partition_cols=partition_cols,
+                basename_template=f'{stem}-{{i}}.parquet',
+            )
+        elif format == 'parquet':
+            path = os.path.join(staging, f'{stem}.parquet')
+            rows = write_parquet(tracked(batches), path, schema, row_group_size=row_group_size, compression=compression)
+        else:
+            rows = write_ipc(tracked(batches), os.path.join(staging, f'{stem}.arrow'), schema, compression=compression)
+        if high is not None:
+            # encoded before any data file is published, an unsupported watermark type publishes nothing
+            watermark_file = _stage_watermark(directory, column, high)
+        if rows:
+            published = _publish(staging, directory)
+        if watermark_file is not None:
+            os.replace(watermark_file, os.path.join(directory, WATERMARK_FILE))
+    except BaseException:
+        # without their watermark, the next sync would append the published rows again
+        _unpublish(published, directory)
+        raise
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+        if watermark_file is not None:
+            _remove(watermark_file)
+    return rows
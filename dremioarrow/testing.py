@@ -0,0 +1,355 @@
+"""Dremio Arrow Flight Client Testing Module.
+
+A local, Dremio-compatible stand-in Flight server for tests and benchmarks, so the client can be exercised without
+a live Dremio cluster.
+
+The stand-in emulates the parts of Dremio's Flight endpoint the client relies on:
+    Handshake: basic-auth handshake answered with an `authorization` bearer header, echoed on every call
+    GetFlightInfo: a FlightInfo whose result set is split across a configurable number of endpoints
+    GetSchema: the result schema without running the query
+    DoGet: the endpoint's share of the result set, streamed in batches of a configurable size
+    Flight SQL prepared statements: created and closed with DoAction, parameters bound with DoPut and executed \
+        with GetFlightInfo. Statement handles are bound to the session that created them.
+
+SQL is not parsed: every query returns the configured table. Received SQL text and routing headers are recorded so
+tests can assert on what the client sent. Planning and first-batch latency can be injected to mimic a remote
+cluster, and flight errors to mimic an unreliable one: calls failing outright, or DoGet streams failing part way.
+"""
+import base64
+import secrets
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+
+import numpy as np
+import pyarrow as pa
+from pyarrow import flight
+
+from .flightsql import CLOSE_PREPARED_STATEMENT, CREATE_PREPARED_STATEMENT, decode_message, encode_message
+
+STANDIN_USERNAME = 'dremio'
+STANDIN_PASSWORD = 'dremio123'
+
+
+def make_table(num_rows: int, seed: int = 0) -> pa.Table:
+    """Generate a synthetic NYC-taxi-like table with integer, string, datetime, date and float columns.
+
+    Args:
+        num_rows: int
+            Number of rows to generate
+        seed: int
+            Random seed for the fare column
+
+    Returns:
+        table: pa.Table
+    """
+    ids = np.arange(num_rows, dtype=np.int64)
+    vendors = pa.array([f'vendor-{i}' for i in range(50)])
+    return pa.table(
+        {
+            'id': ids,
+            'vendor': pa.DictionaryArray.from_arrays(pa.array(ids % 50, pa.int32()), vendors).dictionary_decode(),
+            'pickup_datetime': pa.array(1_577_836_800_000_000 + ids * 1_000_000, pa.timestamp('us')),
+            'hire_date': pa.array((18_262 + ids % 1_000).astype(np.int32), pa.date32()),
+            'fare_amount': np.random.default_rng(seed).uniform(2.5, 80.0, num_rows).round(2),
+        }
+    )
+
+
+class _BearerAuthMiddleware(flight.ServerMiddleware):
+    """Sends the session bearer token back on every call, as Dremio does."""
+
+    def __init__(self, token: str):
+        self.token = token
+
+    def sending_headers(self) -> Dict[str, str]:
+        return {'authorization': f'Bearer {self.token}'}
+
+
+class _BasicAuthMiddlewareFactory(flight.ServerMiddlewareFactory):
+    """Validates basic credentials on handshake, and the issued bearer token on any other call."""
+
+    def __init__(self, server: 'DremioStandInServer'):
+        self.server = server
+
+    def start_call(self, info: flight.CallInfo, headers: Dict[str, List[str]]) -> _BearerAuthMiddleware:
+        if info.method != flight.FlightMethod.DO_GET:
+            # DoGet faults may fail the stream part way, they are raised by `do_get` itself
+            self.server._raise_fault(info.method.name.lower())
+        values = headers.get('authorization') or []
+        if not values:
+            raise flight.FlightUnauthenticatedError('No authorization header supplied.')
+        scheme, _, credentials = values[0].partition(' ')
+        if scheme == 'Basic':
+            username, _, password = base64.b64decode(credentials).decode('utf-8').partition(':')
+            if (username, password) != (self.server.username, self.server.password):
+                raise flight.FlightUnauthenticatedError('Invalid username or password.')
+            routing = (_first(headers, 'routing-tag'), _first(headers, 'routing-queue'))
+            return _BearerAuthMiddleware(self.server._issue_token(routing))
+        if scheme == 'Bearer' and self.server.is_valid_token(credentials):
+            return _BearerAuthMiddleware(credentials)
+        raise flight.FlightUnauthenticatedError('Invalid or expired session token.')
+
+
+class _NoopAuthHandler(flight.ServerAuthHandler):
+    """Lets the handshake RPC through, authentication itself happens in the header middleware."""
+
+    def authenticate(self, outgoing, incoming):
+        pass
+
+    def is_valid(self, token):
+        return ''
+
+
+def _first(headers: Dict[str, List[str]], key: str) -> Optional[str]:
+    values = headers.get(key)
+    return values[0] if values else None
+
+
+class DremioStandInServer(flight.FlightServerBase):
+    """A local Flight server emulating Dremio's authentication and multi-endpoint query results."""
+
+    def __init__(
+        self,
+        table: Optional[pa.Table] = None,
+        num_rows: int = 10_000,
+        num_endpoints: int = 1,
+        batch_size: int = 4_096,
+        latency: float = 0.0,
+        batch_latency: float = 0.0,
+        username: str = STANDIN_USERNAME,
+        password: str = STANDIN_PASSWORD,
+        host: str = '127.0.0.1',
+        port: int = 0,
+    ):
+        """Start serving on a background thread!
+
+        Args:
+            table: Optional[pa.Table]
+                Result set returned for every query, defaults to `make_table(num_rows)`
+            num_rows: int
+                Number of rows of the generated result set when `table` is not provided
+            num_endpoints: int
+                Number of endpoints the result set is split across
+            batch_size: int
+                Maximum number of rows per streamed record batch
+            latency: float
+                Seconds of delay injected into query planning (GetFlightInfo) and before the first batch (DoGet)
+            batch_latency: float
+                Seconds of delay injected before every streamed batch, mimicking a limited network bandwidth. \
+                    Flight errors are injected with `inject_faults`.
+            username: str
+                Account username accepted by the handshake
+            password: str
+                Account password accepted by the handshake
+            host: str
+                Interface to listen on, defaults to the loopback interface
+            port: int
+                Port to listen on, defaults to a free port picked by the OS
+        """
+        if num_endpoints < 1:
+            raise ValueError("num_endpoints must be at least 1!")
+        self.table = table if table is not None else make_table(num_rows)
+        self.num_endpoints = num_endpoints
+        self.batch_size = batch_size
+        self.latency = latency
+        self.batch_latency = batch_latency
+        self.username = username
+        self.password = password
+        self.host = host
+        # SQL text of every GetFlightInfo/GetSchema call, in arrival order
+        self.queries: List[str] = []
+        # SQL text of every prepared statement created, and of every prepared statement executed, in arrival order
+        self.prepared: List[str] = []
+        self.executions: List[str] = []
+        # parameter values bound to prepared statements, in arrival order
+        self.bindings: List[pa.Table] = []
+        # routing (tag, queue) headers of every handshake, in arrival order
+        self.routings: List[Tuple[Optional[str], Optional[str]]] = []
+        # endpoint index of every DoGet call, in arrival order
+        self.streams: List[int] = []
+        # flight method -> (error, batches streamed before it) of the faults still to inject, see `inject_faults`
+        self._faults: Dict[str, List[Tuple[Type[flight.FlightError], int]]] = {}
+        self._tokens: Dict[str, Tuple[Optional[str], Optional[str]]] = {}
+        # prepared statement handle -> (SQL text, session token)
+        self._statements: Dict[bytes, Tuple[str, str]] = {}
+        self._lock = threading.Lock()
+        super().__init__(
+            f'grpc+tcp://{host}:{port}',
+            auth_handler=_NoopAuthHandler(),
+            middleware={'auth': _BasicAuthMiddlewareFactory(self)},
+        )
+
+    @property
+    def credentials(self) -> Dict[str, Any]:
+        """`DremioArrowClient` connection arguments for this server."""
+        return {'host': self.host, 'port': str(self.port), 'username': self.username, 'password': self.password}
+
+    def _issue_token(self, routing: Tuple[Optional[str], Optional[str]]) -> str:
+        token = secrets.token_urlsafe(16)
+        with self._lock:
+            self._tokens[token] = routing
+            self.routings.append(routing)
+        return token
+
+    def is_valid_token(self, token: str) -> bool:
+        """Check a bearer token was issued by this server and has not been expired."""
+        with self._lock:
+            return token in self._tokens
+
+    @property
+    def handshakes(self) -> int:
+        """Number of successful basic-auth handshakes served so far."""
+        with self._lock:
+            return len(self.routings)
+
+    def expire_tokens(self):
+        """Invalidate every issued session token, forcing clients to re-authenticate."""
+        with self._lock:
+            self._tokens.clear()
+            # prepared statements do not outlive their session
+            self._statements.clear()
+
+    def inject_faults(
+        self,
+        method: str,
+        count: int = 1,
+        error: Type[flight.FlightError] = flight.FlightUnavailableError,
+        after_batches: int = 0,
+    ):
+        """Fail the next `count` calls of a flight method, e.g. to exercise client retries!
+
+        Args:
+            method: str
+                Flight method name, e.g. `handshake`, `get_flight_info` or `do_get`
+            count: int
+                Number of consecutive calls failing
+            error: Type[flight.FlightError]
+                Error the calls fail with, defaults to the transient FlightUnavailableError
+            after_batches: int
+                DoGet only: record batches streamed before the stream fails, 0 fails the call itself
+        """
+        if after_batches and method != 'do_get':
+            raise ValueError("Only do_get faults can fail after streaming batches!")
+        with self._lock:
+            self._faults.setdefault(method, []).extend([(error, after_batches)] * count)
+
+    def _fault(self, method: str) -> Optional[Tuple[Type[flight.FlightError], int]]:
+        """Take the next fault injected into a flight method, if any."""
+        with self._lock:
+            faults = self._faults.get(method)
+            return faults.pop(0) if faults else None
+
+    def _raise_fault(self, method: str):
+        fault = self._fault(method)
+        if fault is not None:
+            raise fault[0](f'Injected {method} fault.')
+
+    @property
+    def open_statements(self) -> int:
+        """Number of prepared statements created and not closed yet."""
+        with self._lock:
+            return len(self._statements)
+
+    def _statement(self, context: flight.ServerCallContext, handle: bytes) -> str:
+        """SQL text of a prepared statement handle of the calling session."""
+        token = context.get_middleware('auth').token
+        with self._lock:
+            sql, session = self._statements.get(handle, (None, None))
+        if sql is None or session != token:
+            raise flight.FlightServerError('Unknown prepared statement handle.')
+        return sql
+
+    def do_action(self, context: flight.ServerCallContext, action: flight.Action) -> Iterator[bytes]:
+        """Create and close Flight SQL prepared statements."""
+        message = decode_message(action.body.to_pybytes())
+        if action.type == CREATE_PREPARED_STATEMENT and message is not None:
+            sql = message[1].get('query', b'').decode('utf-8')
+            handle = secrets.token_bytes(16)
+            # parameter types are not inferred, clients type `?` placeholders from the bound values
+            parameters = pa.schema([(f'parameter_{index}', pa.null()) for index in range(1, sql.count('?') + 1)])
+            with self._lock:
+                self.prepared.append(sql)
+                self._statements[handle] = (sql, context.get_middleware('auth').token)
+            time.sleep(self.latency)
+            yield encode_message(
+                'ActionCreatePreparedStatementResult',
+                prepared_statement_handle=handle,
+                dataset_schema=self.table.schema.serialize().to_pybytes(),
+                parameter_schema=parameters.serialize().to_pybytes(),
+            )
+        elif action.type == CLOSE_PREPARED_STATEMENT and message is not None:
+            handle = message[1].get('prepared_statement_handle', b'')
+            self._statement(context, handle)
+            with self._lock:
+                del self._statements[handle]
+        else:
+            raise flight.FlightServerError(f'Unknown action {action.type}.')
+
+    def do_put(
+        self,
+        context: flight.ServerCallContext,
+        descriptor: flight.FlightDescriptor,
+        reader: flight.MetadataRecordBatchReader,
+        writer: flight.FlightMetadataWriter,
+    ):
+        """Bind the parameter values of a prepared statement."""
+        message = decode_message(descriptor.command)
+        if message is None or message[0] != 'CommandPreparedStatementQuery':
+            raise flight.FlightServerError('Only prepared statement parameters can be uploaded.')
+        handle = message[1].get('prepared_statement_handle', b'')
+        self._statement(context, handle)
+        parameters = reader.read_all()
+        with self._lock:
+            self.bindings.append(parameters)
+        writer.write(pa.py_buffer(encode_message('DoPutPreparedStatementResult', prepared_statement_handle=handle)))
+
+    def _record(self, descriptor: flight.FlightDescriptor) -> str:
+        sql = descriptor.command.decode('utf-8')
+        with self._lock:
+            self.queries.append(sql)
+        return sql
+
+    def _partitions(self, table: pa.Table) -> List[pa.Table]:
+        step = -(-table.num_rows // self.num_endpoints)
+        return [table.slice(index * step, step) for index in range(self.num_endpoints)]
+
+    def get_flight_info(self, context: flight.ServerCallContext, descriptor: flight.FlightDescriptor):
+        """Plan a query, or execute a prepared statement: split the result set across `num_endpoints` endpoints."""
+        message = decode_message(descriptor.command)
+        if message is not None and message[0] == 'CommandPreparedStatementQuery':
+            # already planned, no planning latency
+            sql = self._statement(context, message[1].get('prepared_statement_handle', b''))
+            with self._lock:
+                self.executions.append(sql)
+        else:
+            self._record(descriptor)
+            time.sleep(self.latency)
+        endpoints = [flight.FlightEndpoint(str(index).encode('utf-8'), []) for index in range(self.num_endpoints)]
+        return flight.FlightInfo(self.table.schema, descriptor, endpoints, self.table.num_rows, self.table.nbytes)
+
+    def get_schema(self, context: flight.ServerCallContext, descriptor: flight.FlightDescriptor):
+        """Return the result schema without running the query."""
+        self._record(descriptor)
+        return flight.SchemaResult(self.table.schema)
+
+    def do_get(self, context: flight.ServerCallContext, ticket: flight.Ticket):
+        """Stream the endpoint's share of the result set."""
+        index = int(ticket.ticket.decode('utf-8'))
+        with self._lock:
+            self.streams.append(index)
+        fault = self._fault('do_get')
+        if fault is not None and not fault[1]:
+            raise fault[0]('Injected do_get fault.')
+        partition = self._partitions(self.table)[index]
+        return flight.GeneratorStream(partition.schema, self._batches(partition, fault))
+
+    def _batches(
+        self, partition: pa.Table, fault: Optional[Tuple[Type[flight.FlightError], int]] = None
+    ) -> Iterator[pa.RecordBatch]:
+        time.sleep(self.latency)
+        for sent, batch in enumerate(partition.to_batches(max_chunksize=self.batch_size)):
+            if fault is not None and sent == fault[1]:
+                raise fault[0]('Injected do_get fault.')
+            time.sleep(self.batch_latency)
+            yield batch
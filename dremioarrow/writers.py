@@ -0,0 +1,142 @@
+"""Dremio Arrow Flight Client File Writers Module.
+
+Streams record batches read from the flight server straight into Parquet and Arrow IPC files, batch by batch.
+Results are never materialized as a whole, let alone converted to a pandas DataFrame, so peak memory stays bounded
+by the row group size and arrow types are preserved end to end.
+"""
+import itertools
+from typing import BinaryIO, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# pyarrow's own default maximum number of rows per parquet row group
+DEFAULT_ROW_GROUP_SIZE = 1024 * 1024
+
+
+def _peek(batches: Iterable[pa.RecordBatch], schema: pa.Schema) -> Tuple[pa.Schema, Iterator[pa.RecordBatch]]:
+    """Take the schema from the first batch, which is authoritative, falling back to the given one when empty."""
+    iterator = iter(batches)
+    first = next(iterator, None)
+    if first is None:
+        return schema, iter(())
+    return first.schema, itertools.chain((first,), iterator)
+
+
+def _aligned(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """Copy a record batch into freshly allocated, aligned buffers.
+
+    Batches decoded from a flight stream point into gRPC message buffers at arbitrary offsets. The dataset \
+        writer (acero) warns on, and may crash on some hardware with, such unaligned buffers.
+    """
+    return pa.RecordBatch.from_arrays([pa.concat_arrays([column]) for column in batch.columns], schema=batch.schema)
+
+
+def write_parquet(
+    batches: Iterable[pa.RecordBatch],
+    path: Union[str, BinaryIO],
+    schema: pa.Schema,
+    row_group_size: Optional[int] = None,
+    compression: Optional[str] = 'snappy',
+    partition_cols: Optional[Sequence[str]] = None,
+    basename_template: Optional[str] = None,
+) -> int:
+    """Write a stream of record batches to a Parquet file, or a hive-partitioned Parquet dataset!
+
+    Args:
+        batches: Iterable[pa.RecordBatch]
+            Record batches to write, consumed lazily
+        path: Union[str, BinaryIO]
+            Output Parquet file path or writable binary file object, or dataset directory when `partition_cols` is set
+        schema: pa.Schema
+            Result schema, used when the stream holds no batches at all
+        row_group_size: Optional[int]
+            Maximum number of rows per row group, defaults to DEFAULT_ROW_GROUP_SIZE
+        compression: Optional[str]
+            Compression codec, e.g. snappy, zstd, gzip or None, defaults to snappy
+        partition_cols: Optional[Sequence[str]]
+            Columns to partition the dataset directory by
+        basename_template: Optional[str]
+            Partitioned dataset file name template containing `{i}`, defaults to pyarrow's `part-{i}.parquet`
+
+    Returns:
+        rows: int number of rows written
+    """
+    if row_group_size is not None and row_group_size < 1:
+        raise ValueError("row_group_size must be at least 1!")
+    row_group_size = row_group_size if row_group_size is not None else DEFAULT_ROW_GROUP_SIZE
+    schema, batches = _peek(batches, schema)
+    rows = 0
+
+    if partition_cols:
+        import pyarrow.dataset as ds
+
+        if not isinstance(path, str):
+            raise TypeError("partition_cols parameter needs a dataset directory path, not a file object!")
+
+        def counted(stream: Iterator[pa.RecordBatch]) -> Iterator[pa.RecordBatch]:
+            nonlocal rows
+            for batch in stream:
+                rows += batch.num_rows
+                yield _aligned(batch)
+
+        ds.write_dataset(
+            counted(batches),
+            path,
+            schema=schema,
+            format='parquet',
+            partitioning=list(partition_cols),
+            partitioning_flavor='hive',
+            basename_template=basename_template,
+            file_options=ds.ParquetFileFormat().make_write_options(compression=compression or 'none'),
+            min_rows_per_group=row_group_size,
+            max_rows_per_group=row_group_size,
+            existing_data_behavior='overwrite_or_ignore',
+        )
+        return rows
+
+    with pq.ParquetWriter(path, schema, compression=compression or 'none') as writer:
+        # flight batches are small, buffer them so row groups are not one batch each
+        pending: List[pa.RecordBatch] = []
+        pending_rows = 0
+        for batch in batches:
+            pending.append(batch)
+            pending_rows += batch.num_rows
+            while pending_rows >= row_group_size:
+                table = pa.Table.from_batches(pending, schema=schema)
+                writer.write_table(table.slice(0, row_group_size), row_group_size=row_group_size)
+                rest = table.slice(row_group_size)
+                pending, pending_rows = rest.to_batches(), rest.num_rows
+                rows += row_group_size
+        if pending_rows:
+            writer.write_table(pa.Table.from_batches(pending, schema=schema), row_group_size=row_group_size)
+            rows += pending_rows
+    return rows
+
+
+def write_ipc(
+    batches: Iterable[pa.RecordBatch], path: Union[str, BinaryIO], schema: pa.Schema, compression: Optional[str] = None
+) -> int:
+    """Write a stream of record batches to an Arrow IPC (Feather v2) file!
+
+    Args:
+        batches: Iterable[pa.RecordBatch]
+            Record batches to write, consumed lazily
+        path: Union[str, BinaryIO]
+            Output Arrow IPC file path or writable binary file object
+        schema: pa.Schema
+            Result schema, used when the stream holds no batches at all
+        compression: Optional[str]
+            Buffer compression codec, lz4 or zstd, defaults to None (uncompressed, memory-mappable)
+
+    Returns:
+        rows: int number of rows written
+    """
+    schema, batches = _peek(batches, schema)
+    rows = 0
+    options = pa.ipc.IpcWriteOptions(compression=compression)
+    with pa.ipc.new_file(path, schema, options=options) as writer:
+        for batch in batches:
+            writer.write_batch(batch)
+            rows += batch.num_rows
+    return rows
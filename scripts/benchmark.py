@@ -0,0 +1,292 @@
+"""Dremio Arrow Flight Client hot path benchmarks!
+
+Runs the client against the local stand-in flight server (`dremioarrow.testing`), so no live Dremio cluster is
+needed. Every benchmark case runs in a fresh interpreter so that its peak resident memory is measured in isolation.
+
+Reported per case:
+    rows/s: result rows delivered per second of wall time
+    MB/s: arrow bytes delivered per second of wall time
+    TTFB: time to first batch, where the case exposes it
+    peak RSS: peak resident memory of the process running the case
+
+Import times of the package entry points are measured in fresh interpreters as well, unless `--no-imports`.
+
+Usage:
+    python scripts/benchmark.py --rows 1000000 --endpoints 4 --latency 0.05
+    python scripts/benchmark.py --cases query query_ts_col --repeat 5 --json bench.json
+    python scripts/benchmark.py --cases query_to_parquet query_to_parquet_sync --batch-size 131072 --batch-latency 0.02
+"""
+import argparse
+import json
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from typing import Callable, Dict, List, Optional
+
+from dremioarrow.testing import DremioStandInServer, make_table
+
+SQL = 'SELECT * FROM "Dremio Sample Data"."samples.dremio.com"."NYC-taxi-trips"'
+
+# name -> import statement timed in a fresh interpreter
+IMPORTS = {
+    'import dremioarrow': 'import dremioarrow',
+    'client': 'from dremioarrow import DremioArrowClient',
+    'client + pandas': 'from dremioarrow import DremioArrowClient; import dremioarrow.convert',
+}
+
+# name -> function(credentials) -> optional time to first batch, in seconds
+CASES: Dict[str, Callable[[Dict[str, str]], Optional[float]]] = {}
+# cases that never convert to pandas, so pandas is not imported for them
+ARROW_CASES = set()
+# cases reading endpoints in the `default_process_pool`, whose workers are started outside of the timed section
+PROCESS_CASES = set()
+
+
+def case(name: str, arrow_only: bool = False, processes: bool = False):
+    """Register a benchmark case."""
+
+    def register(function: Callable[[Dict[str, str]], Optional[float]]):
+        CASES[name] = function
+        if arrow_only:
+            ARROW_CASES.add(name)
+        if processes:
+            PROCESS_CASES.add(name)
+        return function
+
+    return register
+
+
+@case('query')
+def bench_query(credentials: Dict[str, str]) -> Optional[float]:
+    """`DremioArrowClient.query` into a pandas DataFrame."""
+    from dremioarrow import DremioArrowClient
+
+    collected = []
+    DremioArrowClient(**credentials, stats_hooks=[collected.append]).query(SQL)
+    return collected[0].first_batch_seconds
+
+
+@case('query_arrow', arrow_only=True)
+def bench_query_arrow(credentials: Dict[str, str]) -> Optional[float]:
+    """`DremioArrowClient.query` returning the arrow table, pandas is never imported."""
+    from dremioarrow import DremioArrowClient
+
+    collected = []
+    DremioArrowClient(**credentials, stats_hooks=[collected.append]).query(SQL, output='arrow')
+    return collected[0].first_batch_seconds
+
+
+@case('dremio_query')
+def bench_dremio_query(credentials: Dict[str, str]) -> Optional[float]:
+    """`dremio_query` convenience function, including session setup."""
+    from dremioarrow import dremio_query
+
+    dremio_query(SQL, **credentials)
+    return None
+
+
+@case('query_ts_col')
+def bench_query_ts_col(credentials: Dict[str, str]) -> Optional[float]:
+    """`DremioArrowClient.query` with date and datetime columns formatted as strings."""
+    from dremioarrow import DremioArrowClient
+
+    ts_formats = {'pickup_datetime': '%Y-%m-%d %H:%M:%S', 'hire_date': '%Y-%m-%d'}
+    DremioArrowClient(**credentials).query(SQL, ts_col=ts_formats)
+    return None
+
+
+@case('query_ts_col_processes', processes=True)
+def bench_query_ts_col_processes(credentials: Dict[str, str]) -> Optional[float]:
+    """`query_ts_col` with the endpoints read and formatted by the `default_process_pool` workers."""
+    from dremioarrow import DremioArrowClient
+
+    ts_formats = {'pickup_datetime': '%Y-%m-%d %H:%M:%S', 'hire_date': '%Y-%m-%d'}
+    DremioArrowClient(**credentials, process_pool=True).query(SQL, ts_col=ts_formats)
+    return None
+
+
+@case('query_pyarrow_dtypes')
+def bench_query_pyarrow_dtypes(credentials: Dict[str, str]) -> Optional[float]:
+    """`DremioArrowClient.query` into an arrow-backed (`pd.ArrowDtype`) DataFrame."""
+    from dremioarrow import DremioArrowClient
+
+    DremioArrowClient(**credentials).query(SQL, dtype_backend='pyarrow')
+    return None
+
+
+@case('query_categories')
+def bench_query_categories(credentials: Dict[str, str]) -> Optional[float]:
+    """`DremioArrowClient.query` with low-cardinality string columns converted to categoricals."""
+    from dremioarrow import DremioArrowClient
+
+    DremioArrowClient(**credentials).query(SQL, category_threshold=0.1)
+    return None
+
+
+@case('query_self_destruct')
+def bench_query_self_destruct(credentials: Dict[str, str]) -> Optional[float]:
+    """`DremioArrowClient.query` releasing arrow buffers during the pandas conversion."""
+    from dremioarrow import DremioArrowClient
+
+    DremioArrowClient(**credentials).query(SQL, self_destruct=True)
+    return None
+
+
+@case('query_batches', arrow_only=True)
+def bench_query_batches(credentials: Dict[str, str]) -> Optional[float]:
+    """`DremioArrowClient.query_batches` record batch stream, consumed and dropped."""
+    from dremioarrow import DremioArrowClient
+
+    start = time.perf_counter()
+    first_batch = None
+    for _ in DremioArrowClient(**credentials).query_batches(SQL):
+        if first_batch is None:
+            first_batch = time.perf_counter() - start
+    return first_batch
+
+
+def _write_parquet(credentials: Dict[str, str], prefetch: int) -> Optional[float]:
+    import tempfile
+
+    from dremioarrow import DremioArrowClient
+
+    collected = []
+    with tempfile.TemporaryDirectory() as directory:
+        DremioArrowClient(**credentials, stats_hooks=[collected.append]).query_to_parquet(
+            SQL, f'{directory}/result.parquet', compression='zstd', prefetch=prefetch
+        )
+    return collected[0].first_batch_seconds
+
+
+@case('query_to_parquet', arrow_only=True)
+def bench_query_to_parquet(credentials: Dict[str, str]) -> Optional[float]:
+    """`DremioArrowClient.query_to_parquet`, encoding batches while the next ones are prefetched."""
+    from dremioarrow.client import DEFAULT_PREFETCH
+
+    return _write_parquet(credentials, DEFAULT_PREFETCH)
+
+
+@case('query_to_parquet_sync', arrow_only=True)
+def bench_query_to_parquet_sync(credentials: Dict[str, str]) -> Optional[float]:
+    """`DremioArrowClient.query_to_parquet` without read-ahead, receiving and encoding in turn."""
+    return _write_parquet(credentials, 0)
+
+
+def _peak_rss_mb() -> Optional[float]:
+    """Peak resident memory of the current process in MB, None where unsupported (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # linux reports kilobytes, macOS bytes
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def _run_case(name: str, credentials: Dict[str, str]) -> Dict[str, Optional[float]]:
+    """Run one benchmark case, in a fresh worker process."""
+    # import outside of the timed section, interpreter startup cost is not what is measured here
+    import dremioarrow.client  # noqa: F401
+
+    if name not in ARROW_CASES:
+        import dremioarrow.convert  # noqa: F401
+    if name in PROCESS_CASES:
+        from dremioarrow.procpool import default_process_pool
+
+        default_process_pool.start()
+
+    start = time.perf_counter()
+    first_batch = CASES[name](credentials)
+    seconds = time.perf_counter() - start
+    if name in PROCESS_CASES:
+        # the case runs in a worker process itself, which waits for its own children when it exits
+        default_process_pool.close()
+    return {'seconds': seconds, 'ttfb': first_batch, 'peak_rss_mb': _peak_rss_mb()}
+
+
+def run(
+    names: List[str],
+    rows: int,
+    endpoints: int,
+    batch_size: int,
+    latency: float,
+    repeat: int,
+    batch_latency: float = 0.0,
+) -> List[dict]:
+    """Run the benchmark cases against a freshly started stand-in server and collect their best runs."""
+    table = make_table(rows)
+    results = []
+    server = DremioStandInServer(
+        table=table, num_endpoints=endpoints, batch_size=batch_size, latency=latency, batch_latency=batch_latency
+    )
+    with server:
+        for name in names:
+            runs = []
+            for _ in range(repeat):
+                with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+                    runs.append(pool.submit(_run_case, name, server.credentials).result())
+            best = min(runs, key=lambda run_: run_['seconds'])
+            results.append(
+                {
+                    'case': name,
+                    'rows': rows,
+                    'seconds': best['seconds'],
+                    'rows_per_s': rows / best['seconds'],
+                    'mb_per_s': table.nbytes / (1024 * 1024) / best['seconds'],
+                    'ttfb': best['ttfb'],
+                    'peak_rss_mb': max((run_['peak_rss_mb'] or 0 for run_ in runs), default=None) or None,
+                }
+            )
+    return results
+
+
+def time_imports(repeat: int) -> List[dict]:
+    """Time the import statements in fresh interpreters and collect their best runs."""
+    results = []
+    for name, statement in IMPORTS.items():
+        code = f'import time; start = time.perf_counter(); {statement}; print(time.perf_counter() - start)'
+        runs = [float(subprocess.check_output([sys.executable, '-c', code], text=True)) for _ in range(repeat)]
+        results.append({'import': name, 'statement': statement, 'seconds': min(runs)})
+    return results
+
+
+def _format(value: Optional[float], pattern: str) -> str:
+    return '-' if value is None else pattern.format(value)
+
+
+def main(argv: Optional[List[str]] = None):
+    """Benchmarks command line entry point."""
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--cases', nargs='+', choices=sorted(CASES), default=list(CASES), help='cases to run')
+    parser.add_argument('--rows', type=int, default=1_000_000, help='result set rows')
+    parser.add_argument('--endpoints', type=int, default=4, help='endpoints per FlightInfo')
+    parser.add_argument('--batch-size', type=int, default=65_536, help='rows per streamed record batch')
+    parser.add_argument('--latency', type=float, default=0.0, help='injected planning/first-batch latency (s)')
+    parser.add_argument('--batch-latency', type=float, default=0.0, help='injected delay before every batch (s)')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per case, the fastest is reported')
+    parser.add_argument('--no-imports', action='store_true', help='do not time the package imports')
+    parser.add_argument('--json', help='also write the results to this JSON file')
+    args = parser.parse_args(argv)
+
+    results = run(args.cases, args.rows, args.endpoints, args.batch_size, args.latency, args.repeat, args.batch_latency)
+    print(f"{'case':<28}{'seconds':>10}{'rows/s':>14}{'MB/s':>10}{'TTFB (s)':>10}{'peak RSS (MB)':>15}")
+    for result in results:
+        print(
+            f"{result['case']:<28}{result['seconds']:>10.3f}{result['rows_per_s']:>14,.0f}"
+            f"{result['mb_per_s']:>10.1f}{_format(result['ttfb'], '{:.4f}'):>10}"
+            f"{_format(result['peak_rss_mb'], '{:.1f}'):>15}"
+        )
+    imports = [] if args.no_imports else time_imports(args.repeat)
+    if imports:
+        print(f"\n{'import':<20}{'seconds':>10}")
+        for result in imports:
+            print(f"{result['import']:<20}{result['seconds']:>10.3f}")
+    if args.json:
+        with open(args.json, 'w') as sink:
+            json.dump(results + imports, sink, indent=2)
+
+
+if __name__ == '__main__':
+    main()
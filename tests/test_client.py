@@ -1,14 +1,17 @@
 #!/usr/bin/env python
 """Tests for `dremioarrow` package."""
 
+import asyncio
 import os
 from datetime import datetime
 
 import pandas
+import pyarrow
+import pyarrow.parquet
 import pytest
 from pyarrow import flight
 
-from dremioarrow import DremioArrowClient, dremio_query
+from dremioarrow import AsyncDremioArrowClient, DremioArrowClient, ResultCache, SessionPool, dremio_query
 
 
 @pytest.fixture
@@ -272,3 +275,141 @@ def test_datetime_col_conversion(timestamped_data_sql: str, valid_ts_datetime_co
     assert (
         type(datetime.strptime(data[valid_ts_datetime_col].iloc[0], valid_ts_format)) == datetime
     ), "Data conversion back to datetime failed. ts_format varible is likely to be invalid!"
+
+
+def test_query_all_endpoints(flight_credentials: dict, valid_sql: str):
+    """Test every FlightInfo endpoint is read and merged into a single result set."""
+    flight_ = DremioArrowClient(**flight_credentials)
+    flight_.create_flight_client()
+    flight_.authenticate()
+    flight_.retrieve_ticket(valid_sql)
+    table = flight_.read_endpoints(flight_.ticket_info, max_workers=2)
+    assert table.num_rows == 5, f'Data row count not 5 as expected: {table.num_rows}'
+    data = flight_.query(valid_sql, max_workers=2, preserve_order=False)
+    assert data.shape[0] == 5, f'Data row count not 5 as expected: {data.shape[0]}'
+
+
+def test_query_batches(flight_credentials: dict, valid_sql: str):
+    """Test streamed record batches add up to the complete result set."""
+    flight_ = DremioArrowClient(**flight_credentials)
+    batches = list(flight_.query_batches(valid_sql))
+    assert all(type(batch) == pyarrow.RecordBatch for batch in batches), 'Expected pyarrow.RecordBatch chunks'
+    assert sum(batch.num_rows for batch in batches) == 5, 'Streamed row count not 5 as expected'
+    chunks = list(flight_.query_batches(valid_sql, as_pandas=True))
+    assert all(type(chunk) == pandas.DataFrame for chunk in chunks), 'Expected pandas.DataFrame chunks'
+
+
+def test_multiple_ts_col_conversion(
+    timestamped_data_sql: str, valid_ts_datetime_col: str, valid_ts_format: str, valid_date_format: str
+):
+    """A test for converting several date/datetime columns, each with its own format."""
+    flight_ = DremioArrowClient()
+    ts_formats = {valid_ts_datetime_col: valid_ts_format, 'dropoff_datetime': valid_date_format}
+    data = flight_.query(timestamped_data_sql, ts_col=ts_formats)
+    for ts_col, ts_format in ts_formats.items():
+        assert type(data[ts_col].iloc[0]) == str, f"{ts_col} data type conversion to string failed"
+        assert type(datetime.strptime(data[ts_col].iloc[0], ts_format)) == datetime, "Data conversion back failed"
+
+
+def test_shorthand_query_reuses_session(flight_credentials: dict, valid_sql: str):
+    """Test consecutive `dremio_query` calls share one pooled, authenticated session."""
+    pool = SessionPool()
+    with pool.session(**flight_credentials) as flight_:
+        flight_.query(valid_sql)
+    assert len(pool) == 1, 'Authenticated session was not returned to the pool'
+    with pool.session(**flight_credentials) as reused_:
+        assert reused_ is flight_, 'Pooled session was not reused'
+        assert len(pool) == 0, 'Checked out session should not be idle'
+    pool.clear()
+    assert len(pool) == 0, 'Idle sessions were not closed'
+    data = dremio_query(sql=valid_sql, reuse_session=False, **flight_credentials)
+    assert data.shape[0] == 5, f'Data rows count not 5 as expected: {data.shape[0]}'
+
+
+def test_cached_query(flight_credentials: dict, valid_sql: str, tmp_path):
+    """Test repeated SQL is served from the on-disk result cache."""
+    cache = ResultCache(str(tmp_path), ttl=60)
+    flight_ = DremioArrowClient(**flight_credentials, cache=cache)
+    data = flight_.query(valid_sql)
+    assert len(list(tmp_path.glob('*.arrow'))) == 1, 'Query result was not written to the cache'
+    cached = flight_.query(f'  {valid_sql};')
+    assert cached.equals(data), 'Cached result differs from the original result'
+    cache.clear()
+    assert len(list(tmp_path.glob('*.arrow'))) == 0, 'Cache entries were not removed'
+
+
+def test_query_many(flight_credentials: dict, valid_sql: str):
+    """Test a batch of concurrent queries over a single client returns results in order."""
+    flight_ = DremioArrowClient(**flight_credentials)
+    results = flight_.query_many([valid_sql, f'{valid_sql} OFFSET 1', valid_sql], max_workers=3)
+    assert [data.shape[0] for data in results] == [5, 4, 5], 'Concurrent query results are out of order'
+
+
+def test_partitioned_query(flight_credentials: dict, timestamped_data_sql: str):
+    """Test a range-partitioned query returns exactly the rows of the original query."""
+    flight_ = DremioArrowClient(**flight_credentials)
+    data = flight_.query(timestamped_data_sql)
+    partitioned = flight_.query(
+        timestamped_data_sql,
+        partition_column='pickup_datetime',
+        lower_bound=datetime(2013, 1, 1),
+        upper_bound=datetime(2014, 1, 1),
+        num_partitions=4,
+    )
+    assert partitioned.shape == data.shape, f'Partitioned query returned wrong shape: {partitioned.shape}'
+
+
+def test_get_schema(flight_credentials: dict, valid_sql: str):
+    """Test the result schema is retrieved without running the query, and drives explicit dtypes."""
+    flight_ = DremioArrowClient(**flight_credentials)
+    schema = flight_.get_schema(valid_sql)
+    assert type(schema) == pyarrow.Schema, f'Received invalid schema type: {type(schema)}'
+    dtypes = {field.name: 'string' for field in schema if pyarrow.types.is_string(field.type)}
+    data = flight_.query(valid_sql, dtypes=dtypes)
+    assert list(data.columns) == schema.names, 'Schema columns differ from the query result'
+    assert all(str(data[name].dtype) == 'string' for name in dtypes), f'Dtypes not applied: {data.dtypes}'
+
+
+def test_prepared_statement(flight_credentials: dict, valid_sql: str):
+    """Test a parameterized query is prepared once and executed with different parameter values."""
+    flight_ = DremioArrowClient(**flight_credentials)
+    with flight_.prepare(f'SELECT * FROM ({valid_sql}) AS employees WHERE 1 = ?') as statement:
+        assert statement.execute([1]).shape[0] > 0, 'Prepared statement returned no rows'
+        assert statement.execute([0]).shape[0] == 0, 'Prepared statement ignored its parameter'
+        assert statement.preparations == 1, 'Statement was planned more than once'
+
+
+def test_async_query(flight_credentials: dict, valid_sql: str):
+    """Test the asyncio client runs queries and streams batches without blocking the event loop."""
+
+    async def run_queries():
+        async with AsyncDremioArrowClient(max_concurrency=2, **flight_credentials) as flight_:
+            results = await flight_.query_many([valid_sql, valid_sql])
+            rows = 0
+            async for batch in flight_.query_batches(valid_sql):
+                rows += batch.num_rows
+        return results, rows
+
+    results, rows = asyncio.run(run_queries())
+    assert all(data.shape[0] == 5 for data in results), 'Async query row counts not 5 as expected'
+    assert rows == 5, f'Streamed row count not 5 as expected: {rows}'
+
+
+def test_query_to_files(flight_credentials: dict, valid_sql: str, tmp_path):
+    """Test query results stream straight into Parquet and Arrow IPC files."""
+    flight_ = DremioArrowClient(**flight_credentials)
+    rows = flight_.query_to_parquet(valid_sql, str(tmp_path / 'employees.parquet'), compression='zstd')
+    assert rows == 5, f'Written row count not 5 as expected: {rows}'
+    assert pyarrow.parquet.read_table(tmp_path / 'employees.parquet').num_rows == 5, 'Parquet file row count not 5'
+    rows = flight_.query_to_ipc(valid_sql, str(tmp_path / 'employees.arrow'))
+    assert rows == 5, f'Written row count not 5 as expected: {rows}'
+    assert pyarrow.ipc.open_file(tmp_path / 'employees.arrow').read_all().num_rows == 5, 'IPC file row count not 5'
+
+
+def test_lazy_table(flight_credentials: dict, timestamped_data_sql: str):
+    """Test a lazily built query pushes its filter, projection and limit to Dremio."""
+    flight_ = DremioArrowClient(**flight_credentials)
+    trips = flight_.table(['Dremio Sample Data', 'samples.dremio.com', 'NYC-taxi-trips', '1_0_0.parquet'])
+    data = trips.filter('fare_amount > 10').select('pickup_datetime', 'fare_amount').limit(5).collect()
+    assert list(data.columns) == ['pickup_datetime', 'fare_amount'], f'Projection not applied: {data.columns}'
+    assert len(data) == 5 and (data['fare_amount'] > 10).all(), 'Filter or limit not applied'
@@ -0,0 +1,734 @@
+#!/usr/bin/env python
+"""Tests for `dremioarrow` package against the local stand-in flight server.
+
+Unlike `test_client.py`, these tests need no live Dremio server and run anywhere.
+"""
+
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from multiprocessing import get_context
+from typing import List
+
+import pandas
+import pyarrow
+import pyarrow.parquet
+import pytest
+from pyarrow import flight
+
+from dremioarrow import (
+    AsyncDremioArrowClient,
+    DremioArrowClient,
+    EndpointProcessPool,
+    LazyTable,
+    QueryStats,
+    ResultCache,
+    RpcTimingMiddlewareFactory,
+    SessionPool,
+    SharedResult,
+    cli,
+    dremio_query,
+)
+from dremioarrow._prefetch import read_ahead
+from dremioarrow.client import DremioClientAuthMiddlewareFactory, format_ts_columns
+from dremioarrow.flightsql import parameter_table
+from dremioarrow.sync import WATERMARK_FILE, read_watermark
+from dremioarrow.testing import DremioStandInServer, make_table
+from dremioarrow.writers import write_parquet
+
+
+@pytest.fixture
+def standin():
+    """Serve a small synthetic result set split across three endpoints."""
+    with DremioStandInServer(num_rows=1_000, num_endpoints=3, batch_size=100) as server:
+        yield server
+
+
+@pytest.fixture
+def standin_client(standin: DremioStandInServer):
+    """A client connected to the stand-in server."""
+    return DremioArrowClient(**standin.credentials)
+
+
+def test_standin_handshake(standin: DremioStandInServer, standin_client: DremioArrowClient):
+    """Test the basic-auth handshake yields a bearer token the client middleware picks up."""
+    standin_client.create_flight_client()
+    standin_client.authenticate(routing_tag='etl', routing_queue='High Cost User Queries')
+    assert standin.handshakes == 1, f'Expected a single handshake: {standin.handshakes}'
+    assert standin.routings == [('etl', 'High Cost User Queries')], 'Routing headers were not sent'
+
+
+def test_standin_invalid_account(standin: DremioStandInServer):
+    """Test invalid credentials are rejected by the handshake."""
+    flight_ = DremioArrowClient(**{**standin.credentials, 'password': 'invalid_password'})
+    flight_.create_flight_client()
+    with pytest.raises(ConnectionError, match=r'.*Failed to authenticate.*'):
+        flight_.authenticate()
+
+
+def test_query_reads_all_endpoints(standin: DremioStandInServer, standin_client: DremioArrowClient):
+    """Test every endpoint is read and merged in the server's endpoint order."""
+    data = standin_client.query('SELECT * FROM trips')
+    assert type(data) == pandas.DataFrame, f'Received invalid data type: {type(data)}'
+    assert data['id'].tolist() == list(range(1_000)), 'Endpoint results missing or out of order'
+    unordered = standin_client.query('SELECT * FROM trips', max_workers=2, preserve_order=False)
+    assert sorted(unordered['id']) == list(range(1_000)), 'Endpoint results missing'
+
+
+def test_query_batches(standin: DremioStandInServer, standin_client: DremioArrowClient):
+    """Test streamed batches respect the server batch size and cover the full result set."""
+    batches = list(standin_client.query_batches('SELECT * FROM trips'))
+    assert all(batch.num_rows <= 100 for batch in batches), 'Batches exceed the server batch size'
+    assert sum(batch.num_rows for batch in batches) == 1_000, 'Streamed row count not 1000 as expected'
+    chunk = next(standin_client.query_batches('SELECT * FROM trips', as_pandas=True))
+    assert type(chunk) == pandas.DataFrame, f'Received invalid chunk type: {type(chunk)}'
+
+
+def test_ts_col_conversion(standin_client: DremioArrowClient):
+    """Test several date/datetime columns convert to strings with their own formats."""
+    ts_formats = {'pickup_datetime': '%Y-%m-%d %H:%M:%S', 'hire_date': '%d/%m/%Y'}
+    data = standin_client.query('SELECT * FROM trips', ts_col=ts_formats)
+    assert data['pickup_datetime'].iloc[1] == '2020-01-01 00:00:01', 'Datetime formatting failed'
+    assert data['hire_date'].iloc[0] == '01/01/2020', 'Date formatting failed'
+    for ts_col, ts_format in ts_formats.items():
+        assert type(datetime.strptime(data[ts_col].iloc[-1], ts_format)) == datetime, 'Conversion back failed'
+
+
+def test_ts_col_microseconds():
+    """Test `%f` renders the sub-second part of timestamps, like `datetime.strftime`."""
+    values = [datetime(2020, 1, 2, 3, 4, 5, 678901), datetime(1969, 12, 31, 23, 59, 59, 500000), None]
+    for unit in ('s', 'ms', 'us', 'ns'):
+        column = pyarrow.array(values, pyarrow.timestamp('us')).cast(pyarrow.timestamp(unit), safe=False)
+        table = format_ts_columns(pyarrow.table({'ts': column}), {'ts': '%Y-%m-%d %H:%M:%S.%f'})
+        expected = [None if value is None else value.strftime('%Y-%m-%d %H:%M:%S.%f') for value in column.to_pylist()]
+        assert table.column('ts').to_pylist() == expected, f'Sub-second formatting failed for {unit} timestamps'
+    assert format_ts_columns(pyarrow.table({'ts': column}), {'ts': '%%f %f'}).column('ts')[0].as_py() == '%f 678901'
+
+
+def test_iso_ts_formats():
+    """Test the ISO date/datetime fast paths render the same strings as datetime.strftime."""
+    values = [datetime(2020, 1, 2, 3, 4, 5, 678901), datetime(1969, 12, 31, 23, 59, 59, 500000), None]
+    timestamps = pyarrow.array(values, pyarrow.timestamp('us'))
+    columns = {'ts': timestamps, 'date': timestamps.cast(pyarrow.date32())}
+    for ts_format in ('%Y-%m-%d', '%Y-%m-%d %H:%M:%S'):
+        for name, column in columns.items():
+            if name == 'date' and '%H' in ts_format:
+                continue
+            table = format_ts_columns(pyarrow.table({name: column}), {name: ts_format})
+            expected = [None if value is None else value.strftime(ts_format) for value in column.to_pylist()]
+            assert table.column(name).to_pylist() == expected, f'{ts_format} fast path differs for {name}'
+
+
+def test_auth_middleware_trailers():
+    """Test the auth middleware keeps the bearer token when call trailers carry no authorization header."""
+    factory = DremioClientAuthMiddlewareFactory()
+    middleware = factory.start_call(None)
+    middleware.received_headers({'authorization': ['Bearer token']})
+    middleware.received_headers({'grpc-status': ['0']})
+    assert factory.call_credential == [b'authorization', b'Bearer token'], 'Trailers reset the bearer token'
+
+
+def test_ts_col_conversion_empty_result():
+    """Test date/datetime column types come from the schema, so empty results still convert."""
+    with DremioStandInServer(num_rows=0) as server:
+        data = DremioArrowClient(**server.credentials).query('SELECT 1', ts_col='hire_date', ts_format='%Y')
+    assert data.shape[0] == 0, 'Expected an empty result set'
+    assert data['hire_date'].dtype == object, 'Empty date column was not converted to strings'
+
+
+def test_ts_col_errors(standin_client: DremioArrowClient):
+    """Test invalid ts_col and ts_format arguments."""
+    with pytest.raises(ValueError, match=".*is not a valid.*"):
+        standin_client.query('SELECT * FROM trips', ts_col='NOT_TIMESTAMP')
+    with pytest.raises(TypeError, match=".*column is of invalid type.*"):
+        standin_client.query('SELECT * FROM trips', ts_col='vendor', ts_format='%Y')
+    with pytest.raises(ValueError, match=".*ts_format parameter is required.*"):
+        standin_client.query('SELECT * FROM trips', ts_col='hire_date')
+
+
+def test_session_pool_reuse_and_renewal(standin: DremioStandInServer):
+    """Test pooled sessions are reused across calls and expired tokens renewed transparently."""
+    pool = SessionPool()
+    for _ in range(3):
+        with pool.session(**standin.credentials) as flight_:
+            assert flight_.query('SELECT 1').shape[0] == 1_000, 'Pooled query returned wrong row count'
+    assert standin.handshakes == 1, f'Pooled sessions should share one handshake: {standin.handshakes}'
+    standin.expire_tokens()
+    with pool.session(**standin.credentials) as flight_:
+        flight_.query('SELECT 1')
+    assert standin.handshakes == 2, 'Expired session token was not renewed'
+    pool.clear()
+    data = dremio_query('SELECT 1', **standin.credentials)
+    assert data.shape[0] == 1_000, 'dremio_query returned wrong row count'
+
+
+def test_result_cache(standin: DremioStandInServer, tmp_path):
+    """Test repeated SQL is served from the cache without contacting the server."""
+    flight_ = DremioArrowClient(**standin.credentials, cache=ResultCache(str(tmp_path)))
+    data = flight_.query('SELECT *\n  FROM trips')
+    cached = flight_.query('SELECT * FROM trips;')
+    assert len(standin.queries) == 1, f'Cached query reached the server: {standin.queries}'
+    assert cached.equals(data), 'Cached result differs from the original result'
+
+
+def test_concurrent_queries(standin: DremioStandInServer, standin_client: DremioArrowClient):
+    """Test a single client serves concurrent queries over one session."""
+    results = standin_client.query_many([f'SELECT {index}' for index in range(8)], max_workers=4)
+    assert [data.shape[0] for data in results] == [1_000] * 8, 'Concurrent query returned wrong row count'
+    standin.expire_tokens()
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        shapes = set(pool.map(lambda _: standin_client.query('SELECT 1').shape, range(8)))
+    assert shapes == {(1_000, 5)}, f'Concurrent query returned wrong shapes: {shapes}'
+    assert standin.handshakes == 2, f'Concurrent token renewal should happen once: {standin.handshakes}'
+
+
+def test_async_query(standin: DremioStandInServer):
+    """Test the asyncio client runs queries and streams batches."""
+
+    async def run_queries():
+        async with AsyncDremioArrowClient(max_concurrency=2, **standin.credentials) as flight_:
+            results = await flight_.query_many(['SELECT 1', 'SELECT 2', 'SELECT 3'])
+            rows = 0
+            async for batch in flight_.query_batches('SELECT 4'):
+                rows += batch.num_rows
+        return results, rows
+
+    results, rows = asyncio.run(run_queries())
+    assert [data.shape[0] for data in results] == [1_000] * 3, 'Async query returned wrong row count'
+    assert rows == 1_000, f'Streamed row count not 1000 as expected: {rows}'
+
+    # created outside of any event loop, and used from two loops in turn
+    flight_ = AsyncDremioArrowClient(max_concurrency=2, **standin.credentials)
+    try:
+        for _ in range(2):
+            results = asyncio.run(flight_.query_many(['SELECT 1', 'SELECT 2', 'SELECT 3']))
+            assert [data.shape[0] for data in results] == [1_000] * 3, 'Async query failed on a new event loop'
+    finally:
+        flight_.close()
+
+
+def test_query_to_files(standin_client: DremioArrowClient, tmp_path):
+    """Test results stream into Parquet files, datasets and Arrow IPC files."""
+    path = str(tmp_path / 'trips.parquet')
+    assert standin_client.query_to_parquet('SELECT 1', path, row_group_size=400) == 1_000, 'Wrong row count'
+    metadata = pyarrow.parquet.ParquetFile(path).metadata
+    row_groups = [metadata.row_group(index).num_rows for index in range(metadata.num_row_groups)]
+    assert row_groups == [400, 400, 200], f'Unexpected row groups: {row_groups}'
+    for invalid in (0, -1):
+        with pytest.raises(ValueError, match=r'.*row_group_size.*'):
+            write_parquet([], str(tmp_path / 'invalid.parquet'), make_table(1).schema, row_group_size=invalid)
+    dataset = str(tmp_path / 'trips')
+    standin_client.query_to_parquet('SELECT 1', dataset, partition_cols=['vendor'], compression='zstd')
+    assert len(list((tmp_path / 'trips').iterdir())) == 50, 'Expected one partition directory per vendor'
+    assert pyarrow.parquet.read_table(dataset).num_rows == 1_000, 'Partitioned dataset row count not 1000'
+    path = str(tmp_path / 'trips.arrow')
+    assert standin_client.query_to_ipc('SELECT 1', path) == 1_000, 'Wrong row count'
+    assert pyarrow.ipc.open_file(path).read_all().num_rows == 1_000, 'IPC file row count not 1000'
+
+
+def test_query_stats(standin: DremioStandInServer):
+    """Test every query reports per-phase stats to the hooks, and RPCs to the timing middleware."""
+    collected: List[QueryStats] = []
+    rpcs: List[pyarrow.flight.FlightMethod] = []
+    flight_ = DremioArrowClient(
+        **standin.credentials,
+        stats_hooks=[collected.append],
+        middleware=[RpcTimingMiddlewareFactory(lambda method, seconds, error: rpcs.append(method))],
+    )
+    flight_.query('SELECT 1')
+    list(flight_.query_batches('SELECT 2'))
+    first, second = collected
+    assert type(first) == QueryStats, f'Received invalid stats type: {type(first)}'
+    assert (first.rows, first.batches, first.endpoints) == (1_000, 12, 3), f'Wrong counters: {first}'
+    assert first.connect_seconds > 0 and second.connect_seconds == 0, 'Connect phase timed on a reused session'
+    assert first.first_batch_seconds is not None and first.total_seconds >= first.transfer_seconds, 'Bad timings'
+    assert second.rows == 1_000 and second.error is None, f'Wrong streamed stats: {second}'
+    assert rpcs.count(pyarrow.flight.FlightMethod.DO_GET) == 6, f'DoGet calls not timed: {rpcs}'
+    with pytest.raises(ValueError):
+        flight_.query('SELECT 3', ts_col='NOT_TIMESTAMP')
+    assert 'ValueError' in (collected[-1].error or ''), f'Query error not recorded: {collected[-1]}'
+
+    def broken_hook(stats: QueryStats):
+        raise ZeroDivisionError('division by zero')
+
+    flight_.add_stats_hook(broken_hook)
+    with pytest.warns(RuntimeWarning, match='.*stats hook.*'):
+        flight_.query('SELECT 4')
+
+
+def test_partitioned_query(standin: DremioStandInServer, standin_client: DremioArrowClient):
+    """Test a range-partitioned query runs one range-filtered job per partition and concatenates them in order."""
+    data = standin_client.query(
+        'SELECT * FROM trips;', partition_column='id', lower_bound=0, upper_bound=1_000, num_partitions=4
+    )
+    assert len(standin.queries) == 4, f'Expected one job per partition: {standin.queries}'
+    # partitions are planned concurrently, so they reach the server in any order
+    predicates = {sql.partition(' WHERE ')[2] for sql in standin.queries}
+    assert predicates == {
+        '"id" < 250 OR "id" IS NULL',
+        '"id" >= 250 AND "id" < 500',
+        '"id" >= 500 AND "id" < 750',
+        '"id" >= 750',
+    }, f'Bad partition predicates: {standin.queries}'
+    # the stand-in ignores the range filters, every partition returns the full result set
+    assert data['id'].tolist() == list(range(1_000)) * 4, 'Partition results missing or out of order'
+    with pytest.raises(ValueError, match=".*required together.*"):
+        standin_client.query('SELECT * FROM trips', partition_column='id', num_partitions=4)
+    with pytest.raises(ValueError, match=".*lower_bound must be smaller.*"):
+        standin_client.query('SELECT 1', partition_column='id', lower_bound=5, upper_bound=5, num_partitions=4)
+    with pytest.raises(TypeError, match=".*both be numbers.*"):
+        standin_client.query(
+            'SELECT 1', partition_column='id', lower_bound=0, upper_bound=date(2020, 1, 1), num_partitions=2
+        )
+    paris = timezone(timedelta(hours=1))
+    standin_client.query(
+        'SELECT 1',
+        partition_column='ts',
+        lower_bound=datetime(2024, 1, 1, 1, tzinfo=paris),
+        upper_bound=datetime(2024, 1, 1, 3, tzinfo=paris),
+        num_partitions=2,
+    )
+    assert {sql.partition(' WHERE ')[2] for sql in standin.queries[-2:]} == {
+        '"ts" < TIMESTAMP \'2024-01-01 01:00:00.000\' OR "ts" IS NULL',
+        '"ts" >= TIMESTAMP \'2024-01-01 01:00:00.000\'',
+    }, f'Timezone-aware bounds not rendered as UTC: {standin.queries[-2:]}'
+
+
+def test_sync_table(standin: DremioStandInServer, standin_client: DremioArrowClient, tmp_path):
+    """Test incremental syncs append only the rows past the stored watermark."""
+    directory = str(tmp_path / 'trips')
+    assert standin_client.sync_table(['samples', 'trips'], 'id', directory) == 1_000, 'Initial sync row count'
+    assert standin.queries[-1] == 'SELECT * FROM "samples"."trips"', f'Bad initial query: {standin.queries[-1]}'
+    # the stand-in ignores the watermark filter, serve only the new rows
+    standin.table = make_table(1_500).slice(1_000)
+    assert standin_client.sync_table(['samples', 'trips'], 'id', directory) == 500, 'Delta sync row count'
+    assert standin.queries[-1].endswith('WHERE "id" > 999'), f'Bad delta query: {standin.queries[-1]}'
+    standin.table = standin.table.slice(0, 0)
+    assert standin_client.sync_table(['samples', 'trips'], 'id', directory) == 0, 'Expected an up to date sync'
+    assert len(list((tmp_path / 'trips').glob('*.parquet'))) == 2, 'Expected one data file per non-empty sync'
+    data = pyarrow.parquet.read_table(directory)
+    assert sorted(data['id'].to_pylist()) == list(range(1_500)), 'Synced dataset rows missing or duplicated'
+    assert read_watermark(directory) == 1_499, 'Watermark not advanced'
+    with pytest.raises(ValueError, match=".*is synced on column id.*"):
+        standin_client.sync_table(['samples', 'trips'], 'pickup_datetime', directory)
+    standin.table = make_table(10)
+    directory = str(tmp_path / 'arrow')
+    standin_client.sync_table('trips', 'pickup_datetime', directory, format='arrow')
+    assert read_watermark(directory) == datetime(2020, 1, 1, 0, 0, 9), 'Datetime watermark did not round-trip'
+
+
+def test_sync_table_failures(tmp_path, monkeypatch):
+    """Test decimal watermarks, and syncs failing part way leave neither rows nor temporary files behind."""
+    table = make_table(1_000)
+    table = table.set_column(0, 'id', table.column('id').cast(pyarrow.decimal128(21, 2)))
+    with DremioStandInServer(table=table.slice(0, 500), batch_size=100) as server:
+        flight_ = DremioArrowClient(**server.credentials, retries=0)
+        directory = tmp_path / 'trips'
+        assert flight_.sync_table('trips', 'id', str(directory)) == 500
+        assert read_watermark(str(directory)) == Decimal('499.00'), 'Decimal watermark did not round-trip'
+        synced = sorted(path.name for path in directory.iterdir())
+
+        # the stand-in ignores the watermark filter, serve only the new rows
+        server.table = table.slice(500)
+        server.inject_faults('do_get', error=flight.FlightInternalError, after_batches=3)
+        with pytest.raises(flight.FlightInternalError):
+            flight_.sync_table('trips', 'id', str(directory))
+        assert server.queries[-1].endswith('WHERE "id" > 499.00'), f'Bad delta query: {server.queries[-1]}'
+        assert sorted(path.name for path in directory.iterdir()) == synced, 'Failed stream left files behind'
+
+        replace = os.replace
+
+        def failing_replace(source, target):
+            if target.endswith(WATERMARK_FILE):
+                raise OSError('No space left on device')
+            replace(source, target)
+
+        with monkeypatch.context() as patch:
+            patch.setattr(os, 'replace', failing_replace)
+            with pytest.raises(OSError):
+                flight_.sync_table('trips', 'id', str(directory))
+        assert sorted(path.name for path in directory.iterdir()) == synced, 'Failed watermark left files behind'
+        assert read_watermark(str(directory)) == Decimal('499.00'), 'Watermark moved without its rows'
+
+        assert flight_.sync_table('trips', 'id', str(directory)) == 500
+        ids = pyarrow.parquet.read_table(str(directory)).column('id').to_pylist()
+        assert sorted(ids) == [Decimal(i).quantize(Decimal('0.01')) for i in range(1_000)], 'Rows missing or duplicated'
+
+        partitioned = tmp_path / 'partitioned'
+        server.inject_faults('do_get', error=flight.FlightInternalError, after_batches=3)
+        with pytest.raises(flight.FlightInternalError):
+            flight_.sync_table('trips', 'id', str(partitioned), partition_cols=['vendor'])
+        assert not os.listdir(partitioned), 'Failed partitioned sync left files behind'
+
+
+def test_get_schema(standin: DremioStandInServer, standin_client: DremioArrowClient):
+    """Test schemas come from GetSchema without any DoGet, and are cached per client."""
+    schema = standin_client.get_schema('SELECT * FROM trips')
+    assert schema == standin.table.schema, f'Received invalid schema: {schema}'
+    assert standin_client.get_schema('SELECT *  FROM trips;') is schema, 'Schema was not served from the cache'
+    standin_client.get_schema('SELECT * FROM trips', refresh=True)
+    assert len(standin.queries) == 2, f'Expected one GetSchema call per refresh: {standin.queries}'
+    standin_client.query('SELECT 1')
+    assert standin_client.get_schema('SELECT 1') == schema and len(standin.queries) == 3, 'Query schema not cached'
+
+
+def test_query_dtypes(standin_client: DremioArrowClient):
+    """Test explicit pandas dtypes are applied during the conversion."""
+    dtypes = {'id': 'Int64', 'vendor': 'category', 'fare_amount': 'float32', 'hire_date': 'datetime64[ms]'}
+    data = standin_client.query('SELECT * FROM trips', dtypes=dtypes)
+    assert {name: str(data[name].dtype) for name in dtypes} == dtypes, f'Dtypes not applied: {data.dtypes}'
+    assert data['id'].tolist() == list(range(1_000)), 'Values changed by the dtype conversion'
+    data = standin_client.query('SELECT 1', dtypes={'vendor': pandas.StringDtype(), 'fare_amount': 'Float64'})
+    assert str(data['vendor'].dtype) == 'string' and str(data['id'].dtype) == 'int64', f'Bad dtypes: {data.dtypes}'
+    chunk = next(standin_client.query_batches('SELECT 1', as_pandas=True, dtypes={'id': 'int32'}))
+    assert str(chunk['id'].dtype) == 'int32', f'Chunk dtypes not applied: {chunk.dtypes}'
+    with pytest.raises(ValueError, match=".*is not a valid column name.*"):
+        standin_client.query('SELECT 1', dtypes={'NOT_A_COLUMN': 'int64'})
+    with pytest.raises(TypeError, match=".*cannot hold.*"):
+        standin_client.query('SELECT 1', dtypes={'vendor': 'int64'})
+
+
+def test_query_conversion_modes(standin_client: DremioArrowClient):
+    """Test arrow-backed, nullable, categorical and self-destructing conversions."""
+    expected = standin_client.query('SELECT * FROM trips')
+    data = standin_client.query('SELECT 1', dtype_backend='pyarrow')
+    assert all(isinstance(dtype, pandas.ArrowDtype) for dtype in data.dtypes), f'Not arrow-backed: {data.dtypes}'
+    assert data['vendor'].tolist() == expected['vendor'].tolist(), 'Arrow-backed values differ'
+    data = standin_client.query('SELECT 1', dtype_backend='numpy_nullable', dtypes={'id': 'int32'})
+    assert str(data['vendor'].dtype) == 'string' and data['vendor'].dtype.storage == 'pyarrow', 'Not string[pyarrow]'
+    assert str(data['fare_amount'].dtype) == 'Float64' and str(data['id'].dtype) == 'int32', f'Bad: {data.dtypes}'
+    data = standin_client.query('SELECT 1', category_threshold=0.1, dtype_backend='pyarrow')
+    assert str(data['vendor'].dtype) == 'category', f'Low-cardinality strings not categorical: {data.dtypes}'
+    assert data['vendor'].astype(str).tolist() == expected['vendor'].tolist(), 'Categorical values differ'
+    data = standin_client.query('SELECT 1', self_destruct=True)
+    assert data.equals(expected), 'Self-destructing conversion changed the result'
+    with pytest.raises(ValueError, match=".*dtype_backend must be one of.*"):
+        standin_client.query('SELECT 1', dtype_backend='polars')
+
+
+def test_cli(standin: DremioStandInServer, tmp_path, monkeypatch, capsysbinary):
+    """Test the console script streams results to stdout and files in every output format."""
+    monkeypatch.setenv('DREMIO_FLIGHT_SERVER_PASSWORD', standin.password)
+    connection = ['--host', standin.host, '--port', str(standin.port), '--username', standin.username]
+    assert cli.main([*connection, 'SELECT * FROM trips']) == 0, 'CSV export to stdout failed'
+    captured = capsysbinary.readouterr()
+    lines = captured.out.decode('utf-8').splitlines()
+    assert lines[0] == '"id","vendor","pickup_datetime","hire_date","fare_amount"', f'Bad CSV header: {lines[0]}'
+    assert len(lines) == 1_001 and b'1,000 rows' in captured.err, 'CSV rows or progress line missing'
+    for extension, read in [
+        ('arrow', lambda path: pyarrow.ipc.open_file(path).read_all()),
+        ('parquet', pyarrow.parquet.read_table),
+        ('jsonl', lambda path: pandas.read_json(path, lines=True)),
+    ]:
+        path = str(tmp_path / f'trips.{extension}')
+        sql = tmp_path / 'query.sql'
+        sql.write_text('SELECT * FROM trips')
+        assert cli.main([*connection, '-q', '-f', str(sql), '-o', path]) == 0, f'{extension} export failed'
+        assert len(read(path)) == 1_000, f'{extension} export row count not 1000'
+    assert cli.main([*connection, '--format', 'arrow', '--ts-col', 'hire_date', '--ts-format', '%Y', 'SELECT 1']) == 0
+    table = pyarrow.ipc.open_stream(capsysbinary.readouterr().out).read_all()
+    assert table['hire_date'][0].as_py() == '2020', 'ts_col conversion not applied to the stream'
+    arguments = ['--ts-col', 'hire_date,pickup_datetime', '--ts-col', 'hire_date', '--ts-format', '%Y']
+    assert cli.main([*connection, '--format', 'arrow', *arguments, 'SELECT 1']) == 0, 'SQL swallowed by --ts-col'
+    table = pyarrow.ipc.open_stream(capsysbinary.readouterr().out).read_all()
+    assert table['pickup_datetime'].type == pyarrow.string(), 'Comma separated ts_col names not converted'
+    monkeypatch.setenv('DREMIO_FLIGHT_SERVER_PASSWORD', 'invalid_password')
+    assert cli.main([*connection, '-o', str(tmp_path / 'failed.csv'), 'SELECT 1']) == 1, 'Expected a failure'
+    assert b'Failed to authenticate' in capsysbinary.readouterr().err, 'Error not reported on stderr'
+    assert not (tmp_path / 'failed.csv').exists(), 'Partial output file left behind'
+
+
+def _shared_rows(handle: SharedResult) -> int:
+    """Open a shared result in a worker process."""
+    with handle:
+        return handle.to_pandas().shape[0]
+
+
+def test_query_shared(standin: DremioStandInServer, standin_client: DremioArrowClient, tmp_path):
+    """Test a result shared with worker processes is read zero-copy and removed by the last release."""
+    with standin_client.query_shared('SELECT * FROM trips', directory=str(tmp_path)) as handle:
+        with ProcessPoolExecutor(max_workers=2, mp_context=get_context('spawn')) as pool:
+            rows = list(pool.map(_shared_rows, [handle] * 4))
+        table = handle.table()
+        other = SharedResult(handle.path).attach()
+    assert rows == [1_000] * 4, f'Workers read wrong row counts: {rows}'
+    assert len(standin.queries) == 1, f'The query ran more than once: {standin.queries}'
+    assert os.path.exists(handle.path), 'Segment removed while still referenced'
+    other.release()
+    assert list(tmp_path.iterdir()) == [], 'Segment not removed by the last release'
+    assert table['id'].to_pylist() == list(range(1_000)), 'Opened table unreadable after removal'
+    with pytest.raises(FileNotFoundError, match='.*already released.*'):
+        handle.attach()
+
+
+def test_coalesced_queries():
+    """Test identical concurrent queries share one Flight fetch, each caller getting its own DataFrame."""
+    with DremioStandInServer(num_rows=1_000, num_endpoints=2, latency=0.2) as server:
+        collected = []
+        flight_ = DremioArrowClient(**server.credentials, coalesce=True, stats_hooks=[collected.append])
+        flight_.query('SELECT 0')
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: flight_.query('SELECT *\n FROM trips', self_destruct=True), range(8)))
+        assert len(server.queries) == 2, f'Identical queries were not coalesced: {server.queries}'
+        assert all(data.equals(results[0]) for data in results), 'Coalesced callers received different results'
+        assert len({id(data) for data in results}) == 8, 'Coalesced callers must not share a DataFrame'
+        assert sum(stats.coalesced for stats in collected) == 7, 'Expected one leader and seven followers'
+        results = dremio_query('SELECT 1', **server.credentials, coalesce=True)
+        assert results.shape[0] == 1_000, 'Coalesced dremio_query returned wrong row count'
+
+
+def test_query_arrow_output(standin_client: DremioArrowClient):
+    """Test query results can be returned as arrow tables, skipping the pandas conversion."""
+    table = standin_client.query('SELECT * FROM trips', output='arrow', ts_col='hire_date', ts_format='%Y')
+    assert isinstance(table, pyarrow.Table), 'Expected an arrow table'
+    assert table.num_rows == 1_000, 'Arrow output returned wrong row count'
+    assert table.schema.field('hire_date').type == pyarrow.string(), 'ts_col was not converted to strings'
+    with pytest.raises(ValueError, match=r'.*output must be one of.*'):
+        standin_client.query('SELECT * FROM trips', output='polars')
+
+
+def test_lightweight_import(standin: DremioStandInServer):
+    """Test importing the package loads neither pyarrow nor pandas, and arrow queries never load pandas."""
+    code = f"""
+import sys
+import dremioarrow
+assert 'pyarrow' not in sys.modules and 'pandas' not in sys.modules, 'import dremioarrow loaded pyarrow or pandas'
+from dremioarrow import DremioArrowClient
+flight_ = DremioArrowClient(**{standin.credentials!r})
+table = flight_.query('SELECT 1', output='arrow', ts_col='hire_date', ts_format='%Y')
+assert table.num_rows == 1_000, 'Arrow output returned wrong row count'
+assert 'pandas' not in sys.modules, 'An arrow query loaded pandas'
+"""
+    # a fresh interpreter, the stand-in server lives in this one and already loaded pandas
+    result = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+
+
+def test_prepared_statements(standin: DremioStandInServer, standin_client: DremioArrowClient):
+    """Test a prepared statement is planned once and executed with bound parameters, across session renewals."""
+    statement = standin_client.prepare('SELECT * FROM trips WHERE vendor = ? AND fare_amount > ?')
+    assert statement.dataset_schema == standin.table.schema, 'Prepared statement returned wrong result schema'
+    for fare in (5, 10.5, 20):
+        data = statement.execute(['vendor-1', fare])
+        assert data.shape[0] == 1_000, 'Prepared statement returned wrong row count'
+    assert standin_client.prepare('SELECT * FROM trips  WHERE vendor = ? AND fare_amount > ?;') is statement
+    assert len(standin.prepared) == 1 and len(standin.executions) == 3, 'Statement was planned more than once'
+    assert standin.queries == [], 'Prepared statements must not send SQL text on execution'
+    assert [binding.column(1).to_pylist() for binding in standin.bindings] == [[5], [10.5], [20]]
+    table = statement.execute({'parameter_1': 'vendor-2', 'parameter_2': 1}, output='arrow')
+    assert isinstance(table, pyarrow.Table), 'Expected an arrow table'
+    with pytest.raises(ValueError, match=r'.*Expected 2 statement parameters.*'):
+        statement.execute(['vendor-1'])
+    with pytest.raises(ValueError, match=r'.*Statement parameters must be.*'):
+        statement.execute({'vendor': 'vendor-1'})
+    standin.expire_tokens()
+    assert statement.execute(('vendor-3', 1), output='arrow').num_rows == 1_000, 'Renewed session query failed'
+    assert statement.preparations == 2, 'Statement was not prepared again after the session renewal'
+    standin_client.close_statements()
+    assert standin.open_statements == 0 and statement.closed, 'Statement handles were not released'
+    with pytest.raises(ValueError, match=r'.*statement is closed.*'):
+        statement._run(['vendor-1', 1])
+    typed = parameter_table([1, '2'], pyarrow.schema([('a', pyarrow.string()), ('b', pyarrow.int32())]))
+    assert typed.schema.types == [pyarrow.string(), pyarrow.int32()], 'Parameters were not cast to the schema types'
+    with pytest.raises(TypeError, match=r'.*cannot hold.*'):
+        parameter_table(['x'], pyarrow.schema([('a', pyarrow.int64())]))
+
+
+def test_prefetched_batches():
+    """Test batches are read ahead on a bounded queue, and an abandoned stream is cancelled and cleaned up."""
+    assert list(read_ahead(iter(range(100)), 3)) == list(range(100)), 'Read-ahead changed the item order'
+
+    def failing():
+        yield 1
+        raise KeyError('boom')
+
+    with pytest.raises(KeyError, match=r'.*boom.*'):
+        list(read_ahead(failing(), 2))
+    with pytest.raises(ValueError):
+        next(read_ahead(iter([]), 0))
+    with DremioStandInServer(num_rows=1_000, batch_size=10, batch_latency=0.01) as server:
+        collected = []
+        flight_ = DremioArrowClient(**server.credentials, stats_hooks=[collected.append])
+        batches = flight_.query_batches('SELECT 1', prefetch=2)
+        assert next(batches).num_rows == 10, 'Prefetched stream returned a wrong first batch'
+        batches.close()
+        assert not [thread for thread in threading.enumerate() if thread.name == 'dremioarrow-prefetch']
+        assert collected[0].batches <= 4 and collected[0].error is None, f'Read past the queue bound: {collected}'
+        synchronous = flight_.query_batches('SELECT 2', prefetch=0)
+        prefetched = flight_.query_batches('SELECT 2', prefetch=8)
+        assert pyarrow.Table.from_batches(synchronous).equals(pyarrow.Table.from_batches(prefetched))
+
+
+def test_result_budget(tmp_path):
+    """Test results past max_result_bytes fail with a MemoryError, or spill to memory-mapped files."""
+    with DremioStandInServer(num_rows=10_000, num_endpoints=3, batch_size=100) as server:
+        collected = []
+        flight_ = DremioArrowClient(**server.credentials, stats_hooks=[collected.append])
+        expected = flight_.query('SELECT 1', output='arrow')
+        with pytest.raises(MemoryError, match=r'.*max_result_bytes.*'):
+            flight_.query('SELECT 1', max_result_bytes=expected.nbytes // 10)
+        assert collected[-1].bytes < expected.nbytes, 'Streams were not cancelled past the budget'
+
+        spilled = flight_.query('SELECT 1', max_result_bytes=expected.nbytes // 10, spill=str(tmp_path), output='arrow')
+        assert spilled.equals(expected), 'Spilled result differs from the in-memory result'
+        assert collected[-1].spilled_bytes > 0, 'Result over the budget was not spilled'
+        assert not os.listdir(tmp_path), 'Spill files were left behind'
+
+        spilling = DremioArrowClient(**server.credentials, max_result_bytes=0, spill=True)
+        assert len(spilling.query('SELECT 1')) == expected.num_rows
+        under = flight_.query('SELECT 1', max_result_bytes=expected.nbytes, output='arrow')
+        assert under.equals(expected) and collected[-1].spilled_bytes == 0
+
+
+def test_head_and_timeouts():
+    """Test head stops reading after n rows, and queries past their timeout are cancelled with a TimeoutError."""
+    # 1,000 batches over 2 endpoints, about 5 seconds to read in full
+    with DremioStandInServer(num_rows=100_000, num_endpoints=2, batch_size=100, batch_latency=0.005) as server:
+        collected = []
+        flight_ = DremioArrowClient(**server.credentials, stats_hooks=[collected.append])
+        preview = flight_.head('SELECT 1', 250)
+        assert preview.shape == (250, 5) and collected[-1].batches == 3, f'Read past the preview: {collected[-1]}'
+        assert collected[-1].total_seconds < 2 and collected[-1].error is None
+        assert flight_.head('SELECT 1', 0, output='arrow').num_rows == 0
+        with pytest.raises(ValueError):
+            flight_.head('SELECT 1', -1)
+
+        with pytest.raises(TimeoutError):
+            flight_.query('SELECT 1', timeout=0.2)
+        assert 'TimeoutError' in collected[-1].error and collected[-1].total_seconds < 2
+        with pytest.raises(TimeoutError):
+            list(flight_.query_batches('SELECT 1', timeout=0.2))
+        with pytest.raises(TimeoutError):
+            DremioArrowClient(**server.credentials, timeout=0.2).query('SELECT 1', output='arrow')
+        with pytest.raises(ValueError):
+            flight_.query('SELECT 1', timeout=0)
+        statement = flight_.prepare('SELECT 1')
+        with pytest.raises(TimeoutError):
+            statement.execute(timeout=0.2)
+        assert 'TimeoutError' in collected[-1].error and collected[-1].total_seconds < 2
+        with pytest.raises(MemoryError, match=r'.*max_result_bytes.*'):
+            statement.execute(max_result_bytes=1_000)
+    with DremioStandInServer(num_rows=1_000) as server:
+        assert len(DremioArrowClient(**server.credentials).query('SELECT 1', timeout=30)) == 1_000
+
+
+def test_lazy_table(standin: DremioStandInServer, standin_client: DremioArrowClient):
+    """Test chained table operations compile to a single SQL statement, run only when materialized."""
+    trips = standin_client.table(['space', 'trips'])
+    assert isinstance(trips, LazyTable) and trips.sql == 'SELECT * FROM "space"."trips"'
+    preview = trips.filter('fare > 10', vendor=['CMT', "O'Hare"], store=None).select('vendor', total='fare + tip')
+    assert preview.sql == (
+        'SELECT "vendor", fare + tip AS "total" FROM "space"."trips" '
+        'WHERE (fare > 10) AND ("vendor" IN (\'CMT\', \'O\'\'Hare\')) AND ("store" IS NULL)'
+    )
+    assert trips.sql == 'SELECT * FROM "space"."trips"', 'Chaining changed the original table'
+    top = preview.order_by('total', descending=True).limit(100).limit(500)
+    assert top.sql == preview.sql + ' ORDER BY "total" DESC LIMIT 100'
+    summary = trips.aggregate('vendor', trips='COUNT(*)', fare=('fare', 'avg')).filter('trips > 1')
+    assert summary.sql == (
+        'SELECT * FROM (SELECT "vendor", COUNT(*) AS "trips", AVG("fare") AS "fare" FROM "space"."trips" '
+        'GROUP BY "vendor") AS "dremioarrow_subquery" WHERE trips > 1'
+    )
+    regrouped = trips.aggregate('vendor', trips='COUNT(*)').aggregate(vendors='COUNT(*)')
+    assert regrouped.sql.startswith('SELECT COUNT(*) AS "vendors" FROM (SELECT "vendor", COUNT(*) AS "trips"')
+    assert trips.limit(10).filter(id=1).sql.startswith('SELECT * FROM (SELECT * FROM "space"."trips" LIMIT 10)')
+    for invalid in (trips.select, trips.filter, trips.aggregate, trips.order_by, lambda: trips.limit(-1)):
+        with pytest.raises(ValueError):
+            invalid()
+
+    assert standin.queries == [], 'Building the query ran it'
+    assert len(top.collect()) == 1_000 and standin.queries[-1] == top.sql
+    assert top.head(10, output='arrow').num_rows == 10
+    assert top.schema().names == make_table(1).schema.names
+
+
+def test_process_pool(tmp_path, monkeypatch):
+    """Test endpoints read by worker processes match threaded reads, and their hand-over files are removed."""
+    with DremioStandInServer(num_rows=10_000, num_endpoints=3, batch_size=1_000) as server:
+        with EndpointProcessPool(2, directory=str(tmp_path)) as pool:
+            collected = []
+            flight_ = DremioArrowClient(**server.credentials, process_pool=pool, stats_hooks=[collected.append])
+            expected = flight_.query('SELECT 1', output='arrow', process_pool=False)
+            assert flight_.query('SELECT 1', output='arrow').equals(expected)
+            assert collected[-1].rows == 10_000 and collected[-1].batches == 12 and collected[-1].endpoints == 3
+            assert collected[-1].first_batch_seconds is not None, 'First endpoint result time not recorded'
+
+            ts_formats = {'pickup_datetime': '%Y-%m-%d %H:%M:%S', 'hire_date': '%Y-%m-%d'}
+            formatted = flight_.query('SELECT 1', ts_col=ts_formats)
+            threaded = flight_.query('SELECT 1', ts_col=ts_formats, process_pool=False)
+            pandas.testing.assert_frame_equal(formatted, threaded)
+            with pytest.raises(ValueError):
+                flight_.query('SELECT 1', ts_col='unknown', ts_format='%Y')
+            with pytest.raises(ValueError):
+                flight_.query('SELECT 1', max_result_bytes=1_000)
+
+            server.expire_tokens()
+            assert len(flight_.query('SELECT 1')) == 10_000, 'Workers did not pick up the renewed session'
+            server.inject_faults('do_get', after_batches=2)
+            assert flight_.query('SELECT 1', output='arrow').equals(expected) and collected[-1].retries == 1
+            assert not os.listdir(tmp_path), 'Endpoint files were left behind'
+
+            # interrupt the query while it waits for a read resubmitted after a failure, once its file is written
+            submit, submitted = pool._submit, []
+
+            def interrupted(*args):
+                future = submit(*args)
+                submitted.append(future)
+                if len(submitted) > 3:
+                    future.result()
+
+                    def result(timeout=None):
+                        # interrupt the wait once, cleaning up afterwards reads the actual result
+                        vars(future).pop('result')
+                        raise KeyboardInterrupt()
+
+                    monkeypatch.setattr(future, 'result', result)
+                return future
+
+            monkeypatch.setattr(pool, '_submit', interrupted)
+            server.inject_faults('do_get', after_batches=2)
+            with pytest.raises(KeyboardInterrupt):
+                flight_.query('SELECT 1', output='arrow')
+            assert len(submitted) == 4 and not os.listdir(tmp_path), 'Resubmitted endpoint file was left behind'
+
+
+def test_retries(tmp_path):
+    """Test transient errors are retried, expired sessions renewed mid-stream, and only failed endpoints read again."""
+    with DremioStandInServer(num_rows=20_000, num_endpoints=4, batch_size=1_000) as server:
+        collected = []
+        flight_ = DremioArrowClient(**server.credentials, retry_backoff=0.01, stats_hooks=[collected.append])
+        expected = flight_.query('SELECT 1', output='arrow')
+
+        server.streams.clear()
+        server.inject_faults('do_get', after_batches=2)
+        assert flight_.query('SELECT 1', output='arrow', max_workers=1).equals(expected)
+        assert server.streams == [0, 0, 1, 2, 3], f'Endpoints read again: {server.streams}'
+        assert (collected[-1].retries, collected[-1].rows, collected[-1].batches) == (1, 20_000, 20)
+
+        handshakes = server.handshakes
+        server.inject_faults('do_get', error=flight.FlightUnauthenticatedError, after_batches=1)
+        assert flight_.query('SELECT 1', output='arrow').equals(expected)
+        assert server.handshakes == handshakes + 1
+
+        server.inject_faults('get_flight_info', count=2)
+        server.inject_faults('do_get', after_batches=2)
+        spilled = flight_.query('SELECT 1', output='arrow', max_result_bytes=0, spill=str(tmp_path))
+        assert spilled.equals(expected) and collected[-1].spilled_bytes == expected.nbytes
+        assert not os.listdir(tmp_path), 'Spill files of the failed stream were left behind'
+
+        server.inject_faults('do_get', count=2)
+        assert pyarrow.Table.from_batches(flight_.query_batches('SELECT 1')).equals(expected)
+
+        server.inject_faults('handshake', count=2)
+        assert len(DremioArrowClient(**server.credentials, retry_backoff=0.01).query('SELECT 1')) == 20_000
+
+        server.inject_faults('do_get', count=2, after_batches=1)
+        with pytest.raises(Exception, match='Injected do_get fault'):
+            DremioArrowClient(**server.credentials, retries=1, retry_backoff=0.01).query('SELECT 1', max_workers=1)
+        with pytest.raises(ValueError):
+            DremioArrowClient(**server.credentials, retries=-1)